@@ -0,0 +1,142 @@
+import asyncio
+import logging
+import os
+import uuid
+from collections.abc import AsyncIterator, Awaitable, Callable, Iterable
+from concurrent.futures import Future
+from typing import TYPE_CHECKING, Any, TypeVar
+
+from app.audio_spool import get_audio_spool
+from app.audio_upload import AudioUpload, AudioUploadError
+from app.azure_speech_service import AzureSpeechService, SpeechToTextError
+from app.enums import WorkflowStage
+from app.google_auth import AuthError
+from app.google_calendar_integration import GoogleCalendarIntegration
+from app.local_intent_parser import LocalIntentParser
+from app.metrics import stage_span, workflow_run
+from app.normalization_pool import NormalizationPool
+from app.openai_function_calling import OpenAIFunctionCalling
+from app.resilience import CircuitOpenError, RetryBudget
+from app.workflow_orchestrator import DEFAULT_DEADLINE_SECONDS, WorkflowError
+
+
+if TYPE_CHECKING:
+    from googleapiclient.discovery import Resource
+
+
+T = TypeVar("T")
+
+DEFAULT_STAGE_CONCURRENCY = {
+    WorkflowStage.UPLOAD.value: os.cpu_count() or 1,
+    WorkflowStage.TRANSCRIBE.value: 8,
+    WorkflowStage.INTERPRET.value: 8,
+    WorkflowStage.CALENDAR.value: 2,
+}
+
+
+class AsyncWorkflowPipeline:
+    def __init__(
+        self,
+        calendar_service: "Resource",
+        calendar_id: str,
+        stage_concurrency: dict[str, int] | None = None,
+        max_retries: int = 3,
+        deadline_seconds: float | None = DEFAULT_DEADLINE_SECONDS,
+        normalization_pool: NormalizationPool | None = None,
+    ):
+        # Shared by every worker thread: see ClientRegistry.calendar_service.
+        self.calendar_service = calendar_service
+        self.calendar_id = calendar_id
+        self.max_retries = max_retries
+        self.deadline_seconds = deadline_seconds
+        self.normalization_pool = normalization_pool
+        self.stage_concurrency = {**DEFAULT_STAGE_CONCURRENCY, **(stage_concurrency or {})}
+        self._semaphores = {stage: asyncio.Semaphore(limit) for stage, limit in self.stage_concurrency.items()}
+
+    def _perform_calendar_operation(self, fn_name: str, fn_args: dict[str, Any], idempotency_key: str) -> Any:
+        return GoogleCalendarIntegration.perform_calendar_operation(self.calendar_service, self.calendar_id, fn_name, fn_args, max_retries=1, idempotency_key=idempotency_key)
+
+    async def _limited(self, stage: WorkflowStage, func: Callable[[], Awaitable[T]]) -> T:
+        async with self._semaphores[stage.value]:
+            return await func()
+
+    async def process(self, audio_source: str | bytes, normalized: Future | None = None, idempotency_key: str | None = None) -> dict[str, Any]:
+        logger = logging.getLogger(__name__)
+        # Stable per-run event IDs turn a retried CALENDAR stage's inserts into 409s instead of duplicates.
+        idempotency_key = idempotency_key or uuid.uuid4().hex
+        budget = RetryBudget(max_retries=max(self.max_retries - 1, 0), deadline_seconds=self.deadline_seconds)
+
+        def normalize() -> Awaitable[str]:
+            nonlocal normalized
+            if self.normalization_pool and isinstance(audio_source, str):
+                future = normalized or self.normalization_pool.submit(audio_source)
+                normalized = None
+                return asyncio.wrap_future(future)
+            return asyncio.to_thread(AudioUpload.ingest_speech, audio_source)
+
+        async def run_stage(stage: WorkflowStage, func: Callable[[], Awaitable[T]]) -> T:
+            logger.debug(f"[AsyncWorkflowPipeline.process] Stage {stage.value} start")
+
+            async def attempt() -> T:
+                with stage_span(stage.value):
+                    return await func()
+
+            return await budget.call_async(stage.value, lambda: self._limited(stage, attempt), fatal=(AudioUploadError, AuthError, CircuitOpenError))
+
+        try:
+            uploaded = await run_stage(WorkflowStage.UPLOAD, normalize)
+            with get_audio_spool().pin(uploaded):
+                recognized = await run_stage(WorkflowStage.TRANSCRIBE, lambda: AzureSpeechService.transcribe_audio_async(uploaded))
+            if not recognized:
+                logger.warning("[AsyncWorkflowPipeline.process] No speech recognized")
+                return {"status": "no_speech"}
+            llm_result = LocalIntentParser.parse(recognized) or await run_stage(WorkflowStage.INTERPRET, lambda: OpenAIFunctionCalling.call_llm_with_functions_async(recognized))
+            if "function_name" not in llm_result:
+                return {"status": "answer_only", "answer": llm_result.get("answer", "")}
+            fn_name = llm_result["function_name"]
+            fn_args = llm_result["arguments"]
+            res_cal = await run_stage(WorkflowStage.CALENDAR, lambda: asyncio.to_thread(self._perform_calendar_operation, fn_name, fn_args, idempotency_key))
+            return {"status": "success", "function_name": fn_name, "function_args": fn_args, "calendar_result": res_cal}
+        except (AudioUploadError, SpeechToTextError) as ex:
+            logger.error(f"[AsyncWorkflowPipeline.process] Audio or STT error after {budget.retries_used} retries: {ex}")
+            raise WorkflowError(str(ex)) from ex
+        except CircuitOpenError as ex:
+            logger.error(f"[AsyncWorkflowPipeline.process] Backend unavailable: {ex}")
+            raise WorkflowError(str(ex)) from ex
+        except AuthError as ex:
+            logger.error(f"[AsyncWorkflowPipeline.process] Auth error: {ex}")
+            raise WorkflowError("Authentication error") from ex
+        except Exception as ex:
+            logger.error(f"[AsyncWorkflowPipeline.process] Unexpected error after {budget.retries_used} retries: {ex}")
+            raise WorkflowError("Unexpected workflow error") from ex
+
+    async def process_source(self, source: str, normalized: Future | None = None) -> dict[str, Any]:
+        with workflow_run() as run:
+            try:
+                result = {"source": source, "correlation_id": run["correlation_id"], **await self.process(source, normalized)}
+            except WorkflowError as ex:
+                return {"source": source, "correlation_id": run["correlation_id"], "status": "error", "error": str(ex)}
+            run["status"] = result["status"]
+            return result
+
+    async def run_batch(self, sources: Iterable[str], max_in_flight: int = 64) -> AsyncIterator[dict[str, Any]]:
+        if self.normalization_pool:
+            # Normalization runs up to max_in_flight recordings ahead of the network-bound stages.
+            source_iter = self.normalization_pool.prefetch(sources, lookahead=max_in_flight)
+        else:
+            source_iter = ((source, None) for source in sources)
+        pending: set[asyncio.Task] = set()
+
+        def schedule() -> None:
+            while len(pending) < max_in_flight:
+                item = next(source_iter, None)
+                if item is None:
+                    return
+                pending.add(asyncio.create_task(self.process_source(*item)))
+
+        schedule()
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            schedule()
+            for task in done:
+                yield task.result()
@@ -0,0 +1,151 @@
+import logging
+import os
+import subprocess
+import tempfile
+import threading
+import time
+import wave
+from collections.abc import Iterator
+
+from pydub import AudioSegment
+
+from app.metrics import get_metrics_registry
+
+
+TARGET_CHANNELS = 1
+TARGET_FRAME_RATE = 16000
+TARGET_SAMPLE_WIDTH = 2
+DEFAULT_CHUNK_BYTES = TARGET_FRAME_RATE * TARGET_SAMPLE_WIDTH // 2
+# Byte sources are piped through ffmpeg's cache protocol, which keeps what it read in a temp file so demuxers can seek.
+PIPED_INPUT_SPEC = "cache:pipe:0"
+
+
+class AudioNormalizationError(Exception):
+    pass
+
+
+class AudioNormalizer:
+    @staticmethod
+    def build_decoder_command(input_spec: str) -> list[str]:
+        # MP4/M4A files written with the moov atom at the end need a seek past everything not read yet;
+        # without an unbounded read-ahead the cache refuses it and the demuxer reports "moov atom not found".
+        read_ahead = ["-read_ahead_limit", "-1"] if input_spec == PIPED_INPUT_SPEC else []
+        return [
+            AudioSegment.converter,
+            "-hide_banner",
+            "-loglevel",
+            "error",
+            *read_ahead,
+            "-i",
+            input_spec,
+            "-vn",
+            "-ac",
+            str(TARGET_CHANNELS),
+            "-ar",
+            str(TARGET_FRAME_RATE),
+            "-acodec",
+            f"pcm_s{TARGET_SAMPLE_WIDTH * 8}le",
+            "-f",
+            f"s{TARGET_SAMPLE_WIDTH * 8}le",
+            "pipe:1",
+        ]
+
+    @staticmethod
+    def iter_pcm_chunks(source: str | bytes, chunk_bytes: int = DEFAULT_CHUNK_BYTES, wav_path: str | None = None) -> Iterator[bytes]:
+        if chunk_bytes <= 0 or chunk_bytes % TARGET_SAMPLE_WIDTH:
+            raise ValueError(f"[iter_pcm_chunks] chunk_bytes must be a positive multiple of {TARGET_SAMPLE_WIDTH}")
+
+        input_spec = PIPED_INPUT_SPEC if isinstance(source, bytes) else source
+        metrics = get_metrics_registry()
+        started = time.perf_counter()
+        with tempfile.TemporaryFile() as stderr_file:
+            try:
+                proc = subprocess.Popen(
+                    AudioNormalizer.build_decoder_command(input_spec),
+                    stdin=subprocess.PIPE if isinstance(source, bytes) else subprocess.DEVNULL,
+                    stdout=subprocess.PIPE,
+                    stderr=stderr_file,
+                )
+            except OSError as ex:
+                raise AudioNormalizationError(f"[iter_pcm_chunks] Cannot start decoder: {ex}") from ex
+
+            feeder = None
+            if isinstance(source, bytes):
+
+                def feed_stdin() -> None:
+                    try:
+                        proc.stdin.write(source)
+                    except (BrokenPipeError, ValueError):
+                        pass
+                    finally:
+                        try:
+                            proc.stdin.close()
+                        except (BrokenPipeError, ValueError):
+                            pass
+
+                feeder = threading.Thread(target=feed_stdin, daemon=True)
+                feeder.start()
+
+            wav_writer = None
+            partial_file = None
+            partial_path = None
+            total_bytes = 0
+            completed = False
+            try:
+                if wav_path:
+                    # Unique partial name so concurrent workers writing the same destination never interleave.
+                    partial_fd, partial_path = tempfile.mkstemp(dir=os.path.dirname(wav_path) or ".", suffix=".part")
+                    partial_file = os.fdopen(partial_fd, "wb")
+                    wav_writer = wave.open(partial_file, "wb")
+                    wav_writer.setnchannels(TARGET_CHANNELS)
+                    wav_writer.setframerate(TARGET_FRAME_RATE)
+                    wav_writer.setsampwidth(TARGET_SAMPLE_WIDTH)
+
+                while True:
+                    chunk = proc.stdout.read(chunk_bytes)
+                    if not chunk:
+                        break
+                    if not total_bytes:
+                        # Time to first PCM: decoder start-up, probing and the first decoded frames.
+                        metrics.observe("carecall_stage_duration_seconds", time.perf_counter() - started, stage="decode")
+                    total_bytes += len(chunk)
+                    if wav_writer:
+                        wav_writer.writeframesraw(chunk)
+                    yield chunk
+
+                return_code = proc.wait()
+                if return_code != 0:
+                    stderr_file.seek(0)
+                    details = stderr_file.read().decode("utf-8", errors="replace").strip()
+                    raise AudioNormalizationError(f"[iter_pcm_chunks] Decoder failed (code={return_code}): {details}")
+                if total_bytes == 0:
+                    raise AudioNormalizationError("[iter_pcm_chunks] No audio decoded")
+                completed = True
+                logging.info(f"[iter_pcm_chunks] Decoded {total_bytes} bytes of PCM")
+            except Exception as ex:
+                metrics.inc("carecall_stage_errors_total", stage="normalize", error=type(ex).__name__)
+                raise
+            finally:
+                metrics.observe("carecall_stage_duration_seconds", time.perf_counter() - started, stage="normalize")
+                if proc.poll() is None:
+                    proc.kill()
+                    proc.wait()
+                proc.stdout.close()
+                if feeder:
+                    feeder.join()
+                if partial_file:
+                    if wav_writer:
+                        wav_writer.close()
+                    partial_file.close()
+                    if completed:
+                        os.replace(partial_path, wav_path)
+                    else:
+                        os.remove(partial_path)
+
+    @staticmethod
+    def normalize_to_wav(source: str | bytes, wav_path: str, chunk_bytes: int = DEFAULT_CHUNK_BYTES) -> str:
+        logging.info(f"[normalize_to_wav] Streaming normalization to {wav_path}")
+        for _ in AudioNormalizer.iter_pcm_chunks(source, chunk_bytes, wav_path=wav_path):
+            pass
+        logging.info(f"[normalize_to_wav] Normalization complete: {wav_path}")
+        return wav_path
@@ -0,0 +1,218 @@
+import logging
+import os
+import threading
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+
+from app.metrics import get_metrics_registry
+
+
+try:
+    import fcntl
+except ImportError:  # Windows: pins are only seen by the process that holds them.
+    fcntl = None
+
+
+DEFAULT_SPOOL_DIR = os.getenv("CARECALL_SPOOL_DIR", "temp_audio")
+DEFAULT_MAX_BYTES = int(float(os.getenv("CARECALL_SPOOL_MAX_MB", "1024")) * 1024 * 1024)
+DEFAULT_MAX_AGE_SECONDS = float(os.getenv("CARECALL_SPOOL_MAX_AGE_HOURS", "24")) * 3600
+# Files modified this recently are never collected: they may be mid-write, or about to be pinned after a reuse check.
+MIN_IDLE_SECONDS = 300.0
+COLLECT_INTERVAL_SECONDS = 60.0
+
+
+class AudioSpool:
+    """Directory of normalized audio named by content digest, bounded in size and age.
+
+    Workflows pin the files they are using; the collector removes unpinned files older than max_age_seconds,
+    then the least recently used ones (by modification time, refreshed on reuse) until the total fits max_bytes.
+
+    The Streamlit app, batch runs and job workers may share one directory, each with its own collector. A pin
+    therefore also holds a shared flock on the file, and a collector only removes a file it can lock exclusively:
+    pins are seen across processes and vanish with a process that dies. Without fcntl (Windows) pins stay
+    per process, so only one process per spool directory should run a collector there.
+    """
+
+    def __init__(self, root: str = DEFAULT_SPOOL_DIR, max_bytes: int = DEFAULT_MAX_BYTES, max_age_seconds: float = DEFAULT_MAX_AGE_SECONDS, reuse: bool = True):
+        self.root = os.path.abspath(root)
+        # reuse=False always re-normalizes, e.g. to measure cold ingestion.
+        self.reuse = reuse
+        self.max_bytes = max_bytes
+        self.max_age_seconds = max_age_seconds
+        self.evicted_files = 0
+        self.evicted_bytes = 0
+        self._lock = threading.Lock()
+        self._refcounts: dict[str, int] = {}
+        self._pin_fds: dict[str, int] = {}
+        self._collector: threading.Thread | None = None
+        os.makedirs(self.root, exist_ok=True)
+
+    def reusable(self, path: str) -> bool:
+        """True when path already holds a complete spooled file (they are only renamed into place once written)."""
+        if not (self.reuse and os.path.isfile(path)):
+            return False
+        AudioSpool.touch(path)
+        return True
+
+    @staticmethod
+    def touch(path: str) -> None:
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+
+    @staticmethod
+    def _lock_file(path: str, exclusive: bool) -> int | None:
+        """Open path and flock it (exclusive locks do not wait); None when it is gone, locked elsewhere or fcntl is missing."""
+        if fcntl is None:
+            return None
+        try:
+            fd = os.open(path, os.O_RDONLY)
+        except OSError:
+            return None
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB if exclusive else fcntl.LOCK_SH)
+        except OSError:
+            os.close(fd)
+            return None
+        return fd
+
+    def owns(self, path: str) -> bool:
+        return os.path.dirname(os.path.abspath(path)) == self.root
+
+    def acquire(self, path: str) -> str:
+        path = os.path.abspath(path)
+        if not self.owns(path):
+            # Files used in place (an already normalized WAV) belong to the caller: never touched or locked.
+            return path
+        with self._lock:
+            self._refcounts[path] = self._refcounts.get(path, 0) + 1
+            # One shared lock per file and process, held until its last pin is released.
+            if self._refcounts[path] == 1:
+                fd = AudioSpool._lock_file(path, exclusive=False)
+                if fd is not None:
+                    self._pin_fds[path] = fd
+        AudioSpool.touch(path)
+        return path
+
+    def release(self, path: str) -> None:
+        path = os.path.abspath(path)
+        if not self.owns(path):
+            return
+        with self._lock:
+            remaining = self._refcounts.get(path, 0) - 1
+            if remaining > 0:
+                self._refcounts[path] = remaining
+            else:
+                self._refcounts.pop(path, None)
+                fd = self._pin_fds.pop(path, None)
+                if fd is not None:
+                    os.close(fd)
+        AudioSpool.touch(path)
+
+    @contextmanager
+    def pin(self, path: str) -> Iterator[str]:
+        pinned = self.acquire(path)
+        try:
+            yield pinned
+        finally:
+            self.release(pinned)
+
+    def collect(self) -> dict[str, int]:
+        now = time.time()
+        with self._lock:
+            pinned = set(self._refcounts)
+        for path in pinned:
+            AudioSpool.touch(path)
+        entries = []
+        with os.scandir(self.root) as scan:
+            for entry in scan:
+                try:
+                    if entry.is_file():
+                        stat = entry.stat()
+                        entries.append((stat.st_mtime, stat.st_size, entry.path))
+                except OSError:
+                    continue
+        total_bytes = sum(size for _, size, _ in entries)
+        removed = {"age": 0, "size": 0}
+        removed_bytes = {"age": 0, "size": 0}
+        # Oldest first: expired files go before anything else, then least recently used ones while over budget.
+        for mtime, size, path in sorted(entries):
+            if path in pinned or now - mtime < MIN_IDLE_SECONDS:
+                continue
+            if now - mtime > self.max_age_seconds:
+                reason = "age"
+            elif total_bytes > self.max_bytes:
+                reason = "size"
+            else:
+                break
+            fd = AudioSpool._lock_file(path, exclusive=True)
+            if fd is None and fcntl is not None and os.path.exists(path):
+                # Pinned by another process.
+                continue
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            except OSError as ex:
+                logging.warning(f"[AudioSpool.collect] Cannot remove {path}: {ex}")
+                continue
+            finally:
+                if fd is not None:
+                    os.close(fd)
+            total_bytes -= size
+            removed[reason] += 1
+            removed_bytes[reason] += size
+
+        files = len(entries) - removed["age"] - removed["size"]
+        metrics = get_metrics_registry()
+        metrics.set("carecall_spool_bytes", total_bytes)
+        metrics.set("carecall_spool_files", files)
+        metrics.set("carecall_spool_pinned_files", len(pinned))
+        for reason, count in removed.items():
+            if count:
+                metrics.inc("carecall_spool_evictions_total", count, reason=reason)
+                metrics.inc("carecall_spool_evicted_bytes_total", removed_bytes[reason], reason=reason)
+        with self._lock:
+            self.evicted_files += removed["age"] + removed["size"]
+            self.evicted_bytes += removed_bytes["age"] + removed_bytes["size"]
+        if removed["age"] or removed["size"]:
+            logging.info(f"[AudioSpool.collect] Removed {removed['age']} expired and {removed['size']} least recently used files, {total_bytes} bytes left")
+        if total_bytes > self.max_bytes:
+            logging.warning(f"[AudioSpool.collect] Spool holds {total_bytes} bytes, over its {self.max_bytes} byte cap, in recent or pinned files")
+        return {"files": files, "bytes": total_bytes, "pinned": len(pinned), "evicted_age": removed["age"], "evicted_size": removed["size"]}
+
+    def start_collector(self, interval_seconds: float = COLLECT_INTERVAL_SECONDS) -> None:
+        """Collect on a daemon thread every interval_seconds; one collector per process, later calls are no-ops."""
+        with self._lock:
+            if self._collector is not None:
+                return
+
+            def run() -> None:
+                while True:
+                    try:
+                        self.collect()
+                    except Exception as ex:
+                        logging.error(f"[AudioSpool.start_collector] Collection failed: {ex}")
+                    time.sleep(interval_seconds)
+
+            self._collector = threading.Thread(target=run, daemon=True, name="audio-spool-gc")
+            self._collector.start()
+        logging.info(f"[AudioSpool.start_collector] Collecting {self.root} every {interval_seconds:g}s (cap {self.max_bytes} bytes, max age {self.max_age_seconds:g}s)")
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            return {"pinned": len(self._refcounts), "evicted_files": self.evicted_files, "evicted_bytes": self.evicted_bytes}
+
+
+_default_spool: AudioSpool | None = None
+_default_spool_lock = threading.Lock()
+
+
+def get_audio_spool() -> AudioSpool:
+    global _default_spool
+    with _default_spool_lock:
+        if _default_spool is None:
+            _default_spool = AudioSpool()
+        return _default_spool
@@ -1,8 +1,16 @@
+import contextlib
+import hashlib
+import io
 import logging
 import os
-import shutil
+import tempfile
+import wave
+from collections.abc import Iterator
 
-from pydub import AudioSegment
+from app.audio_normalizer import DEFAULT_CHUNK_BYTES, TARGET_CHANNELS, TARGET_FRAME_RATE, TARGET_SAMPLE_WIDTH, AudioNormalizationError, AudioNormalizer
+from app.audio_spool import get_audio_spool
+from app.metrics import stage_span
+from app.voice_activity import VoiceActivityDetector
 
 
 class AudioUploadError(Exception):
@@ -11,44 +19,137 @@ class AudioUploadError(Exception):
 
 class AudioUpload:
     @staticmethod
-    def convert_audio_to_wav(source_path: str) -> str:
-        base, ext = os.path.splitext(source_path)
-        ext = ext.lower()
-        wav_path = source_path if ext == ".wav" else base + ".wav"
-        logging.info(f"[convert_audio_to_wav] Converting {source_path} to WAV (normalized)")
-        audio = AudioSegment.from_file(source_path)
-        audio = audio.set_channels(1).set_frame_rate(16000).set_sample_width(2)
-        tmp_path = wav_path + ".tmp"
-        audio.export(tmp_path, format="wav")
-        os.replace(tmp_path, wav_path)
+    def is_normalized_wav(source: str | bytes) -> bool:
+        try:
+            with wave.open(io.BytesIO(source) if isinstance(source, bytes) else source, "rb") as wav:
+                return (
+                    wav.getcomptype() == "NONE"
+                    and wav.getnchannels() == TARGET_CHANNELS
+                    and wav.getframerate() == TARGET_FRAME_RATE
+                    and wav.getsampwidth() == TARGET_SAMPLE_WIDTH
+                    and wav.getnframes() > 0
+                )
+        except (wave.Error, EOFError, OSError):
+            return False
+
+    @staticmethod
+    def source_digest(source: str | bytes) -> str:
+        if isinstance(source, bytes):
+            return hashlib.sha256(source).hexdigest()
+        hasher = hashlib.sha256()
+        try:
+            with open(source, "rb") as f:
+                while block := f.read(1024 * 1024):
+                    hasher.update(block)
+        except OSError as e:
+            logging.error(f"[source_digest] Cannot read {source}: {e}")
+            raise AudioUploadError("[source_digest] File does not exist") from e
+        return hasher.hexdigest()
+
+    @staticmethod
+    def pcm_digest(wav_path: str) -> str:
+        hasher = hashlib.sha256()
+        with wave.open(wav_path, "rb") as wav:
+            while frames := wav.readframes(DEFAULT_CHUNK_BYTES // TARGET_SAMPLE_WIDTH):
+                hasher.update(frames)
+        return hasher.hexdigest()
+
+    @staticmethod
+    def content_stem(source: str | bytes) -> str:
+        # Spool names come from the content, so same-named recordings never collide and a re-upload reuses its WAV.
+        return AudioUpload.source_digest(source)[:32]
+
+    @staticmethod
+    def wav_destination(source: str | bytes, upload_dir: str, stem: str | None = None) -> str:
+        return os.path.join(upload_dir, (stem or AudioUpload.content_stem(source)) + ".wav")
+
+    @staticmethod
+    def convert_audio_to_wav(source: str | bytes, wav_path: str | None = None) -> str:
+        if wav_path is None:
+            if isinstance(source, bytes):
+                raise AudioUploadError("[convert_audio_to_wav] wav_path is required for in-memory audio")
+            wav_path = os.path.splitext(source)[0] + ".wav"
+        logging.info(f"[convert_audio_to_wav] Converting to WAV (normalized): {wav_path}")
+        AudioNormalizer.normalize_to_wav(source, wav_path)
 
         logging.info(f"[convert_audio_to_wav] Conversion complete: {wav_path}")
         return wav_path
 
     @staticmethod
-    def handle_audio_upload(file_path: str, upload_dir: str = "temp_audio") -> str:
-        if not os.path.isfile(file_path):
-            logging.error(f"[handle_audio_upload] File not found: {file_path}")
-            raise AudioUploadError("[handle_audio_upload] File does not exist")
+    def ingest_audio(source: str | bytes, upload_dir: str | None = None, stem: str | None = None) -> str:
+        if isinstance(source, str) and not os.path.isfile(source):
+            logging.error(f"[ingest_audio] File not found: {source}")
+            raise AudioUploadError("[ingest_audio] File does not exist")
+        upload_dir = upload_dir or get_audio_spool().root
 
+        normalized = AudioUpload.is_normalized_wav(source)
         try:
+            if normalized and isinstance(source, str):
+                # Left outside the spool: pins and touches only apply to spooled files, never to the caller's own.
+                logging.info(f"[ingest_audio] Already normalized, used in place: {source}")
+                return source
             os.makedirs(upload_dir, exist_ok=True)
-            dest = os.path.join(upload_dir, os.path.basename(file_path))
-            shutil.copy2(file_path, dest)
-            logging.info(f"[handle_audio_upload] File uploaded to {dest}")
-            try:
-                AudioSegment.from_file(dest)
-            except Exception as ex:
-                logging.error(f"[handle_audio_upload] Unreadable/unsupported audio file: {ex}")
-                raise AudioUploadError("[handle_audio_upload] Unsupported or unreadable audio file") from ex
-
-            try:
-                dest = AudioUpload.convert_audio_to_wav(dest)
-            except Exception as ex:
-                logging.error(f"[handle_audio_upload] Conversion error: {str(ex)}")
-                raise AudioUploadError("[handle_audio_upload] Failed to convert audio") from ex
-
-            return dest
+            dest = AudioUpload.wav_destination(source, upload_dir, stem)
+            if get_audio_spool().reusable(dest):
+                logging.info(f"[ingest_audio] Reusing spooled {dest}")
+                return dest
+            if normalized:
+                partial_fd, partial_path = tempfile.mkstemp(dir=upload_dir, suffix=".part")
+                try:
+                    with stage_span("upload_copy"), os.fdopen(partial_fd, "wb") as f:
+                        f.write(source)
+                    os.replace(partial_path, dest)
+                except OSError:
+                    with contextlib.suppress(OSError):
+                        os.remove(partial_path)
+                    raise
+                logging.info(f"[ingest_audio] Already normalized, stored as {dest}")
+                return dest
         except OSError as e:
-            logging.error(f"[handle_audio_upload] Failed to copy file: {str(e)}")
-            raise AudioUploadError("[handle_audio_upload] Error during file copy") from e
+            logging.error(f"[ingest_audio] Failed to store file: {str(e)}")
+            raise AudioUploadError("[ingest_audio] Error during file copy") from e
+
+        try:
+            return AudioUpload.convert_audio_to_wav(source, dest)
+        except Exception as ex:
+            logging.error(f"[ingest_audio] Unreadable/unsupported audio file: {ex}")
+            raise AudioUploadError("[ingest_audio] Unsupported or unreadable audio file") from ex
+
+    @staticmethod
+    def ingest_speech(source: str | bytes, upload_dir: str | None = None) -> str:
+        upload_dir = upload_dir or get_audio_spool().root
+        stem = AudioUpload.content_stem(source)
+        speech_path = os.path.join(upload_dir, stem + ".speech.wav")
+        if get_audio_spool().reusable(speech_path):
+            logging.info(f"[ingest_speech] Reusing spooled {speech_path}")
+            return speech_path
+        wav_path = AudioUpload.ingest_audio(source, upload_dir, stem)
+        return VoiceActivityDetector().trim_wav(wav_path, upload_dir, speech_path)
+
+    @staticmethod
+    def stream_audio(source: str | bytes, upload_dir: str | None = None, keep_wav: bool = False) -> Iterator[bytes]:
+        if isinstance(source, str) and not os.path.isfile(source):
+            logging.error(f"[stream_audio] File not found: {source}")
+            raise AudioUploadError("[stream_audio] File does not exist")
+
+        if AudioUpload.is_normalized_wav(source):
+            logging.info("[stream_audio] Already normalized, streaming frames without decoding")
+            with wave.open(io.BytesIO(source) if isinstance(source, bytes) else source, "rb") as wav:
+                while frames := wav.readframes(DEFAULT_CHUNK_BYTES // TARGET_SAMPLE_WIDTH):
+                    yield frames
+            return
+
+        wav_path = None
+        if keep_wav:
+            upload_dir = upload_dir or get_audio_spool().root
+            os.makedirs(upload_dir, exist_ok=True)
+            wav_path = AudioUpload.wav_destination(source, upload_dir)
+        try:
+            yield from AudioNormalizer.iter_pcm_chunks(source, wav_path=wav_path)
+        except (AudioNormalizationError, OSError) as ex:
+            logging.error(f"[stream_audio] Unreadable/unsupported audio file: {ex}")
+            raise AudioUploadError("[stream_audio] Unsupported or unreadable audio file") from ex
+
+    @staticmethod
+    def handle_audio_upload(file_path: str, upload_dir: str | None = None) -> str:
+        return AudioUpload.ingest_audio(file_path, upload_dir)
@@ -1,5 +1,12 @@
-import time
+import asyncio
+import contextvars
+import hashlib
+import logging
 import threading
+import time
+import wave
+from collections.abc import Callable, Iterable
+from concurrent.futures import Future, ThreadPoolExecutor
 
 from azure.cognitiveservices.speech import (
     AudioConfig,
@@ -8,9 +15,25 @@ from azure.cognitiveservices.speech import (
     SpeechConfig,
     SpeechRecognizer,
 )
+from azure.cognitiveservices.speech.audio import AudioStreamFormat, PushAudioInputStream
+
+from app.audio_normalizer import TARGET_CHANNELS, TARGET_FRAME_RATE, TARGET_SAMPLE_WIDTH
+from app.audio_upload import AudioUpload
+from app.clients import DEFAULT_SPEECH_REGION, ClientConfigError, ClientRegistry
+from app.metrics import observe_stt, stage_span
+from app.resilience import CancelToken, CircuitOpenError, get_backend_guard
+from app.transcript_cache import TranscriptCache, get_transcript_cache
+from app.voice_activity import VoiceActivityDetector
 
-from app.config import EnvVars, get_env_var
-from app.enums import AzureSpeechSettings
+
+# Files longer than SEGMENT_MIN_FILE_SECONDS are cut at quiet frames into segments recognized in parallel.
+SEGMENT_MIN_FILE_SECONDS = 60.0
+SEGMENT_TARGET_SECONDS = 30.0
+SEGMENT_MAX_SECONDS = 45.0
+DEFAULT_SEGMENT_PARALLELISM = 4
+TIMEOUT_BASE_SECONDS = 15.0
+TIMEOUT_REALTIME_FACTOR = 1.5
+STT_BACKEND = "azure_speech"
 
 
 class SpeechToTextError(Exception):
@@ -18,71 +41,359 @@ class SpeechToTextError(Exception):
 
 
 class AzureSpeechService:
-    DEFAULT_REGION = "francecentral"
+    DEFAULT_REGION = DEFAULT_SPEECH_REGION
 
     @staticmethod
-    def transcribe_audio(file_path: str, max_retries: int = 3, timeout_seconds: int = 90) -> str:
-        key = get_env_var(EnvVars.AZURE_SPEECH_KEY)
-        region = get_env_var(EnvVars.AZURE_SPEECH_REGION, default=AzureSpeechService.DEFAULT_REGION)
-        if not key:
-            raise SpeechToTextError("[transcribe_audio] Missing Azure Speech key")
-        speech_config = SpeechConfig(subscription=key, region=region)
-        speech_config.speech_recognition_language = AzureSpeechSettings.LANGUAGE.value
-        for attempt in range(1, max_retries + 1):
-            try:
-                audio_config = AudioConfig(filename=file_path)
-                recognizer = SpeechRecognizer(speech_config=speech_config, audio_config=audio_config)
-
-                parts: list[str] = []
-                done = threading.Event()
-                err_msg: str | None = None
-
-                def on_recognized(evt):
-                    if evt.result.reason == ResultReason.RecognizedSpeech and evt.result.text:
-                        parts.append(evt.result.text)
-
-                def on_canceled(evt):
-                    nonlocal err_msg
-                    details = evt.cancellation_details
-                    if details and details.reason == CancellationReason.Error:
-                        print(
-                            f"[transcribe_audio] Cancelled(ERROR): reason={details.reason}, code={details.code}, details={details.error_details}"
-                        )
-                        err_msg = details.error_details or "[transcribe_audio] Azure Speech error"
-                    done.set()
-
-                def on_stopped(evt):
-                    done.set()
-
-                recognizer.recognized.connect(on_recognized)
-                recognizer.canceled.connect(on_canceled)
-                recognizer.session_stopped.connect(on_stopped)
-
-                start_time = time.time()
-                recognizer.start_continuous_recognition()
-
-                finished = done.wait(timeout_seconds)
-                recognizer.stop_continuous_recognition()
-
-                elapsed = time.time() - start_time
-                if not finished:
-                    raise SpeechToTextError(f"[transcribe_audio] Timed out after {elapsed:.1f}s")
-
-                if err_msg:
-                    raise SpeechToTextError(err_msg)
-
-                text = " ".join(parts).strip()
-                if text:
-                    print(f"[transcribe_audio] Transcription success '{text}'")
+    def build_speech_config() -> SpeechConfig:
+        try:
+            return ClientRegistry.speech_config()
+        except ClientConfigError as exc:
+            raise SpeechToTextError(str(exc)) from exc
+
+    @staticmethod
+    def connect_recognition_events(recognizer: SpeechRecognizer, on_done: Callable[[str | None], None]) -> list[str]:
+        parts: list[str] = []
+
+        def on_recognized(evt):
+            if evt.result.reason == ResultReason.RecognizedSpeech and evt.result.text:
+                parts.append(evt.result.text)
+
+        def on_canceled(evt):
+            err_msg = None
+            details = evt.cancellation_details
+            if details and details.reason == CancellationReason.Error:
+                logging.error(f"[transcribe_audio] Cancelled(ERROR): reason={details.reason}, code={details.code}, details={details.error_details}")
+                err_msg = details.error_details or "[transcribe_audio] Azure Speech error"
+            on_done(err_msg)
+
+        def on_stopped(evt):
+            on_done(None)
+
+        recognizer.recognized.connect(on_recognized)
+        recognizer.canceled.connect(on_canceled)
+        recognizer.session_stopped.connect(on_stopped)
+        return parts
+
+    @staticmethod
+    def join_transcript(parts: list[str]) -> str:
+        text = " ".join(parts).strip()
+        if text:
+            logging.info(f"[transcribe_audio] Transcription success '{text}'")
+            return text
+
+        logging.info("[transcribe_audio] No speech recognized")
+        return ""
+
+    @staticmethod
+    def run_recognition(recognizer: SpeechRecognizer, timeout_seconds: float | Callable[[], float], on_started: Callable[[], None] | None = None, cancel_token: CancelToken | None = None) -> str:
+        done = threading.Event()
+        errors: list[str] = []
+
+        def on_done(err_msg: str | None) -> None:
+            if err_msg:
+                errors.append(err_msg)
+            done.set()
+
+        parts = AzureSpeechService.connect_recognition_events(recognizer, on_done)
+        if cancel_token:
+            cancel_token.add_callback(lambda: on_done("[transcribe_audio] Cancelled, a hedged attempt answered first"))
+
+        start_time = time.time()
+        recognizer.start_continuous_recognition()
+        if on_started:
+            on_started()
+
+        # A callable timeout is read once on_started returns, e.g. once a streamed input is complete and its length known.
+        finished = done.wait(timeout_seconds() if callable(timeout_seconds) else timeout_seconds)
+        recognizer.stop_continuous_recognition()
+
+        elapsed = time.time() - start_time
+        if not finished:
+            raise SpeechToTextError(f"[transcribe_audio] Timed out after {elapsed:.1f}s")
+
+        if errors:
+            raise SpeechToTextError(errors[0])
+
+        return AzureSpeechService.join_transcript(parts)
+
+    @staticmethod
+    def wav_cache_key(file_path: str) -> str | None:
+        try:
+            return TranscriptCache.build_key(AudioUpload.pcm_digest(file_path))
+        except (wave.Error, EOFError, OSError) as exc:
+            logging.warning(f"[transcribe_audio] Transcript cache skipped: {exc}")
+            return None
+
+    @staticmethod
+    def recognition_timeout(duration_seconds: float) -> float:
+        return TIMEOUT_BASE_SECONDS + TIMEOUT_REALTIME_FACTOR * duration_seconds
+
+    @staticmethod
+    def read_wav_range(file_path: str, start: int, end: int) -> bytes:
+        with wave.open(file_path, "rb") as wav:
+            frame_size = wav.getsampwidth() * wav.getnchannels()
+            wav.setpos(start // frame_size)
+            return wav.readframes((end - start) // frame_size)
+
+    @staticmethod
+    def wav_duration_seconds(file_path: str) -> float | None:
+        try:
+            with wave.open(file_path, "rb") as wav:
+                return wav.getnframes() / wav.getframerate()
+        except (wave.Error, EOFError, OSError):
+            return None
+
+    @staticmethod
+    def recognize_pcm(pcm: bytes, speech_config: SpeechConfig, timeout_seconds: float, cancel_token: CancelToken | None = None) -> str:
+        stream_format = AudioStreamFormat(samples_per_second=TARGET_FRAME_RATE, bits_per_sample=TARGET_SAMPLE_WIDTH * 8, channels=TARGET_CHANNELS)
+        push_stream = PushAudioInputStream(stream_format=stream_format)
+
+        def feed_push_stream() -> None:
+            push_stream.write(pcm)
+            push_stream.close()
+
+        recognizer = SpeechRecognizer(speech_config=speech_config, audio_config=AudioConfig(stream=push_stream))
+        return AzureSpeechService.run_recognition(recognizer, timeout_seconds, on_started=feed_push_stream, cancel_token=cancel_token)
+
+    @staticmethod
+    def recognize_file(file_path: str, speech_config: SpeechConfig, timeout_seconds: float, cancel_token: CancelToken | None = None) -> str:
+        recognizer = SpeechRecognizer(speech_config=speech_config, audio_config=AudioConfig(filename=file_path))
+        return AzureSpeechService.run_recognition(recognizer, timeout_seconds, cancel_token=cancel_token)
+
+    @staticmethod
+    def transcribe_segments(file_path: str, max_retries: int = 1, max_parallel: int = DEFAULT_SEGMENT_PARALLELISM, use_cache: bool = True) -> str:
+        vad = VoiceActivityDetector()
+        with wave.open(file_path, "rb") as wav:
+            total_bytes = wav.getnframes() * wav.getsampwidth() * wav.getnchannels()
+        # Bounds come from the frame levels only; each segment's PCM is read by offset when it is recognized.
+        bounds = vad.segment_bounds_from_levels(vad.wav_frame_levels_dbfs(file_path), total_bytes, SEGMENT_TARGET_SECONDS, SEGMENT_MAX_SECONDS)
+        speech_config = AzureSpeechService.build_speech_config()
+        bytes_per_second = TARGET_FRAME_RATE * TARGET_SAMPLE_WIDTH
+        guard = get_backend_guard(STT_BACKEND)
+        cache = get_transcript_cache() if use_cache else None
+        logging.info(f"[transcribe_audio] {len(bounds)} segments, up to {max_parallel} in parallel")
+
+        def transcribe_segment(index: int) -> str:
+            start, end = bounds[index]
+            pcm = AzureSpeechService.read_wav_range(file_path, start, end)
+            # Segment transcripts are cached too, so a stage retry only recognizes the segments that failed.
+            cache_key = TranscriptCache.build_key(hashlib.sha256(pcm).hexdigest()) if cache else None
+            if cache_key:
+                cached = cache.get(cache_key)
+                if cached is not None:
+                    return cached
+            timeout_seconds = AzureSpeechService.recognition_timeout((end - start) / bytes_per_second)
+            # Retries beyond max_retries are left to the caller's stage budget; the segment cache keeps the others' results.
+            for attempt in range(1, max_retries + 1):
+                try:
+                    started = time.perf_counter()
+                    with stage_span("stt"):
+                        text = guard.call(lambda token: AzureSpeechService.recognize_pcm(pcm, speech_config, timeout_seconds, token), scale=timeout_seconds)
+                    observe_stt((end - start) / bytes_per_second, time.perf_counter() - started)
+                    if text and cache_key:
+                        cache.put(cache_key, text)
                     return text
+                except CircuitOpenError:
+                    raise
+                except Exception as exc:
+                    logging.warning(f"[transcribe_audio] Segment {index + 1}/{len(bounds)} attempt {attempt}/{max_retries} failed: {exc}")
+                    if attempt == max_retries:
+                        raise SpeechToTextError(f"[transcribe_audio] Segment {index + 1}/{len(bounds)} failed after retries") from exc
+                    time.sleep(1)
+            return ""
 
-                print("[transcribe_audio] No speech recognized")
-                return ""
-            except SpeechToTextError:
+        with ThreadPoolExecutor(max_workers=max(min(max_parallel, len(bounds)), 1), thread_name_prefix="stt-segment") as executor:
+            futures = [executor.submit(contextvars.copy_context().run, transcribe_segment, index) for index in range(len(bounds))]
+            texts = [future.result() for future in futures]
+        return AzureSpeechService.join_transcript([text for text in texts if text])
+
+    @staticmethod
+    def transcribe_audio(
+        file_path: str,
+        max_retries: int = 3,
+        timeout_seconds: float | None = None,
+        use_cache: bool = True,
+        max_parallel_segments: int = DEFAULT_SEGMENT_PARALLELISM,
+    ) -> str:
+        cache_key = AzureSpeechService.wav_cache_key(file_path) if use_cache else None
+        if cache_key:
+            cached = get_transcript_cache().get(cache_key)
+            if cached is not None:
+                return cached
+
+        duration_seconds = AzureSpeechService.wav_duration_seconds(file_path)
+        if duration_seconds is not None and duration_seconds > SEGMENT_MIN_FILE_SECONDS:
+            text = AzureSpeechService.transcribe_segments(file_path, max_retries=max_retries, max_parallel=max_parallel_segments, use_cache=use_cache)
+            if text and cache_key:
+                get_transcript_cache().put(cache_key, text)
+            return text
+
+        if timeout_seconds is None:
+            timeout_seconds = AzureSpeechService.recognition_timeout(duration_seconds or SEGMENT_MIN_FILE_SECONDS)
+        speech_config = AzureSpeechService.build_speech_config()
+        guard = get_backend_guard(STT_BACKEND)
+        for attempt in range(1, max_retries + 1):
+            try:
+                started = time.perf_counter()
+                with stage_span("stt"):
+                    # The latency distribution is tracked per second of timeout budget, so short and long files share it.
+                    text = guard.call(lambda token: AzureSpeechService.recognize_file(file_path, speech_config, timeout_seconds, token), scale=timeout_seconds)
+                observe_stt(duration_seconds or 0.0, time.perf_counter() - started)
+                if text and cache_key:
+                    get_transcript_cache().put(cache_key, text)
+                return text
+            except (SpeechToTextError, CircuitOpenError):
                 raise
             except Exception as exc:
-                print(f"[transcribe_audio] Attempt {attempt}/{max_retries} failed: {exc}")
+                logging.warning(f"[transcribe_audio] Attempt {attempt}/{max_retries} failed: {exc}")
                 if attempt == max_retries:
                     raise SpeechToTextError("[transcribe_audio] Network or system error after retries") from exc
                 time.sleep(1)
         return ""
+
+    @staticmethod
+    def transcribe_stream(
+        pcm_chunks: Iterable[bytes],
+        timeout_seconds: float | None = None,
+        use_cache: bool = True,
+        source_digest: str | None = None,
+        max_parallel_segments: int = DEFAULT_SEGMENT_PARALLELISM,
+    ) -> str:
+        """Recognize PCM while it is produced, cut into segments of about SEGMENT_TARGET_SECONDS.
+
+        Each segment has its own push stream and recognizer, so long recordings are recognized in parallel, and its
+        timeout (timeout_seconds, or one scaled to its length) starts once its audio has been pushed.
+        """
+        source_key = TranscriptCache.build_key(source_digest) if use_cache and source_digest else None
+        if source_key:
+            cached = get_transcript_cache().get(source_key)
+            if cached is not None:
+                if hasattr(pcm_chunks, "close"):
+                    pcm_chunks.close()
+                return cached
+
+        speech_config = AzureSpeechService.build_speech_config()
+        stream_format = AudioStreamFormat(samples_per_second=TARGET_FRAME_RATE, bits_per_sample=TARGET_SAMPLE_WIDTH * 8, channels=TARGET_CHANNELS)
+        bytes_per_second = TARGET_FRAME_RATE * TARGET_SAMPLE_WIDTH
+        guard = get_backend_guard(STT_BACKEND)
+        context = contextvars.copy_context()
+        feed_errors: list[Exception] = []
+        futures: list[Future] = []
+        pcm_hasher = hashlib.sha256()
+        pushed_bytes = [0]
+
+        def recognize_segment(push_stream: PushAudioInputStream, pushed: threading.Event, segment_bytes: list[int]) -> str:
+            def segment_timeout() -> float:
+                return timeout_seconds if timeout_seconds is not None else AzureSpeechService.recognition_timeout(segment_bytes[0] / bytes_per_second)
+
+            try:
+                recognizer = SpeechRecognizer(speech_config=speech_config, audio_config=AudioConfig(stream=push_stream))
+                started = time.perf_counter()
+                with stage_span("stt"):
+                    # A live stream can only be consumed once, so it goes through the circuit breaker but is never hedged.
+                    text = guard.call(
+                        lambda token: AzureSpeechService.run_recognition(recognizer, segment_timeout, on_started=pushed.wait),
+                        scale=AzureSpeechService.recognition_timeout(SEGMENT_TARGET_SECONDS),
+                        hedge=False,
+                    )
+            except (SpeechToTextError, CircuitOpenError):
+                raise
+            except Exception as exc:
+                logging.error(f"[transcribe_stream] Streaming recognition failed: {exc}")
+                raise SpeechToTextError("[transcribe_stream] Network or system error") from exc
+            observe_stt(segment_bytes[0] / bytes_per_second, time.perf_counter() - started)
+            return text
+
+        def feed_segments(executor: ThreadPoolExecutor) -> None:
+            current: tuple[PushAudioInputStream, threading.Event, list[int]] | None = None
+
+            def close_current() -> None:
+                if current:
+                    current[0].close()
+                    current[1].set()
+
+            try:
+                for index, chunk in VoiceActivityDetector().split_pcm_chunks(pcm_chunks, SEGMENT_TARGET_SECONDS, SEGMENT_MAX_SECONDS):
+                    if index == len(futures):
+                        close_current()
+                        current = (PushAudioInputStream(stream_format=stream_format), threading.Event(), [0])
+                        futures.append(executor.submit(context.copy().run, recognize_segment, *current))
+                    pcm_hasher.update(chunk)
+                    pushed_bytes[0] += len(chunk)
+                    current[2][0] += len(chunk)
+                    current[0].write(chunk)
+            except Exception as exc:
+                feed_errors.append(exc)
+            finally:
+                close_current()
+
+        with ThreadPoolExecutor(max_workers=max(max_parallel_segments, 1), thread_name_prefix="stt-stream") as executor:
+            feed_segments(executor)
+            # Checked first: a fatal feed error (an unreadable upload) must not surface as the retryable STT error it caused.
+            if feed_errors:
+                raise feed_errors[0]
+            texts = [future.result() for future in futures]
+        if len(futures) > 1:
+            logging.info(f"[transcribe_stream] {len(futures)} segments, {pushed_bytes[0] / bytes_per_second:.1f}s of audio")
+        text = AzureSpeechService.join_transcript([text for text in texts if text])
+        if text and use_cache:
+            cache = get_transcript_cache()
+            cache.put(TranscriptCache.build_key(pcm_hasher.hexdigest()), text)
+            if source_key:
+                cache.put(source_key, text)
+        return text
+
+    @staticmethod
+    async def recognize_file_async(file_path: str, speech_config: SpeechConfig, timeout_seconds: float) -> str:
+        loop = asyncio.get_running_loop()
+        done: asyncio.Future[str | None] = loop.create_future()
+
+        def resolve(err_msg: str | None) -> None:
+            if not done.done():
+                done.set_result(err_msg)
+
+        try:
+            recognizer = SpeechRecognizer(speech_config=speech_config, audio_config=AudioConfig(filename=file_path))
+            parts = AzureSpeechService.connect_recognition_events(recognizer, lambda err_msg: loop.call_soon_threadsafe(resolve, err_msg))
+            await asyncio.to_thread(recognizer.start_continuous_recognition)
+        except SpeechToTextError:
+            raise
+        except Exception as exc:
+            logging.error(f"[transcribe_audio_async] Recognition could not start: {exc}")
+            raise SpeechToTextError("[transcribe_audio_async] Network or system error") from exc
+
+        start_time = time.time()
+        try:
+            err_msg = await asyncio.wait_for(done, timeout_seconds)
+        except asyncio.TimeoutError as exc:  # noqa: UP041 (distinct from TimeoutError on Python 3.10)
+            raise SpeechToTextError(f"[transcribe_audio_async] Timed out after {time.time() - start_time:.1f}s") from exc
+        finally:
+            await asyncio.to_thread(recognizer.stop_continuous_recognition)
+
+        if err_msg:
+            raise SpeechToTextError(err_msg)
+
+        return AzureSpeechService.join_transcript(parts)
+
+    @staticmethod
+    async def transcribe_audio_async(file_path: str, timeout_seconds: float | None = None, use_cache: bool = True) -> str:
+        cache_key = await asyncio.to_thread(AzureSpeechService.wav_cache_key, file_path) if use_cache else None
+        if cache_key:
+            cached = get_transcript_cache().get(cache_key)
+            if cached is not None:
+                return cached
+
+        duration_seconds = AzureSpeechService.wav_duration_seconds(file_path)
+        if duration_seconds is not None and duration_seconds > SEGMENT_MIN_FILE_SECONDS:
+            return await asyncio.to_thread(AzureSpeechService.transcribe_audio, file_path, max_retries=1, use_cache=use_cache)
+        if timeout_seconds is None:
+            timeout_seconds = AzureSpeechService.recognition_timeout(duration_seconds or SEGMENT_MIN_FILE_SECONDS)
+
+        speech_config = AzureSpeechService.build_speech_config()
+        start_time = time.time()
+        with stage_span("stt"):
+            text = await get_backend_guard(STT_BACKEND).call_async(lambda: AzureSpeechService.recognize_file_async(file_path, speech_config, timeout_seconds), scale=timeout_seconds)
+        observe_stt(duration_seconds or 0.0, time.time() - start_time)
+        if text and cache_key:
+            get_transcript_cache().put(cache_key, text)
+        return text
@@ -0,0 +1,107 @@
+import argparse
+import asyncio
+import json
+import logging
+import os
+import sys
+from collections.abc import Iterator
+
+from google.oauth2.credentials import Credentials
+from googleapiclient.discovery import Resource
+
+from app.async_pipeline import DEFAULT_STAGE_CONCURRENCY, AsyncWorkflowPipeline
+from app.audio_spool import get_audio_spool
+from app.clients import ClientRegistry
+from app.enums import WorkflowStage
+from app.metrics import get_metrics_registry, install_log_correlation
+from app.normalization_pool import NormalizationPool
+from app.token_store import TokenRefresher
+
+
+AUDIO_EXTENSIONS = (".wav", ".mp3", ".m4a", ".opus", ".ogg", ".flac", ".aac", ".webm")
+
+
+def iter_audio_sources(input_path: str) -> Iterator[str]:
+    if os.path.isdir(input_path):
+        for root, dirs, files in os.walk(input_path):
+            dirs.sort()
+            for name in sorted(files):
+                if name.lower().endswith(AUDIO_EXTENSIONS):
+                    yield os.path.join(root, name)
+        return
+
+    base_dir = os.path.dirname(os.path.abspath(input_path))
+    with open(input_path, encoding="utf-8") as manifest:
+        for line in manifest:
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            path = json.loads(line)["path"] if line.startswith("{") else line
+            yield path if os.path.isabs(path) else os.path.join(base_dir, path)
+
+
+def load_calendar_service(token_file: str) -> Resource:
+    credentials = Credentials.from_authorized_user_file(token_file)
+    # Long batches and job workers outlive the access token; refresh it off the request path.
+    TokenRefresher.track(credentials)
+    # The registry's service sends each request over the calling thread's own connections, so workers can share it.
+    return ClientRegistry.calendar_service(credentials)
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Run the CareCall workflow on a directory or manifest of recorded calls and write JSONL results.")
+    parser.add_argument("input", help="Directory of audio files, or manifest with one path (or JSON object with a 'path' key) per line")
+    parser.add_argument("--output", "-o", default="-", help="JSONL output file ('-' for stdout)")
+    parser.add_argument("--token-file", required=True, help="Google authorized-user token JSON")
+    parser.add_argument("--calendar-id", default="primary")
+    parser.add_argument("--max-in-flight", type=int, default=64, help="Recordings processed concurrently")
+    parser.add_argument("--max-retries", type=int, default=3)
+    parser.add_argument("--normalize-workers", type=int, default=os.cpu_count() or 1, help="Normalization worker processes (0 to normalize in threads)")
+    parser.add_argument("--deadline-seconds", type=float, default=None, help="Per-recording retry deadline (none by default)")
+    parser.add_argument("--metrics-file", help="Write Prometheus text metrics to this file after each recording")
+    parser.add_argument("--metrics-port", type=int, help="Serve Prometheus text metrics on http://127.0.0.1:PORT/metrics")
+    for stage in WorkflowStage:
+        parser.add_argument(f"--{stage.value}-concurrency", type=int, default=DEFAULT_STAGE_CONCURRENCY[stage.value], help=f"Concurrent {stage.value} calls")
+    return parser.parse_args(argv)
+
+
+async def run_batch(args: argparse.Namespace, normalization_pool: NormalizationPool | None = None) -> int:
+    pipeline = AsyncWorkflowPipeline(
+        load_calendar_service(args.token_file),
+        args.calendar_id,
+        stage_concurrency={stage.value: getattr(args, f"{stage.value}_concurrency") for stage in WorkflowStage},
+        max_retries=args.max_retries,
+        deadline_seconds=args.deadline_seconds,
+        normalization_pool=normalization_pool,
+    )
+    output = sys.stdout if args.output == "-" else open(args.output, "w", encoding="utf-8")
+    failures = 0
+    try:
+        async for result in pipeline.run_batch(iter_audio_sources(args.input), max_in_flight=args.max_in_flight):
+            failures += result["status"] == "error"
+            output.write(json.dumps(result, ensure_ascii=False, default=str) + "\n")
+            output.flush()
+            if args.metrics_file:
+                get_metrics_registry().write_textfile(args.metrics_file)
+    finally:
+        if output is not sys.stdout:
+            output.close()
+    return 1 if failures else 0
+
+
+def main(argv: list[str] | None = None) -> int:
+    install_log_correlation()
+    logging.basicConfig(level=logging.INFO, stream=sys.stderr, format="%(asctime)s %(levelname)s [%(correlation_id)s] %(message)s")
+    args = parse_args(argv)
+    if args.metrics_port:
+        get_metrics_registry().serve(args.metrics_port)
+    ClientRegistry.prewarm()
+    get_audio_spool().start_collector()
+    if args.normalize_workers <= 0:
+        return asyncio.run(run_batch(args))
+    with NormalizationPool(max_workers=args.normalize_workers) as normalization_pool:
+        return asyncio.run(run_batch(args, normalization_pool))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,225 @@
+import datetime
+import logging
+import threading
+import time
+import weakref
+from collections import defaultdict
+from typing import TYPE_CHECKING, Any
+
+
+if TYPE_CHECKING:
+    from googleapiclient.discovery import Resource
+
+
+DEFAULT_MAX_EVENTS = 5000
+DEFAULT_MAX_STALENESS_SECONDS = 30.0
+DEFAULT_WINDOW_PAST_DAYS = 90
+DEFAULT_WINDOW_FUTURE_DAYS = 365
+# The window is anchored on the day of the full sync; it is moved by a new full sync once a day.
+WINDOW_REFRESH_SECONDS = 24 * 3600.0
+MAX_INDEXED_SPAN_DAYS = 31
+SYNC_FIELDS = "nextPageToken,nextSyncToken,items(id,status,summary,start,end)"
+UTC = datetime.timezone.utc  # noqa: UP017 (datetime.UTC requires Python 3.11)
+
+
+def parse_event_bound(bound: dict[str, Any]) -> datetime.datetime | None:
+    value = bound.get("dateTime")
+    if value:
+        parsed = datetime.datetime.fromisoformat(value.replace("Z", "+00:00"))
+        return parsed if parsed.tzinfo else parsed.replace(tzinfo=UTC)
+    value = bound.get("date")
+    if value:
+        return datetime.datetime.strptime(value, "%Y-%m-%d").replace(tzinfo=UTC)
+    return None
+
+
+def format_api_time(value: datetime.datetime) -> str:
+    return value.astimezone(UTC).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+class CalendarEventStore:
+    """Events of one calendar within a window around today, kept current with Calendar sync tokens.
+
+    The full sync lists the window only (timeMin/timeMax); incremental syncs then report changes anywhere, and
+    those outside the window are dropped. Past max_events the window shrinks around now, and list_range falls
+    back to the API for ranges it no longer covers.
+    """
+
+    _registry: "weakref.WeakKeyDictionary[Resource, dict[str, CalendarEventStore]]" = weakref.WeakKeyDictionary()
+    _registry_lock = threading.Lock()
+
+    def __init__(
+        self,
+        calendar_service: "Resource",
+        calendar_id: str,
+        max_events: int = DEFAULT_MAX_EVENTS,
+        max_staleness_seconds: float = DEFAULT_MAX_STALENESS_SECONDS,
+        window_past_days: int = DEFAULT_WINDOW_PAST_DAYS,
+        window_future_days: int = DEFAULT_WINDOW_FUTURE_DAYS,
+    ):
+        self.calendar_service = calendar_service
+        self.calendar_id = calendar_id
+        self.max_events = max_events
+        self.max_staleness_seconds = max_staleness_seconds
+        self.window_past_days = window_past_days
+        self.window_future_days = window_future_days
+        self._lock = threading.RLock()
+        self._events: dict[str, dict[str, Any]] = {}
+        self._bounds: dict[str, tuple[datetime.datetime, datetime.datetime]] = {}
+        self._day_index: dict[datetime.date, set[str]] = defaultdict(set)
+        self._long_event_ids: set[str] = set()
+        self._sync_token: str | None = None
+        self._last_sync = 0.0
+        self._last_full_sync = 0.0
+        self._coverage: tuple[datetime.datetime, datetime.datetime] | None = None
+
+    @staticmethod
+    def for_calendar(calendar_service: "Resource", calendar_id: str) -> "CalendarEventStore":
+        with CalendarEventStore._registry_lock:
+            stores = CalendarEventStore._registry.setdefault(calendar_service, {})
+            if calendar_id not in stores:
+                stores[calendar_id] = CalendarEventStore(calendar_service, calendar_id)
+            return stores[calendar_id]
+
+    @staticmethod
+    def existing(calendar_service: "Resource", calendar_id: str) -> "CalendarEventStore | None":
+        with CalendarEventStore._registry_lock:
+            return CalendarEventStore._registry.get(calendar_service, {}).get(calendar_id)
+
+    @staticmethod
+    def _indexed_days(start: datetime.datetime, end: datetime.datetime) -> list[datetime.date] | None:
+        first_day = start.astimezone(UTC).date()
+        last_day = max(end - datetime.timedelta(microseconds=1), start).astimezone(UTC).date()
+        span_days = (last_day - first_day).days
+        if span_days > MAX_INDEXED_SPAN_DAYS:
+            return None
+        return [first_day + datetime.timedelta(days=offset) for offset in range(span_days + 1)]
+
+    def _index(self, event: dict[str, Any]) -> None:
+        event_id = event.get("id")
+        start = parse_event_bound(event.get("start", {}))
+        if not event_id or start is None:
+            return
+        self._unindex(event_id)
+        end = parse_event_bound(event.get("end", {})) or start
+        if self._coverage and not (start < self._coverage[1] and end > self._coverage[0]):
+            # Incremental syncs and new events report changes anywhere; only the covered window is kept.
+            return
+        self._events[event_id] = event
+        self._bounds[event_id] = (start, end)
+        days = self._indexed_days(start, end)
+        if days is None:
+            self._long_event_ids.add(event_id)
+            return
+        for day in days:
+            self._day_index[day].add(event_id)
+
+    def _unindex(self, event_id: str) -> None:
+        if event_id not in self._events:
+            return
+        del self._events[event_id]
+        start, end = self._bounds.pop(event_id)
+        self._long_event_ids.discard(event_id)
+        for day in self._indexed_days(start, end) or ():
+            ids = self._day_index.get(day)
+            if ids is not None:
+                ids.discard(event_id)
+                if not ids:
+                    del self._day_index[day]
+
+    def _fetch_pages(self, **params: Any) -> str | None:
+        page_token = None
+        while True:
+            response = self.calendar_service.events().list(calendarId=self.calendar_id, singleEvents=True, pageToken=page_token, fields=SYNC_FIELDS, **params).execute()
+            for event in response.get("items", []):
+                if event.get("status") == "cancelled":
+                    self._unindex(event.get("id", ""))
+                else:
+                    self._index(event)
+            page_token = response.get("nextPageToken")
+            if not page_token:
+                return response.get("nextSyncToken")
+
+    def _full_sync(self) -> None:
+        logging.info(f"[CalendarEventStore.sync] Full sync of {self.calendar_id}")
+        self._events.clear()
+        self._bounds.clear()
+        self._day_index.clear()
+        self._long_event_ids.clear()
+        today = datetime.datetime.combine(datetime.datetime.now(UTC).date(), datetime.time.min, tzinfo=UTC)
+        self._coverage = (today - datetime.timedelta(days=self.window_past_days), today + datetime.timedelta(days=self.window_future_days + 1))
+        self._sync_token = self._fetch_pages(timeMin=format_api_time(self._coverage[0]), timeMax=format_api_time(self._coverage[1]))
+        self._last_full_sync = time.monotonic()
+
+    def _distance(self, event_id: str, now: datetime.datetime) -> datetime.timedelta:
+        # Zero for an event in progress, so long events overlapping now are the last to go.
+        start, end = self._bounds[event_id]
+        if end <= now:
+            return now - end
+        return max(start - now, datetime.timedelta(0))
+
+    def _enforce_bound(self) -> None:
+        if len(self._events) <= self.max_events:
+            return
+        now = datetime.datetime.now(UTC)
+        by_distance = sorted(self._events, key=lambda event_id: self._distance(event_id, now))
+        cutoff = self._distance(by_distance[self.max_events], now)
+        # An event overlaps (now - cutoff, now + cutoff) exactly when its distance is below cutoff, so every event
+        # the shrunk window can return is still indexed.
+        for event_id in by_distance:
+            if self._distance(event_id, now) >= cutoff:
+                self._unindex(event_id)
+        coverage = (now - cutoff, now + cutoff)
+        if self._coverage:
+            coverage = (max(coverage[0], self._coverage[0]), min(coverage[1], self._coverage[1]))
+        self._coverage = coverage
+        logging.info(f"[CalendarEventStore.sync] Bounded to {len(self._events)} events around today for {self.calendar_id}")
+
+    def sync(self, force: bool = False) -> None:
+        with self._lock:
+            if not force and self._sync_token and time.monotonic() - self._last_sync < self.max_staleness_seconds:
+                return
+            if self._sync_token is None or time.monotonic() - self._last_full_sync > WINDOW_REFRESH_SECONDS:
+                self._full_sync()
+            else:
+                # Imported here so that importing the store (and the orchestrator) does not load googleapiclient.
+                from googleapiclient.errors import HttpError
+
+                try:
+                    self._sync_token = self._fetch_pages(syncToken=self._sync_token) or self._sync_token
+                except HttpError as ex:
+                    if ex.resp.status != 410:
+                        raise
+                    logging.warning(f"[CalendarEventStore.sync] Sync token expired for {self.calendar_id}, resyncing")
+                    self._full_sync()
+            self._enforce_bound()
+            self._last_sync = time.monotonic()
+
+    def upsert(self, event: dict[str, Any]) -> None:
+        with self._lock:
+            self._index(event)
+            self._enforce_bound()
+
+    def covers(self, range_start: datetime.datetime, range_end: datetime.datetime) -> bool:
+        with self._lock:
+            return self._sync_token is not None and (self._coverage is None or (self._coverage[0] <= range_start and range_end <= self._coverage[1]))
+
+    def query(self, range_start: datetime.datetime, range_end: datetime.datetime) -> list[dict[str, Any]]:
+        with self._lock:
+            candidate_ids = set(self._long_event_ids)
+            day = range_start.astimezone(UTC).date()
+            last_day = range_end.astimezone(UTC).date()
+            while day <= last_day:
+                candidate_ids.update(self._day_index.get(day, ()))
+                day += datetime.timedelta(days=1)
+            matches = [event_id for event_id in candidate_ids if self._bounds[event_id][0] < range_end and self._bounds[event_id][1] > range_start]
+            matches.sort(key=lambda event_id: self._bounds[event_id][0])
+            return [self._events[event_id] for event_id in matches]
+
+    def list_range(self, range_start: datetime.datetime, range_end: datetime.datetime) -> list[dict[str, Any]] | None:
+        self.sync()
+        if not self.covers(range_start, range_end):
+            return None
+        events = self.query(range_start, range_end)
+        logging.info(f"[CalendarEventStore.list_range] {len(events)} events served from store")
+        return events
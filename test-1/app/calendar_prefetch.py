@@ -0,0 +1,107 @@
+import contextvars
+import logging
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import TYPE_CHECKING, Any
+
+from app.enums import EventRange, FunctionName
+from app.google_calendar_integration import GoogleCalendarIntegration
+from app.local_intent_parser import LocalIntentParser
+
+
+if TYPE_CHECKING:
+    from googleapiclient.discovery import Resource
+
+
+MAX_PREFETCH_RANGES = 2
+
+
+class CalendarPrefetcher:
+    _executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="calendar-prefetch")
+    _stats_lock = threading.Lock()
+    hits = 0
+    misses = 0
+    saved_seconds = 0.0
+
+    def __init__(self, calendar_service: "Resource", calendar_id: str, transcript: str):
+        self.calendar_service = calendar_service
+        self.calendar_id = calendar_id
+        self.candidates = LocalIntentParser.list_candidates(transcript)[:MAX_PREFETCH_RANGES]
+        self._results: dict[tuple[str, str], list[dict[str, Any]]] = {}
+        self._elapsed: dict[tuple[str, str], float] = {}
+        self._future: Future | None = None
+        self._cancelled = threading.Event()
+        self._wait_seconds = 0.0
+        self._consumed = False
+        if self.candidates:
+            logging.info(f"[CalendarPrefetcher] Prefetching {self.candidates} while the LLM runs")
+            self._future = CalendarPrefetcher._executor.submit(contextvars.copy_context().run, self._fetch)
+
+    def _fetch(self) -> None:
+        # The caller may already use the service for its own call when the prefetch turns out useless: services
+        # from ClientRegistry send each thread's requests over its own connection, so that is safe.
+        for event_date, event_range in self.candidates:
+            if self._cancelled.is_set():
+                return
+            started = time.monotonic()
+            args = {"date": event_date, "range": event_range}
+            self._results[(event_date, event_range)] = GoogleCalendarIntegration.perform_calendar_operation(
+                self.calendar_service, self.calendar_id, FunctionName.LIST_EVENTS.value, args, max_retries=1
+            )
+            self._elapsed[(event_date, event_range)] = time.monotonic() - started
+
+    def _wait(self) -> None:
+        started = time.monotonic()
+        try:
+            self._future.result()
+        except Exception as exc:
+            logging.warning(f"[CalendarPrefetcher] Prefetch failed, falling back to a direct call: {exc}")
+        self._wait_seconds = time.monotonic() - started
+
+    def _cancel(self) -> None:
+        # Ranges not fetched yet are skipped; a request already in flight finishes in the background.
+        self._cancelled.set()
+        if self._future is not None:
+            self._future.cancel()
+
+    def take(self, function_name: str, args: dict[str, Any]) -> tuple[bool, Any]:
+        """Return (True, events) when the prefetch matches this call; consumed at most once.
+
+        Only a list_events call for a prefetched range waits for the prefetch; any other call cancels it.
+        """
+        if self._consumed or self._future is None:
+            return False, None
+        self._consumed = True
+        key = (args.get("date", ""), args.get("range", EventRange.DAY.value))
+        if function_name == FunctionName.LIST_EVENTS.value and key in self.candidates:
+            self._wait()
+        else:
+            self._cancel()
+        hit = function_name == FunctionName.LIST_EVENTS.value and key in self._results
+        with CalendarPrefetcher._stats_lock:
+            if hit:
+                CalendarPrefetcher.hits += 1
+                CalendarPrefetcher.saved_seconds += max(self._elapsed[key] - self._wait_seconds, 0.0)
+            else:
+                CalendarPrefetcher.misses += 1
+        logging.info(f"[CalendarPrefetcher] {'Hit' if hit else 'Miss'} for {function_name} {key}")
+        return (True, self._results[key]) if hit else (False, None)
+
+    def close(self) -> None:
+        if not self._consumed and self._future is not None:
+            self._consumed = True
+            self._cancel()
+            with CalendarPrefetcher._stats_lock:
+                CalendarPrefetcher.misses += 1
+
+    @staticmethod
+    def stats() -> dict[str, float]:
+        with CalendarPrefetcher._stats_lock:
+            lookups = CalendarPrefetcher.hits + CalendarPrefetcher.misses
+            return {
+                "hits": CalendarPrefetcher.hits,
+                "misses": CalendarPrefetcher.misses,
+                "hit_ratio": CalendarPrefetcher.hits / lookups if lookups else 0.0,
+                "saved_seconds": CalendarPrefetcher.saved_seconds,
+            }
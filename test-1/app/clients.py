@@ -0,0 +1,178 @@
+import asyncio
+import logging
+import threading
+import time
+import weakref
+from typing import TYPE_CHECKING, Any
+
+from app.config import EnvVars, get_env_var
+from app.enums import AzureSpeechSettings
+
+
+if TYPE_CHECKING:
+    # The SDKs are imported on first use: together they take over a second to import, which the sign-in page should not pay.
+    import httplib2
+    from azure.cognitiveservices.speech import SpeechConfig
+    from googleapiclient.discovery import Resource
+    from googleapiclient.http import HttpRequest
+    from openai import AsyncAzureOpenAI, AzureOpenAI
+
+OPENAI_API_VERSION = "2023-07-01-preview"
+DEFAULT_SPEECH_REGION = "francecentral"
+CALENDAR_LIST_MAX_AGE_SECONDS = 300.0
+
+
+class ClientConfigError(ValueError):
+    pass
+
+
+class ClientRegistry:
+    _lock = threading.RLock()
+    _openai_settings: tuple[str, str, str] | None = None
+    _openai_client: "AzureOpenAI | None" = None
+    _async_openai_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, AsyncAzureOpenAI]" = weakref.WeakKeyDictionary()
+    _speech_config: "SpeechConfig | None" = None
+    _calendar_services: "weakref.WeakKeyDictionary[Any, Resource]" = weakref.WeakKeyDictionary()
+    _calendar_lists: "weakref.WeakKeyDictionary[Any, tuple[float, list[dict[str, Any]]]]" = weakref.WeakKeyDictionary()
+    _thread_local = threading.local()
+
+    @staticmethod
+    def openai_settings() -> tuple[str, str, str]:
+        with ClientRegistry._lock:
+            if ClientRegistry._openai_settings is None:
+                openai_endpoint = get_env_var(EnvVars.AZURE_OPENAI_ENDPOINT)
+                openai_api_key = get_env_var(EnvVars.AZURE_OPENAI_KEY)
+                openai_deployment_name = get_env_var(EnvVars.AZURE_OPENAI_DEPLOYMENT_NAME)
+                if not openai_endpoint or not openai_api_key or not openai_deployment_name:
+                    error_msg = "[call_llm_with_functions] Missing Azure OpenAI env variables"
+                    logging.error(error_msg)
+                    raise ClientConfigError(error_msg)
+                ClientRegistry._openai_settings = (openai_endpoint, openai_api_key, openai_deployment_name)
+            return ClientRegistry._openai_settings
+
+    @staticmethod
+    def openai_client() -> "AzureOpenAI":
+        with ClientRegistry._lock:
+            if ClientRegistry._openai_client is None:
+                from openai import AzureOpenAI
+
+                openai_endpoint, openai_api_key, _ = ClientRegistry.openai_settings()
+                # One client per process: its HTTP pool keeps TLS connections alive between calls.
+                ClientRegistry._openai_client = AzureOpenAI(azure_endpoint=openai_endpoint, api_key=openai_api_key, api_version=OPENAI_API_VERSION, max_retries=0)
+                logging.info("[ClientRegistry.openai_client] Azure OpenAI client created")
+            return ClientRegistry._openai_client
+
+    @staticmethod
+    def async_openai_client() -> "AsyncAzureOpenAI":
+        # Async HTTP pools are bound to the event loop that opened them, so there is one client per loop.
+        loop = asyncio.get_running_loop()
+        with ClientRegistry._lock:
+            client = ClientRegistry._async_openai_clients.get(loop)
+            if client is None:
+                from openai import AsyncAzureOpenAI
+
+                openai_endpoint, openai_api_key, _ = ClientRegistry.openai_settings()
+                client = AsyncAzureOpenAI(azure_endpoint=openai_endpoint, api_key=openai_api_key, api_version=OPENAI_API_VERSION, max_retries=0)
+                ClientRegistry._async_openai_clients[loop] = client
+            return client
+
+    @staticmethod
+    def speech_config() -> "SpeechConfig":
+        with ClientRegistry._lock:
+            if ClientRegistry._speech_config is None:
+                from azure.cognitiveservices.speech import SpeechConfig
+
+                key = get_env_var(EnvVars.AZURE_SPEECH_KEY)
+                region = get_env_var(EnvVars.AZURE_SPEECH_REGION, default=DEFAULT_SPEECH_REGION)
+                if not key:
+                    raise ClientConfigError("[transcribe_audio] Missing Azure Speech key")
+                speech_config = SpeechConfig(subscription=key, region=region)
+                speech_config.speech_recognition_language = AzureSpeechSettings.LANGUAGE.value
+                ClientRegistry._speech_config = speech_config
+            return ClientRegistry._speech_config
+
+    @staticmethod
+    def calendar_http() -> "httplib2.Http":
+        """The calling thread's Google API connection pool; httplib2 connections must not be shared between threads."""
+        http = getattr(ClientRegistry._thread_local, "calendar_http", None)
+        if http is None:
+            from googleapiclient.http import build_http
+
+            http = ClientRegistry._thread_local.calendar_http = build_http()
+        return http
+
+    @staticmethod
+    def calendar_service(credentials: Any) -> "Resource":
+        """One Calendar service per credentials, safe to use from any thread.
+
+        The Streamlit script thread, workflow jobs and calendar prefetches use the same service (and so the same
+        event store), but each request is sent over the connection pool of the thread that executes it.
+        """
+        with ClientRegistry._lock:
+            service = ClientRegistry._calendar_services.get(credentials)
+            if service is None:
+                import google_auth_httplib2
+                from googleapiclient.discovery import build
+                from googleapiclient.http import HttpRequest
+
+                # A weak reference, so the cached service does not keep its own cache key alive.
+                credentials_ref = weakref.ref(credentials)
+
+                def build_request(http: Any, *args: Any, **kwargs: Any) -> "HttpRequest":
+                    request_credentials = credentials_ref()
+                    if request_credentials is None:
+                        raise ClientConfigError("[ClientRegistry.calendar_service] Credentials of this service were released")
+                    return HttpRequest(google_auth_httplib2.AuthorizedHttp(request_credentials, http=ClientRegistry.calendar_http()), *args, **kwargs)
+
+                # static_discovery reads the discovery document bundled with google-api-python-client instead of fetching it.
+                service = build("calendar", "v3", http=ClientRegistry.calendar_http(), requestBuilder=build_request, cache_discovery=False, static_discovery=True)
+                ClientRegistry._calendar_services[credentials] = service
+                logging.info("[ClientRegistry.calendar_service] Calendar service built")
+            return service
+
+    @staticmethod
+    def calendar_list(credentials: Any, max_age_seconds: float = CALENDAR_LIST_MAX_AGE_SECONDS) -> list[dict[str, Any]]:
+        with ClientRegistry._lock:
+            cached = ClientRegistry._calendar_lists.get(credentials)
+        if cached is not None and time.monotonic() - cached[0] < max_age_seconds:
+            return cached[1]
+        items = ClientRegistry.calendar_service(credentials).calendarList().list().execute().get("items", [])
+        with ClientRegistry._lock:
+            ClientRegistry._calendar_lists[credentials] = (time.monotonic(), items)
+        return items
+
+    @staticmethod
+    def invalidate_calendar(credentials: Any) -> None:
+        """Forget the service and calendar list built for these credentials (e.g. after a refresh request or sign-out)."""
+        with ClientRegistry._lock:
+            ClientRegistry._calendar_services.pop(credentials, None)
+            ClientRegistry._calendar_lists.pop(credentials, None)
+
+    @staticmethod
+    def prewarm() -> None:
+        try:
+            # Importing the Calendar client here keeps it off the first signed-in page load.
+            import googleapiclient.discovery  # noqa: F401
+        except ImportError as exc:
+            logging.warning(f"[ClientRegistry.prewarm] Calendar client not preloaded: {exc}")
+        try:
+            ClientRegistry.speech_config()
+        except ClientConfigError as exc:
+            logging.warning(f"[ClientRegistry.prewarm] Speech config not prewarmed: {exc}")
+        try:
+            # Opens the pooled TLS connection now so the first user request does not pay the handshake.
+            ClientRegistry.openai_client().with_options(timeout=5).models.list()
+        except Exception as exc:
+            logging.warning(f"[ClientRegistry.prewarm] Azure OpenAI connection not prewarmed: {exc}")
+
+    @staticmethod
+    def reset() -> None:
+        with ClientRegistry._lock:
+            if ClientRegistry._openai_client is not None:
+                ClientRegistry._openai_client.close()
+            ClientRegistry._openai_settings = None
+            ClientRegistry._openai_client = None
+            ClientRegistry._async_openai_clients = weakref.WeakKeyDictionary()
+            ClientRegistry._speech_config = None
+            ClientRegistry._calendar_services = weakref.WeakKeyDictionary()
+            ClientRegistry._calendar_lists = weakref.WeakKeyDictionary()
@@ -7,4 +7,25 @@ class AzureSpeechSettings(str, enum.Enum):
 
 class FunctionName(str, enum.Enum):
     CREATE_EVENT = "create_event"
+    CREATE_EVENTS = "create_events"
     LIST_EVENTS = "list_events"
+
+
+class WorkflowStage(str, enum.Enum):
+    UPLOAD = "upload"
+    TRANSCRIBE = "transcribe"
+    INTERPRET = "interpret"
+    CALENDAR = "calendar"
+
+
+class EventRange(str, enum.Enum):
+    DAY = "day"
+    WEEK = "week"
+    MONTH = "month"
+
+
+class JobStatus(str, enum.Enum):
+    QUEUED = "queued"
+    RUNNING = "running"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
@@ -1,43 +1,167 @@
 import datetime
+import hashlib
 import logging
 import time
-from typing import Any
+from collections.abc import Iterator
+from typing import TYPE_CHECKING, Any
 
-from googleapiclient.discovery import Resource
+from app.calendar_event_store import UTC, CalendarEventStore
+from app.enums import EventRange, FunctionName
 
-from app.enums import FunctionName
+
+if TYPE_CHECKING:
+    from googleapiclient.discovery import Resource
+
+
+# Only what the UI renders (see convert_gcal_to_calendar_events) is requested from the API.
+EVENT_LIST_FIELDS = "nextPageToken,items(id,summary,start,end)"
+EVENT_PAGE_SIZE = 250
+CALENDAR_BATCH_LIMIT = 50
 
 
 class GoogleCalendarIntegration:
     @staticmethod
-    def create_google_event(calendar_service: Resource, calendar_id: str, date_str: str, time_str: str, summary: str, location: str = "") -> dict[str, Any]:
-        logging.info("[create_google_event] start")
+    def event_id_for(idempotency_key: str, index: int = 0) -> str:
+        # Calendar accepts client-chosen IDs in base32hex (0-9, a-v); a hex digest fits, so a replayed insert hits 409 instead of duplicating.
+        return hashlib.sha256(f"{idempotency_key}:{index}".encode()).hexdigest()
+
+    @staticmethod
+    def is_conflict(exc: Exception) -> bool:
+        return getattr(getattr(exc, "resp", None), "status", None) == 409
+
+    @staticmethod
+    def build_event_body(date_str: str, time_str: str, summary: str, location: str = "") -> dict[str, Any]:
         date_obj = datetime.datetime.strptime(f"{date_str} {time_str}", "%Y-%m-%d %H:%M")
-        body = {
+        return {
             "summary": summary,
             "location": location,
             "start": {"dateTime": date_obj.isoformat(), "timeZone": "UTC"},
             "end": {"dateTime": (date_obj + datetime.timedelta(hours=1)).isoformat(), "timeZone": "UTC"},
         }
-        event = calendar_service.events().insert(calendarId=calendar_id, body=body).execute()
-        logging.info(f"[create_google_event] event created: {event.get('id')}")
+
+    @staticmethod
+    def create_google_event(calendar_service: "Resource", calendar_id: str, date_str: str, time_str: str, summary: str, location: str = "", event_id: str | None = None) -> dict[str, Any]:
+        logging.info("[create_google_event] start")
+        body = GoogleCalendarIntegration.build_event_body(date_str, time_str, summary, location)
+        if event_id:
+            body["id"] = event_id
+        try:
+            event = calendar_service.events().insert(calendarId=calendar_id, body=body).execute()
+            logging.info(f"[create_google_event] event created: {event.get('id')}")
+        except Exception as ex:
+            if not (event_id and GoogleCalendarIntegration.is_conflict(ex)):
+                raise
+            # An earlier attempt already created this event; return it rather than a duplicate.
+            event = calendar_service.events().get(calendarId=calendar_id, eventId=event_id).execute()
+            logging.info(f"[create_google_event] event already exists: {event_id}")
+        store = CalendarEventStore.existing(calendar_service, calendar_id)
+        if store:
+            store.upsert(event)
         return event
 
     @staticmethod
-    def list_google_events(calendar_service: Resource, calendar_id: str, date_str: str) -> list[dict[str, Any]]:
-        logging.info("[list_google_events] start")
+    def create_google_events_batch(calendar_service: "Resource", calendar_id: str, events_args: list[dict[str, Any]], idempotency_key: str | None = None) -> list[dict[str, Any]]:
+        logging.info(f"[create_google_events_batch] start ({len(events_args)} events)")
+        results: list[dict[str, Any]] = [{"index": index, "status": "pending"} for index in range(len(events_args))]
+        bodies: dict[int, dict[str, Any]] = {}
+
+        def on_response(request_id: str, response: dict[str, Any], exception: Exception | None) -> None:
+            index = int(request_id)
+            if exception is not None and idempotency_key and GoogleCalendarIntegration.is_conflict(exception):
+                results[index] = {"index": index, "status": "created", "event": bodies[index], "duplicate": True}
+            elif exception is not None:
+                results[index] = {"index": index, "status": "error", "error": str(exception)}
+            else:
+                results[index] = {"index": index, "status": "created", "event": response}
+
+        for chunk_start in range(0, len(events_args), CALENDAR_BATCH_LIMIT):
+            batch = calendar_service.new_batch_http_request(callback=on_response)
+            for index in range(chunk_start, min(chunk_start + CALENDAR_BATCH_LIMIT, len(events_args))):
+                args = events_args[index]
+                try:
+                    body = GoogleCalendarIntegration.build_event_body(args["date"], args["time"], args["title"], args.get("location", ""))
+                except (KeyError, ValueError) as ex:
+                    results[index] = {"index": index, "status": "error", "error": f"Invalid event arguments: {ex}"}
+                    continue
+                if idempotency_key:
+                    body["id"] = GoogleCalendarIntegration.event_id_for(idempotency_key, index)
+                bodies[index] = body
+                batch.add(calendar_service.events().insert(calendarId=calendar_id, body=body), request_id=str(index))
+            try:
+                batch.execute()
+            except Exception as ex:
+                # Earlier chunks are committed, so their results are kept and only this chunk's unanswered items fail.
+                logging.error(f"[create_google_events_batch] chunk at {chunk_start} failed: {ex}")
+                for index in range(chunk_start, min(chunk_start + CALENDAR_BATCH_LIMIT, len(events_args))):
+                    if results[index]["status"] == "pending":
+                        results[index] = {"index": index, "status": "error", "error": str(ex)}
+
+        store = CalendarEventStore.existing(calendar_service, calendar_id)
+        created = [result["event"] for result in results if result["status"] == "created"]
+        if store:
+            for event in created:
+                store.upsert(event)
+        logging.info(f"[create_google_events_batch] {len(created)}/{len(events_args)} events created")
+        return results
+
+    @staticmethod
+    def event_range_bounds(date_str: str, event_range: str = EventRange.DAY.value) -> tuple[datetime.datetime, datetime.datetime]:
         date_only = datetime.datetime.strptime(date_str, "%Y-%m-%d").date()
-        start_iso = date_only.strftime("%Y-%m-%dT00:00:00Z")
-        end_date = date_only + datetime.timedelta(days=1)
-        end_iso = end_date.strftime("%Y-%m-%dT00:00:00Z")
-        response = calendar_service.events().list(calendarId=calendar_id, timeMin=start_iso, timeMax=end_iso, singleEvents=True, orderBy="startTime").execute()
-        events = response.get("items", [])
+        if event_range == EventRange.WEEK.value:
+            start_date = date_only - datetime.timedelta(days=date_only.weekday())
+            end_date = start_date + datetime.timedelta(days=7)
+        elif event_range == EventRange.MONTH.value:
+            start_date = date_only.replace(day=1)
+            end_date = (start_date + datetime.timedelta(days=32)).replace(day=1)
+        else:
+            start_date = date_only
+            end_date = date_only + datetime.timedelta(days=1)
+        return (
+            datetime.datetime.combine(start_date, datetime.time.min, tzinfo=UTC),
+            datetime.datetime.combine(end_date, datetime.time.min, tzinfo=UTC),
+        )
+
+    @staticmethod
+    def iter_google_events(calendar_service: "Resource", calendar_id: str, range_start: datetime.datetime, range_end: datetime.datetime) -> Iterator[dict[str, Any]]:
+        page_token = None
+        while True:
+            response = (
+                calendar_service.events()
+                .list(
+                    calendarId=calendar_id,
+                    timeMin=range_start.strftime("%Y-%m-%dT%H:%M:%SZ"),
+                    timeMax=range_end.strftime("%Y-%m-%dT%H:%M:%SZ"),
+                    singleEvents=True,
+                    orderBy="startTime",
+                    maxResults=EVENT_PAGE_SIZE,
+                    pageToken=page_token,
+                    fields=EVENT_LIST_FIELDS,
+                )
+                .execute()
+            )
+            yield from response.get("items", [])
+            page_token = response.get("nextPageToken")
+            if not page_token:
+                return
+
+    @staticmethod
+    def list_google_events(calendar_service: "Resource", calendar_id: str, date_str: str, event_range: str = EventRange.DAY.value) -> list[dict[str, Any]]:
+        logging.info("[list_google_events] start")
+        range_start, range_end = GoogleCalendarIntegration.event_range_bounds(date_str, event_range)
+        events = list(GoogleCalendarIntegration.iter_google_events(calendar_service, calendar_id, range_start, range_end))
         logging.info(f"[list_google_events] {len(events)} events found")
-        logging.info(f"[list_google_events] events detail: {events}")
+        logging.debug(f"[list_google_events] events detail: {events}")
         return events
 
     @staticmethod
-    def perform_calendar_operation(calendar_service: Resource, calendar_id: str, function_name: str, args: dict[str, Any], max_retries: int = 3) -> Any:
+    def perform_calendar_operation(
+        calendar_service: "Resource", calendar_id: str, function_name: str, args: dict[str, Any], max_retries: int = 3, use_event_store: bool = True, idempotency_key: str | None = None
+    ) -> Any:
+        """Run the LLM-selected calendar function.
+
+        With an idempotency_key, created events get IDs derived from it, so retrying the same work (a stage retry or a
+        redelivered queue job) returns the events already created instead of inserting them again.
+        """
         logging.info("[perform_calendar_operation] start")
         attempt = 0
         while attempt < max_retries:
@@ -45,9 +169,18 @@ class GoogleCalendarIntegration:
             logging.debug(f"[perform_calendar_operation] attempt {attempt}/{max_retries}")
             try:
                 if function_name == FunctionName.CREATE_EVENT.value:
-                    return GoogleCalendarIntegration.create_google_event(calendar_service, calendar_id, args["date"], args["time"], args["title"], args.get("location", ""))
+                    event_id = GoogleCalendarIntegration.event_id_for(idempotency_key) if idempotency_key else None
+                    return GoogleCalendarIntegration.create_google_event(calendar_service, calendar_id, args["date"], args["time"], args["title"], args.get("location", ""), event_id=event_id)
+                if function_name == FunctionName.CREATE_EVENTS.value:
+                    return GoogleCalendarIntegration.create_google_events_batch(calendar_service, calendar_id, args.get("events", []), idempotency_key=idempotency_key)
                 if function_name == FunctionName.LIST_EVENTS.value:
-                    return GoogleCalendarIntegration.list_google_events(calendar_service, calendar_id, args["date"])
+                    event_range = args.get("range", EventRange.DAY.value)
+                    if use_event_store:
+                        range_start, range_end = GoogleCalendarIntegration.event_range_bounds(args["date"], event_range)
+                        events = CalendarEventStore.for_calendar(calendar_service, calendar_id).list_range(range_start, range_end)
+                        if events is not None:
+                            return events
+                    return GoogleCalendarIntegration.list_google_events(calendar_service, calendar_id, args["date"], event_range)
                 logging.warning(f"[perform_calendar_operation] unknown function_name: {function_name}")
                 return {}
             except Exception as ex:
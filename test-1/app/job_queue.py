@@ -0,0 +1,205 @@
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Any
+
+from app.enums import JobStatus
+
+
+DEFAULT_QUEUE_PATH = os.path.join(".cache", "jobs.sqlite3")
+DEFAULT_VISIBILITY_TIMEOUT_SECONDS = 300.0
+DEFAULT_MAX_ATTEMPTS = 3
+RETRY_BACKOFF_SECONDS = 5.0
+MAX_RETRY_BACKOFF_SECONDS = 300.0
+TERMINAL_STATUSES = (JobStatus.SUCCEEDED.value, JobStatus.FAILED.value)
+
+
+def remove_quietly(path: str | None) -> None:
+    if path and os.path.isfile(path):
+        try:
+            os.remove(path)
+        except OSError as ex:
+            logging.warning(f"[remove_quietly] Cannot remove {path}: {ex}")
+
+
+class JobQueue:
+    """SQLite job queue shared by the submission API and the worker processes.
+
+    Delivery is at least once: a claimed job is leased to one worker for visibility_timeout_seconds, and a worker
+    that dies or stops heart-beating lets the lease lapse so another worker claims the job again. Work must
+    therefore be safe to repeat, which is why workers pass the job ID as the workflow idempotency key.
+
+    payload["audio_path"], when set, is an upload owned by the job: it is removed when the queue itself ends the
+    job (lease lapsed on its last attempt) and when finished jobs are purged.
+    """
+
+    def __init__(self, db_path: str = DEFAULT_QUEUE_PATH, visibility_timeout_seconds: float = DEFAULT_VISIBILITY_TIMEOUT_SECONDS, max_attempts: int = DEFAULT_MAX_ATTEMPTS):
+        self.db_path = db_path
+        self.visibility_timeout_seconds = visibility_timeout_seconds
+        self.max_attempts = max_attempts
+        self._lock = threading.Lock()
+        if os.path.dirname(db_path):
+            os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        # Several processes share the file; timeout makes writers wait for each other's short transactions.
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None, timeout=30.0)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            "job_id TEXT PRIMARY KEY, idempotency_key TEXT UNIQUE, status TEXT NOT NULL, stage TEXT, payload TEXT NOT NULL, checkpoints TEXT NOT NULL DEFAULT '{}', "
+            "result TEXT, error TEXT, attempts INTEGER NOT NULL DEFAULT 0, max_attempts INTEGER NOT NULL, available_at REAL NOT NULL, "
+            "lease_owner TEXT, lease_expires_at REAL, created_at REAL NOT NULL, updated_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_status_available ON jobs(status, available_at)")
+
+    @staticmethod
+    def _to_job(row: sqlite3.Row | None) -> dict[str, Any] | None:
+        if row is None:
+            return None
+        job = dict(row)
+        job["payload"] = json.loads(job["payload"])
+        job["checkpoints"] = json.loads(job["checkpoints"])
+        job["result"] = json.loads(job["result"]) if job["result"] is not None else None
+        return job
+
+    def get(self, job_id: str) -> dict[str, Any] | None:
+        with self._lock:
+            return JobQueue._to_job(self._conn.execute("SELECT * FROM jobs WHERE job_id = ?", (job_id,)).fetchone())
+
+    def enqueue(self, payload: dict[str, Any], idempotency_key: str | None = None, job_id: str | None = None) -> tuple[dict[str, Any], bool]:
+        """Return (job, created); a known idempotency_key returns the job it first created."""
+        job_id = job_id or uuid.uuid4().hex
+        now = time.time()
+        with self._lock:
+            try:
+                self._conn.execute(
+                    "INSERT INTO jobs (job_id, idempotency_key, status, payload, max_attempts, available_at, created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (job_id, idempotency_key, JobStatus.QUEUED.value, json.dumps(payload), self.max_attempts, now, now, now),
+                )
+            except sqlite3.IntegrityError:
+                if idempotency_key is None:
+                    raise
+                existing = self._conn.execute("SELECT * FROM jobs WHERE idempotency_key = ?", (idempotency_key,)).fetchone()
+                logging.info(f"[JobQueue.enqueue] Idempotency key already used by job {existing['job_id']}")
+                return JobQueue._to_job(existing), False
+            job = JobQueue._to_job(self._conn.execute("SELECT * FROM jobs WHERE job_id = ?", (job_id,)).fetchone())
+        logging.info(f"[JobQueue.enqueue] Job {job_id} queued")
+        return job, True
+
+    def claim(self, worker_id: str) -> dict[str, Any] | None:
+        """Lease the oldest runnable job (queued, or running with a lapsed lease) to worker_id."""
+        while True:
+            now = time.time()
+            with self._lock:
+                # BEGIN IMMEDIATE takes the write lock up front, so two workers never lease the same row.
+                self._conn.execute("BEGIN IMMEDIATE")
+                try:
+                    row = self._conn.execute(
+                        "SELECT job_id, attempts, max_attempts, status, payload FROM jobs WHERE (status = ? AND available_at <= ?) OR (status = ? AND lease_expires_at <= ?) ORDER BY available_at LIMIT 1",
+                        (JobStatus.QUEUED.value, now, JobStatus.RUNNING.value, now),
+                    ).fetchone()
+                    if row is None:
+                        self._conn.execute("COMMIT")
+                        return None
+                    if row["attempts"] >= row["max_attempts"]:
+                        # Only reachable through a lapsed lease: the last attempt's worker died without reporting.
+                        self._conn.execute(
+                            "UPDATE jobs SET status = ?, error = ?, lease_owner = NULL, lease_expires_at = NULL, updated_at = ? WHERE job_id = ?",
+                            (JobStatus.FAILED.value, f"Lease expired after {row['attempts']} attempts", now, row["job_id"]),
+                        )
+                        self._conn.execute("COMMIT")
+                        logging.warning(f"[JobQueue.claim] Job {row['job_id']} failed: lease expired on its last attempt")
+                        # Its worker died, so nobody else will remove the upload.
+                        remove_quietly(json.loads(row["payload"]).get("audio_path"))
+                        continue
+                    if row["status"] == JobStatus.RUNNING.value:
+                        logging.warning(f"[JobQueue.claim] Lease on job {row['job_id']} expired, redelivering")
+                    self._conn.execute(
+                        "UPDATE jobs SET status = ?, attempts = attempts + 1, lease_owner = ?, lease_expires_at = ?, updated_at = ? WHERE job_id = ?",
+                        (JobStatus.RUNNING.value, worker_id, now + self.visibility_timeout_seconds, now, row["job_id"]),
+                    )
+                    job = JobQueue._to_job(self._conn.execute("SELECT * FROM jobs WHERE job_id = ?", (row["job_id"],)).fetchone())
+                    self._conn.execute("COMMIT")
+                except Exception:
+                    self._conn.execute("ROLLBACK")
+                    raise
+            logging.info(f"[JobQueue.claim] Job {job['job_id']} leased to {worker_id} (attempt {job['attempts']}/{job['max_attempts']})")
+            return job
+
+    def _update_leased(self, job_id: str, worker_id: str, assignments: str, values: tuple) -> bool:
+        # Every worker-side write is conditional on still holding the lease; a worker whose lease lapsed
+        # and was re-granted elsewhere must not overwrite the new owner's state.
+        with self._lock:
+            cursor = self._conn.execute(
+                f"UPDATE jobs SET {assignments}, updated_at = ? WHERE job_id = ? AND status = ? AND lease_owner = ?",
+                (*values, time.time(), job_id, JobStatus.RUNNING.value, worker_id),
+            )
+        return cursor.rowcount == 1
+
+    def heartbeat(self, job_id: str, worker_id: str) -> bool:
+        return self._update_leased(job_id, worker_id, "lease_expires_at = ?", (time.time() + self.visibility_timeout_seconds,))
+
+    def record_progress(self, job_id: str, worker_id: str, stage: str, checkpoints: dict[str, Any]) -> bool:
+        """Store the current stage and the stage outputs a redelivered attempt can resume from; also extends the lease."""
+        return self._update_leased(job_id, worker_id, "stage = ?, checkpoints = ?, lease_expires_at = ?", (stage, json.dumps(checkpoints, default=str), time.time() + self.visibility_timeout_seconds))
+
+    def complete(self, job_id: str, worker_id: str, result: dict[str, Any]) -> bool:
+        done = self._update_leased(job_id, worker_id, "status = ?, result = ?, error = NULL, lease_owner = NULL, lease_expires_at = NULL", (JobStatus.SUCCEEDED.value, json.dumps(result, default=str)))
+        if done:
+            logging.info(f"[JobQueue.complete] Job {job_id} succeeded")
+        else:
+            logging.warning(f"[JobQueue.complete] Job {job_id} is no longer leased to {worker_id}; result dropped")
+        return done
+
+    def fail(self, job_id: str, worker_id: str, error: str, retryable: bool = True) -> str | None:
+        """Requeue the job with backoff while attempts remain, otherwise mark it failed; returns the new status."""
+        job = self.get(job_id)
+        if job is None:
+            return None
+        if retryable and job["attempts"] < job["max_attempts"]:
+            delay = min(RETRY_BACKOFF_SECONDS * 2 ** (job["attempts"] - 1), MAX_RETRY_BACKOFF_SECONDS)
+            status = JobStatus.QUEUED.value
+            assignments, values = "status = ?, error = ?, available_at = ?, lease_owner = NULL, lease_expires_at = NULL", (status, error, time.time() + delay)
+        else:
+            status = JobStatus.FAILED.value
+            assignments, values = "status = ?, error = ?, lease_owner = NULL, lease_expires_at = NULL", (status, error)
+        if not self._update_leased(job_id, worker_id, assignments, values):
+            logging.warning(f"[JobQueue.fail] Job {job_id} is no longer leased to {worker_id}; failure dropped")
+            return None
+        logging.info(f"[JobQueue.fail] Job {job_id} {status} after attempt {job['attempts']}/{job['max_attempts']}: {error}")
+        return status
+
+    def purge_finished(self, max_age_seconds: float) -> int:
+        """Delete jobs finished more than max_age_seconds ago, with any upload they still hold."""
+        condition = f"status IN ({', '.join('?' for _ in TERMINAL_STATUSES)}) AND updated_at < ?"
+        values = (*TERMINAL_STATUSES, time.time() - max_age_seconds)
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                payloads = [json.loads(row["payload"]) for row in self._conn.execute(f"SELECT payload FROM jobs WHERE {condition}", values)]
+                self._conn.execute(f"DELETE FROM jobs WHERE {condition}", values)
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        for payload in payloads:
+            # Normally removed when the job finished; left behind if its worker stopped before cleaning up.
+            remove_quietly(payload.get("audio_path"))
+        if payloads:
+            logging.info(f"[JobQueue.purge_finished] Removed {len(payloads)} finished jobs")
+        return len(payloads)
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            rows = self._conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall()
+        counts = {status.value: 0 for status in JobStatus}
+        counts.update(dict(rows))
+        return counts
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
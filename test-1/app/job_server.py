@@ -0,0 +1,255 @@
+import argparse
+import http.server
+import json
+import logging
+import multiprocessing
+import os
+import signal
+import socket
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from typing import TYPE_CHECKING, Any
+from urllib.parse import parse_qs, urlparse
+
+from app.audio_spool import get_audio_spool
+from app.enums import JobStatus, WorkflowStage
+from app.job_queue import DEFAULT_MAX_ATTEMPTS, DEFAULT_QUEUE_PATH, DEFAULT_VISIBILITY_TIMEOUT_SECONDS, JobQueue, remove_quietly
+from app.metrics import install_log_correlation
+
+
+if TYPE_CHECKING:
+    from googleapiclient.discovery import Resource
+
+
+DEFAULT_SPOOL_DIR = os.path.join(".cache", "job_audio")
+MAX_UPLOAD_BYTES = 100 * 1024 * 1024
+POLL_INTERVAL_SECONDS = 1.0
+SUPERVISOR_INTERVAL_SECONDS = 5.0
+PURGE_INTERVAL_SECONDS = 3600.0
+SHUTDOWN_GRACE_SECONDS = 30.0
+# Only outputs that stay valid in another process are checkpointed: the upload stage yields a local WAV path.
+DURABLE_STAGES = (WorkflowStage.TRANSCRIBE.value, WorkflowStage.INTERPRET.value)
+LOG_FORMAT = "%(asctime)s %(levelname)s %(processName)s [%(correlation_id)s] %(message)s"
+
+
+def configure_logging() -> None:
+    install_log_correlation()
+    logging.basicConfig(level=logging.INFO, stream=sys.stderr, format=LOG_FORMAT)
+
+
+def public_job(job: dict[str, Any]) -> dict[str, Any]:
+    return {
+        "job_id": job["job_id"],
+        "status": job["status"],
+        "stage": job["stage"],
+        "attempts": job["attempts"],
+        "max_attempts": job["max_attempts"],
+        "calendar_id": job["payload"].get("calendar_id"),
+        "result": job["result"],
+        "error": job["error"],
+        "created_at": job["created_at"],
+        "updated_at": job["updated_at"],
+    }
+
+
+def store_upload(spool_dir: str, job_id: str, data: bytes) -> str:
+    os.makedirs(spool_dir, exist_ok=True)
+    path = os.path.join(spool_dir, f"{job_id}.audio")
+    fd, partial_path = tempfile.mkstemp(dir=spool_dir, suffix=".part")
+    with os.fdopen(fd, "wb") as partial_file:
+        partial_file.write(data)
+    os.replace(partial_path, path)
+    return path
+
+
+def serve_api(queue: JobQueue, spool_dir: str, calendar_id: str, port: int, host: str = "127.0.0.1") -> http.server.ThreadingHTTPServer:
+    """POST /jobs (raw audio body) -> 202 {job_id}; GET /jobs/<id> -> status and result; GET /queue -> counts by status."""
+
+    class JobApiHandler(http.server.BaseHTTPRequestHandler):
+        def send_json(self, status: int, body: dict[str, Any], headers: dict[str, str] | None = None) -> None:
+            payload = json.dumps(body, ensure_ascii=False, default=str).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+            self.send_header("Content-Length", str(len(payload)))
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def do_POST(self):  # noqa: N802
+            url = urlparse(self.path)
+            if url.path != "/jobs":
+                self.send_json(404, {"error": "Not found"})
+                return
+            length = int(self.headers.get("Content-Length") or 0)
+            if length <= 0:
+                self.send_json(411, {"error": "A non-empty body with Content-Length is required"})
+                return
+            if length > MAX_UPLOAD_BYTES:
+                self.send_json(413, {"error": f"Audio larger than {MAX_UPLOAD_BYTES} bytes"})
+                return
+            data = self.rfile.read(length)
+            target_calendar = parse_qs(url.query).get("calendar_id", [calendar_id])[0]
+            job_id = uuid.uuid4().hex
+            audio_path = store_upload(spool_dir, job_id, data)
+            job, created = queue.enqueue({"audio_path": audio_path, "calendar_id": target_calendar}, idempotency_key=self.headers.get("Idempotency-Key") or None, job_id=job_id)
+            if not created:
+                remove_quietly(audio_path)
+            self.send_json(202 if created else 200, public_job(job), {"Location": f"/jobs/{job['job_id']}"})
+
+        def do_GET(self):  # noqa: N802
+            path = urlparse(self.path).path.rstrip("/")
+            if path == "/queue":
+                self.send_json(200, queue.stats())
+                return
+            if path.startswith("/jobs/"):
+                job = queue.get(path[len("/jobs/") :])
+                if job is not None:
+                    self.send_json(200, public_job(job))
+                    return
+            self.send_json(404, {"error": "Not found"})
+
+        def log_message(self, *args):
+            return
+
+    server = http.server.ThreadingHTTPServer((host, port), JobApiHandler)
+    threading.Thread(target=server.serve_forever, daemon=True, name="job-api").start()
+    logging.info(f"[serve_api] Job API on http://{host}:{server.server_port}/jobs")
+    return server
+
+
+def process_job(queue: JobQueue, job: dict[str, Any], worker_id: str, calendar_service: "Resource") -> None:
+    from app.audio_upload import AudioUploadError
+    from app.google_auth import AuthError
+    from app.workflow_orchestrator import WorkflowError, WorkflowOrchestrator
+
+    job_id = job["job_id"]
+    audio_path = job["payload"]["audio_path"]
+    checkpoints = dict(job["checkpoints"])
+    finished = threading.Event()
+
+    def keep_lease() -> None:
+        while not finished.wait(queue.visibility_timeout_seconds / 3):
+            if not queue.heartbeat(job_id, worker_id):
+                logging.warning(f"[process_job] Lost the lease on job {job_id}; another worker may redeliver it")
+                return
+
+    def on_stage(stage: str) -> None:
+        queue.record_progress(job_id, worker_id, stage, {name: value for name, value in checkpoints.items() if name in DURABLE_STAGES})
+
+    threading.Thread(target=keep_lease, daemon=True, name=f"lease-{job_id[:8]}").start()
+    status: str | None = None
+    try:
+        # The job ID doubles as the Calendar idempotency key: a redelivered job re-derives the same event IDs.
+        result = WorkflowOrchestrator.orchestrate_workflow(audio_path, calendar_service, job["payload"]["calendar_id"], checkpoints=checkpoints, on_stage=on_stage, idempotency_key=job_id)
+        status = JobStatus.SUCCEEDED.value if queue.complete(job_id, worker_id, result) else None
+    except WorkflowError as ex:
+        retryable = not isinstance(ex.__cause__, (AudioUploadError, AuthError))
+        status = queue.fail(job_id, worker_id, str(ex), retryable=retryable)
+    except Exception as ex:
+        logging.exception(f"[process_job] Job {job_id} crashed")
+        status = queue.fail(job_id, worker_id, f"{type(ex).__name__}: {ex}")
+    finally:
+        finished.set()
+        # Normalized WAVs live in the shared audio spool (possibly used by another job with the same audio);
+        # its collector reclaims them, only the submitted upload belongs to this job.
+        if status in (JobStatus.SUCCEEDED.value, JobStatus.FAILED.value):
+            remove_quietly(audio_path)
+
+
+def run_worker(db_path: str, token_file: str, visibility_timeout_seconds: float) -> None:
+    configure_logging()
+    # Ctrl+C reaches the whole process group; workers leave shutdown to the supervisor's SIGTERM.
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    stop = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *_: stop.set())
+
+    from app.batch import load_calendar_service
+    from app.clients import ClientRegistry
+
+    ClientRegistry.prewarm()
+    calendar_service = load_calendar_service(token_file)
+    queue = JobQueue(db_path, visibility_timeout_seconds)
+    worker_id = f"{socket.gethostname()}:{os.getpid()}"
+    logging.info(f"[run_worker] Worker {worker_id} polling {db_path}")
+    while not stop.is_set():
+        job = queue.claim(worker_id)
+        if job is None:
+            stop.wait(POLL_INTERVAL_SECONDS)
+            continue
+        process_job(queue, job, worker_id, calendar_service)
+    queue.close()
+    logging.info(f"[run_worker] Worker {worker_id} stopped")
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Serve the CareCall job API and run workflow jobs from a durable SQLite queue in worker processes.")
+    parser.add_argument("--db", default=DEFAULT_QUEUE_PATH, help="SQLite queue file, shared by every API and worker process")
+    parser.add_argument("--spool-dir", default=DEFAULT_SPOOL_DIR, help="Where uploaded audio waits for its job")
+    parser.add_argument("--token-file", help="Google authorized-user token JSON (required when running workers)")
+    parser.add_argument("--calendar-id", default="primary", help="Calendar used when a submission does not pass ?calendar_id=")
+    parser.add_argument("--workers", type=int, default=2, help="Worker processes (0 to only serve the API)")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8600)
+    parser.add_argument("--no-api", action="store_true", help="Only run workers, e.g. to add capacity next to a running server")
+    parser.add_argument("--visibility-timeout", type=float, default=DEFAULT_VISIBILITY_TIMEOUT_SECONDS, help="Seconds a silent worker keeps a job before it is redelivered")
+    parser.add_argument("--max-attempts", type=int, default=DEFAULT_MAX_ATTEMPTS)
+    parser.add_argument("--retention-hours", type=float, default=168.0, help="Finished jobs are deleted after this many hours")
+    args = parser.parse_args(argv)
+    if args.workers > 0 and not args.token_file:
+        parser.error("--token-file is required when --workers > 0")
+    if args.no_api and args.workers <= 0:
+        parser.error("--no-api needs at least one worker")
+    return args
+
+
+def main(argv: list[str] | None = None) -> int:
+    configure_logging()
+    args = parse_args(argv)
+    queue = JobQueue(args.db, args.visibility_timeout, args.max_attempts)
+    # One collector for the box: workers share the spool directory and only pin what they use.
+    get_audio_spool().start_collector()
+    server = None if args.no_api else serve_api(queue, args.spool_dir, args.calendar_id, args.port, args.host)
+    context = multiprocessing.get_context("spawn")
+    workers: list[multiprocessing.Process] = []
+
+    def start_worker(index: int) -> multiprocessing.Process:
+        process = context.Process(target=run_worker, args=(args.db, args.token_file, args.visibility_timeout), name=f"job-worker-{index}", daemon=True)
+        process.start()
+        return process
+
+    stop = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *_: stop.set())
+    workers.extend(start_worker(index) for index in range(args.workers))
+    next_purge = time.monotonic()
+    try:
+        while not stop.wait(SUPERVISOR_INTERVAL_SECONDS):
+            for index, process in enumerate(workers):
+                if not process.is_alive():
+                    # Its leased job, if any, is redelivered once the visibility timeout lapses.
+                    logging.warning(f"[main] {process.name} exited with code {process.exitcode}, restarting")
+                    workers[index] = start_worker(index)
+            if time.monotonic() >= next_purge:
+                queue.purge_finished(args.retention_hours * 3600)
+                next_purge = time.monotonic() + PURGE_INTERVAL_SECONDS
+    except KeyboardInterrupt:
+        pass
+    finally:
+        logging.info("[main] Shutting down")
+        if server:
+            server.shutdown()
+        for process in workers:
+            process.terminate()
+        for process in workers:
+            process.join(SHUTDOWN_GRACE_SECONDS)
+            if process.is_alive():
+                process.kill()
+        queue.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
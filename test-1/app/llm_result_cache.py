@@ -0,0 +1,120 @@
+import copy
+import datetime
+import logging
+import re
+import threading
+import unicodedata
+from collections import OrderedDict
+from typing import Any
+
+
+DEFAULT_MAX_ENTRIES = 4096
+NUMBER_WORDS = {
+    "zero": "0",
+    "un": "1",
+    "une": "1",
+    "deux": "2",
+    "trois": "3",
+    "quatre": "4",
+    "cinq": "5",
+    "six": "6",
+    "sept": "7",
+    "huit": "8",
+    "neuf": "9",
+    "dix": "10",
+    "onze": "11",
+    "douze": "12",
+    "treize": "13",
+    "quatorze": "14",
+    "quinze": "15",
+    "seize": "16",
+    "dix-sept": "17",
+    "dix-huit": "18",
+    "dix-neuf": "19",
+    "vingt": "20",
+    "vingt et une": "21",
+    "vingt et un": "21",
+    "vingt-deux": "22",
+    "vingt-trois": "23",
+    "trente": "30",
+    "quarante-cinq": "45",
+}
+_NUMBER_WORD_PATTERN = re.compile(r"\b(?:" + "|".join(sorted(map(re.escape, NUMBER_WORDS), key=len, reverse=True)) + r")\b")
+_HOUR_PATTERN = re.compile(r"\b0*(\d{1,2})\s*(?:h|heures?|:)\s*(?:0*(\d{1,2}))?\b")
+
+
+class LLMResultCache:
+    """In-memory LRU of function-call results, keyed on the normalized transcript and the date given to the LLM."""
+
+    def __init__(self, max_entries: int = DEFAULT_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[str, dict[str, Any]] = OrderedDict()
+        self._day: datetime.date | None = None
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def normalize_transcript(text: str) -> str:
+        folded = unicodedata.normalize("NFC", text).lower().replace("’", "'")
+        folded = re.sub(r"[^\w:'-]+|(?<!\w)['-]|['-](?!\w)", " ", folded)
+        folded = _NUMBER_WORD_PATTERN.sub(lambda match: NUMBER_WORDS[match.group(0)], folded)
+        folded = _HOUR_PATTERN.sub(lambda match: f"{int(match.group(1))}h{int(match.group(2)):02d}" if match.group(2) and int(match.group(2)) else f"{int(match.group(1))}h", folded)
+        return " ".join(folded.replace("'", " ").split())
+
+    def _roll_over(self, today: datetime.date) -> None:
+        # Relative dates ("demain") resolve against today, so nothing survives a change of day.
+        if today != self._day:
+            self._entries.clear()
+            self._day = today
+
+    def get(self, text: str, today: datetime.date) -> dict[str, Any] | None:
+        key = LLMResultCache.normalize_transcript(text)
+        with self._lock:
+            self._roll_over(today)
+            result = self._entries.get(key)
+            if result is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+        logging.info(f"[LLMResultCache.get] Cache hit for '{key}'")
+        return copy.deepcopy(result)
+
+    def put(self, text: str, today: datetime.date, result: dict[str, Any]) -> None:
+        # Free-text answers are not cached: only function calls are deterministic enough to replay.
+        if "function_name" not in result:
+            return
+        key = LLMResultCache.normalize_transcript(text)
+        with self._lock:
+            self._roll_over(today)
+            self._entries[key] = copy.deepcopy(result)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict[str, float]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+            }
+
+
+_default_cache: LLMResultCache | None = None
+_default_cache_lock = threading.Lock()
+
+
+def get_llm_result_cache() -> LLMResultCache:
+    global _default_cache
+    with _default_cache_lock:
+        if _default_cache is None:
+            _default_cache = LLMResultCache()
+        return _default_cache
@@ -0,0 +1,206 @@
+import calendar
+import datetime
+import logging
+import re
+import unicodedata
+from typing import Any
+
+from app.enums import EventRange, FunctionName
+
+
+MONTHS = {
+    "janvier": 1,
+    "fevrier": 2,
+    "mars": 3,
+    "avril": 4,
+    "mai": 5,
+    "juin": 6,
+    "juillet": 7,
+    "aout": 8,
+    "septembre": 9,
+    "octobre": 10,
+    "novembre": 11,
+    "decembre": 12,
+}
+WEEKDAYS = {"lundi": 0, "mardi": 1, "mercredi": 2, "jeudi": 3, "vendredi": 4, "samedi": 5, "dimanche": 6}
+RELATIVE_DAYS = {"avant-hier": -2, "avant hier": -2, "hier": -1, "aujourd'hui": 0, "aujourd hui": 0, "demain": 1, "apres-demain": 2, "apres demain": 2}
+
+_MONTH_ALT = "|".join(MONTHS)
+_WEEKDAY_ALT = "|".join(WEEKDAYS)
+_RELATIVE_ALT = "|".join(sorted(RELATIVE_DAYS, key=len, reverse=True))
+
+# Patterns run on text folded by _fold (lowercase, no accents, straight apostrophes), which keeps
+# character offsets aligned with the original transcript.
+DATE_PATTERN = re.compile(
+    rf"\b(?:le\s+)?(?:(?:{_WEEKDAY_ALT})\s+)?(?P<day>1er|\d{{1,2}})\s+(?P<month>{_MONTH_ALT})(?:\s+(?P<year>\d{{4}}))?\b"
+    rf"|\b(?:le\s+)?(?P<num_day>\d{{1,2}})/(?P<num_month>\d{{1,2}})(?:/(?P<num_year>\d{{4}}))?\b"
+    rf"|\b(?P<relative>{_RELATIVE_ALT})\b"
+    rf"|\b(?:(?:ce|le)\s+)?(?P<weekday>{_WEEKDAY_ALT})(?P<next_weekday>\s+prochain)?\b"
+    rf"|\b(?P<this_range>cette\s+semaine|ce\s+mois(?:-ci)?)\b"
+    rf"|\b(?:la\s+|le\s+)?(?P<next_range>semaine|mois)\s+prochaine?\b"
+)
+TIME_PATTERN = re.compile(
+    r"\b(?:a\s+|vers\s+)?(?:(?P<hour>\d{1,2})\s*(?:h|heures?|:)\s*(?P<minute>\d{2})?|(?P<named>midi|minuit))"
+    r"(?:\s+et\s+(?P<fraction>demie?|quart))?"
+    r"(?:\s+(?P<period>du matin|de l'apres-midi|de l'apres midi|du soir))?(?![\w/])"
+)
+CREATE_VERBS = ("cree creer creez ajoute ajouter ajoutez planifie planifier programme programmer reserve reserver prends prendre note noter mets mettre fixe fixer cale caler bloque bloquer").split()
+CREATE_PATTERN = re.compile(rf"\b(?:{'|'.join(CREATE_VERBS)})\b")
+LIST_PATTERN = re.compile(
+    r"\b(?:qu'est-ce que j'ai|qu'est ce que j'ai|qu'ai-je|quels sont mes|quelles sont mes|liste|lister|montre|montre-moi|affiche|afficher|ai-je|est-ce que j'ai"
+    r"|mon agenda|mon planning|mes rendez-vous|mes rdv|mes evenements)\b"
+)
+UNSUPPORTED_PATTERN = re.compile(
+    r"\b(?:annule|annuler|supprime|supprimer|efface|effacer|deplace|deplacer|decale|decaler|modifie|modifier|change|changer"
+    r"|chaque|tous les|toutes les|pendant|dans|jusqu'a|jusqu'au|et le|et la|puis|combien|pourquoi|comment)\b"
+)
+EVENT_NOUN_PATTERN = re.compile(r"\b(?:rendez-vous|rendez vous|rdv|reunion|consultation|seance|cours|appel|dejeuner|diner|visite|entretien|rencontre|anniversaire)\b")
+WORD_PATTERN = re.compile(r"[a-z]+(?:-[a-z]+)*'?")
+# A create command is only resolved locally when every word is accounted for: before the event noun only the verb,
+# articles and politeness; after it at most one complement such as "chez le dentiste" or "avec Julie".
+LEADING_WORDS = frozenset(CREATE_VERBS) | frozenset(
+    "un une le la l' mon ma nouveau nouvelle moi me m' nous je j' tu vous veux voudrais peux pourrais peux-tu pourrais-tu est-ce que s' il te plait stp svp merci bonjour".split()
+)
+COMPLEMENT_LINKS = frozenset("chez avec a au aux pour de du des d' en sur".split())
+CLAUSE_WORDS = frozenset("si s' sauf sinon mais ou et que qu' qui quand lorsque je j' tu il elle on nous vous ne n' pas plus seulement uniquement deja avant apres".split())
+MAX_COMPLEMENT_WORDS = 4
+POLITENESS_PATTERN = re.compile(r"\b(?:s'il te plait|s'il vous plait|stp|svp|merci)\b")
+LEADING_FILLER_PATTERN = re.compile(r"(?:\W+|(?:le|la|les|un|une|a|au|et|de)\b)+")
+TRAILING_FILLER_PATTERN = re.compile(r"(?:\W+|\b(?:le|la|les|a|au|pour|et|de|s'il te plait|s'il vous plait|stp|merci))+$")
+
+
+class LocalIntentParser:
+    @staticmethod
+    def _fold(text: str) -> str:
+        # One output character per input character, so match offsets index the original text too.
+        folded = [unicodedata.normalize("NFD", char.lower())[0] for char in text]
+        return "".join(folded).replace("’", "'")
+
+    @staticmethod
+    def _match_date(match: re.Match, today: datetime.date) -> tuple[datetime.date, str | None]:
+        if match["day"]:
+            day = 1 if match["day"] == "1er" else int(match["day"])
+            return datetime.date(int(match["year"] or today.year), MONTHS[match["month"]], day), None
+        if match["num_day"]:
+            return datetime.date(int(match["num_year"] or today.year), int(match["num_month"]), int(match["num_day"])), None
+        if match["relative"]:
+            return today + datetime.timedelta(days=RELATIVE_DAYS[match["relative"]]), None
+        if match["weekday"]:
+            days_ahead = (WEEKDAYS[match["weekday"]] - today.weekday()) % 7
+            if match["next_weekday"]:
+                days_ahead = days_ahead or 7
+            return today + datetime.timedelta(days=days_ahead), None
+        if match["this_range"]:
+            return today, EventRange.WEEK.value if "semaine" in match["this_range"] else EventRange.MONTH.value
+        if match["next_range"] == "semaine":
+            return today + datetime.timedelta(days=7), EventRange.WEEK.value
+        return today.replace(day=calendar.monthrange(today.year, today.month)[1]) + datetime.timedelta(days=1), EventRange.MONTH.value
+
+    @staticmethod
+    def _match_time(match: re.Match) -> str:
+        if match["named"]:
+            hour, minute = (12 if match["named"] == "midi" else 0), 0
+        else:
+            hour, minute = int(match["hour"]), int(match["minute"] or 0)
+        if match["fraction"]:
+            minute += 15 if match["fraction"] == "quart" else 30
+        if match["period"] in ("de l'apres-midi", "de l'apres midi", "du soir") and hour < 12:
+            hour += 12
+        return datetime.time(hour, minute).strftime("%H:%M")
+
+    @staticmethod
+    def _extract_title(text: str, folded: str, spans: list[tuple[int, int]]) -> str:
+        noun = EVENT_NOUN_PATTERN.search(folded)
+        if not noun:
+            return ""
+        fragments = []
+        cursor = noun.start()
+        for span_start, span_end in sorted(spans):
+            if span_end <= cursor:
+                continue
+            fragments.append((cursor, max(span_start, cursor)))
+            cursor = span_end
+        fragments.append((cursor, len(text)))
+        parts = []
+        for start, end in fragments:
+            leading = LEADING_FILLER_PATTERN.match(folded, start, end)
+            trailing = TRAILING_FILLER_PATTERN.search(folded, start, end)
+            part_start = leading.end() if leading else start
+            part_end = trailing.start() if trailing else end
+            if part_start < part_end:
+                parts.append(text[part_start:part_end])
+        title = " ".join(part for part in parts if part)
+        return title[:1].upper() + title[1:]
+
+    @staticmethod
+    def _has_unknown_words(leftover: str) -> bool:
+        """Whether a create command, with its date and time blanked out, says more than the title the parser extracts."""
+        noun = EVENT_NOUN_PATTERN.search(leftover)
+        if not noun or any(word not in LEADING_WORDS for word in WORD_PATTERN.findall(leftover, 0, noun.start())):
+            return True
+        words = WORD_PATTERN.findall(POLITENESS_PATTERN.sub(" ", leftover[noun.end() :]))
+        if not words:
+            return False
+        return words[0] not in COMPLEMENT_LINKS or len(words) > MAX_COMPLEMENT_WORDS or any(word in CLAUSE_WORDS for word in words[1:])
+
+    @staticmethod
+    def list_candidates(text: str, today: datetime.date | None = None) -> list[tuple[str, str]]:
+        """(date, range) pairs a list_events call for this transcript would likely ask for; empty for create commands."""
+        today = today or datetime.date.today()
+        folded = LocalIntentParser._fold(text.strip())
+        if CREATE_PATTERN.search(folded):
+            return []
+        candidates = []
+        for match in DATE_PATTERN.finditer(folded):
+            try:
+                event_date, event_range = LocalIntentParser._match_date(match, today)
+            except ValueError:
+                continue
+            candidate = (event_date.strftime("%Y-%m-%d"), event_range or EventRange.DAY.value)
+            if candidate not in candidates:
+                candidates.append(candidate)
+        return candidates
+
+    @staticmethod
+    def parse(text: str, today: datetime.date | None = None) -> dict[str, Any] | None:
+        """Return the LLM-shaped function call for a simple command, or None when the LLM should decide."""
+        today = today or datetime.date.today()
+        folded = LocalIntentParser._fold(text.strip())
+        if not folded or UNSUPPORTED_PATTERN.search(folded):
+            return None
+        wants_create = CREATE_PATTERN.search(folded) is not None
+        wants_list = LIST_PATTERN.search(folded) is not None
+        if wants_create == wants_list:
+            return None
+
+        date_matches = list(DATE_PATTERN.finditer(folded))
+        time_matches = list(TIME_PATTERN.finditer(folded))
+        if len(date_matches) > 1 or len(time_matches) > 1:
+            return None
+        spans = [match.span() for match in date_matches + time_matches]
+        leftover = folded
+        for span_start, span_end in spans:
+            leftover = leftover[:span_start] + " " * (span_end - span_start) + leftover[span_end:]
+        if re.search(r"\d", leftover):
+            return None
+
+        try:
+            event_date, event_range = LocalIntentParser._match_date(date_matches[0], today) if date_matches else (today, None)
+            event_time = LocalIntentParser._match_time(time_matches[0]) if time_matches else None
+        except ValueError:
+            return None
+
+        if wants_list:
+            if event_time:
+                return None
+            arguments: dict[str, Any] = {"date": event_date.strftime("%Y-%m-%d")}
+            if event_range:
+                arguments["range"] = event_range
+            result = {"function_name": FunctionName.LIST_EVENTS.value, "arguments": arguments}
+        else:
+            title = LocalIntentParser._extract_title(text, folded, spans)
+            if event_range or not event_time or not title or LocalIntentParser._has_unknown_words(leftover):
+                return None
+            result = {"function_name": FunctionName.CREATE_EVENT.value, "arguments": {"date": event_date.strftime("%Y-%m-%d"), "time": event_time, "title": title}}
+        logging.getLogger(__name__).info(f"[LocalIntentParser.parse] function_name={result['function_name']}, args={result['arguments']}")
+        return result
@@ -0,0 +1,224 @@
+import bisect
+import contextvars
+import http.server
+import logging
+import os
+import tempfile
+import threading
+import time
+import uuid
+from collections.abc import Iterator
+from contextlib import contextmanager
+
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+RATIO_BUCKETS = (0.05, 0.1, 0.25, 0.5, 0.75, 1.0, 1.5, 2.0, 4.0)
+
+METRIC_DEFINITIONS = {
+    "carecall_stage_duration_seconds": ("histogram", "Duration of each stage attempt", LATENCY_BUCKETS),
+    "carecall_stage_errors_total": ("counter", "Failed stage attempts by error type", None),
+    "carecall_retries_total": ("counter", "Retries granted by the workflow retry budget", None),
+    "carecall_workflow_duration_seconds": ("histogram", "End-to-end workflow duration", LATENCY_BUCKETS),
+    "carecall_workflow_runs_total": ("counter", "Workflow runs by final status", None),
+    "carecall_audio_seconds_total": ("counter", "Seconds of audio sent to speech-to-text", None),
+    "carecall_stt_realtime_ratio": ("histogram", "Speech-to-text wall time divided by audio duration", RATIO_BUCKETS),
+    "carecall_hedges_total": ("counter", "Hedged duplicate calls by backend and outcome (fired, won)", None),
+    "carecall_circuit_events_total": ("counter", "Circuit breaker transitions and rejected calls by backend", None),
+    "carecall_spool_bytes": ("gauge", "Bytes held in the audio spool", None),
+    "carecall_spool_files": ("gauge", "Files held in the audio spool", None),
+    "carecall_spool_pinned_files": ("gauge", "Spool files in use by a workflow of this process", None),
+    "carecall_spool_evictions_total": ("counter", "Spool files removed by the garbage collector by reason (age, size)", None),
+    "carecall_spool_evicted_bytes_total": ("counter", "Bytes removed from the spool by reason (age, size)", None),
+}
+
+_correlation_id: contextvars.ContextVar[str] = contextvars.ContextVar("correlation_id", default="-")
+
+
+class MetricsRegistry:
+    def __init__(self, keep_samples: bool = False):
+        # keep_samples retains every histogram observation (benchmarks need exact percentiles, not bucket bounds).
+        self.keep_samples = keep_samples
+        self._lock = threading.Lock()
+        self._counters: dict[tuple[str, tuple[tuple[str, str], ...]], float] = {}
+        self._gauges: dict[tuple[str, tuple[tuple[str, str], ...]], float] = {}
+        self._histograms: dict[tuple[str, tuple[tuple[str, str], ...]], list] = {}
+        self._samples: dict[tuple[str, tuple[tuple[str, str], ...]], list[float]] = {}
+
+    def inc(self, name: str, value: float = 1.0, **labels: str) -> None:
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0.0) + value
+
+    def set(self, name: str, value: float, **labels: str) -> None:
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._gauges[key] = value
+
+    def observe(self, name: str, value: float, **labels: str) -> None:
+        buckets = METRIC_DEFINITIONS[name][2]
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            histogram = self._histograms.setdefault(key, [[0] * (len(buckets) + 1), 0.0])
+            histogram[0][bisect.bisect_left(buckets, value)] += 1
+            histogram[1] += value
+            if self.keep_samples:
+                self._samples.setdefault(key, []).append(value)
+
+    def samples(self, name: str, **labels: str) -> list[float]:
+        with self._lock:
+            return list(self._samples.get((name, tuple(sorted(labels.items()))), ()))
+
+    def counter_value(self, name: str, **labels: str) -> float:
+        with self._lock:
+            return self._counters.get((name, tuple(sorted(labels.items()))), 0.0)
+
+    def gauge_value(self, name: str, **labels: str) -> float:
+        with self._lock:
+            return self._gauges.get((name, tuple(sorted(labels.items()))), 0.0)
+
+    def label_values(self, name: str, label: str) -> list[str]:
+        with self._lock:
+            keys = list(self._counters) + list(self._gauges) + list(self._histograms)
+        return sorted({value for metric_name, labels in keys if metric_name == name for key, value in labels if key == label})
+
+    def reset(self) -> None:
+        with self._lock:
+            self._counters.clear()
+            self._gauges.clear()
+            self._histograms.clear()
+            self._samples.clear()
+
+    @staticmethod
+    def _format_labels(labels: tuple[tuple[str, str], ...], extra: tuple[tuple[str, str], ...] = ()) -> str:
+        pairs = labels + extra
+        if not pairs:
+            return ""
+        escaped = (name + '="' + str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") + '"' for name, value in pairs)
+        return "{" + ",".join(escaped) + "}"
+
+    def render_prometheus(self) -> str:
+        with self._lock:
+            counters = dict(self._counters)
+            gauges = dict(self._gauges)
+            histograms = {key: (list(counts), total) for key, (counts, total) in self._histograms.items()}
+        lines = []
+        for name, (metric_type, help_text, buckets) in METRIC_DEFINITIONS.items():
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {metric_type}")
+            if metric_type in ("counter", "gauge"):
+                for (metric_name, labels), value in sorted((counters if metric_type == "counter" else gauges).items()):
+                    if metric_name == name:
+                        lines.append(f"{name}{self._format_labels(labels)} {value:g}")
+                continue
+            for (metric_name, labels), (counts, total) in sorted(histograms.items()):
+                if metric_name != name:
+                    continue
+                cumulative = 0
+                for bound, count in zip((*buckets, "+Inf"), counts, strict=True):
+                    cumulative += count
+                    lines.append(f"{name}_bucket{self._format_labels(labels, (('le', str(bound)),))} {cumulative}")
+                lines.append(f"{name}_sum{self._format_labels(labels)} {total:g}")
+                lines.append(f"{name}_count{self._format_labels(labels)} {cumulative}")
+        return "\n".join(lines) + "\n"
+
+    def write_textfile(self, path: str) -> None:
+        # Atomic replace so a scraper (e.g. node_exporter textfile collector) never reads a partial file.
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        fd, partial_path = tempfile.mkstemp(dir=directory, suffix=".part")
+        with os.fdopen(fd, "w", encoding="utf-8") as partial_file:
+            partial_file.write(self.render_prometheus())
+        os.replace(partial_path, path)
+
+    def serve(self, port: int, host: str = "127.0.0.1") -> http.server.ThreadingHTTPServer:
+        registry = self
+
+        class MetricsHandler(http.server.BaseHTTPRequestHandler):
+            def do_GET(self):  # noqa: N802
+                if self.path.split("?")[0] != "/metrics":
+                    self.send_response(404)
+                    self.end_headers()
+                    return
+                body = registry.render_prometheus().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                return
+
+        server = http.server.ThreadingHTTPServer((host, port), MetricsHandler)
+        threading.Thread(target=server.serve_forever, daemon=True, name="metrics-endpoint").start()
+        logging.info(f"[MetricsRegistry.serve] Prometheus metrics on http://{host}:{server.server_port}/metrics")
+        return server
+
+
+_default_registry = MetricsRegistry()
+
+
+def get_metrics_registry() -> MetricsRegistry:
+    return _default_registry
+
+
+def current_correlation_id() -> str:
+    return _correlation_id.get()
+
+
+@contextmanager
+def workflow_trace(correlation_id: str | None = None) -> Iterator[str]:
+    token = _correlation_id.set(correlation_id or uuid.uuid4().hex[:16])
+    try:
+        yield _correlation_id.get()
+    finally:
+        _correlation_id.reset(token)
+
+
+@contextmanager
+def workflow_run(correlation_id: str | None = None) -> Iterator[dict[str, str]]:
+    """Trace one workflow run; the caller sets run["status"] before leaving."""
+    with workflow_trace(correlation_id) as run_id:
+        run = {"correlation_id": run_id, "status": "error"}
+        started = time.perf_counter()
+        try:
+            yield run
+        finally:
+            _default_registry.observe("carecall_workflow_duration_seconds", time.perf_counter() - started)
+            _default_registry.inc("carecall_workflow_runs_total", status=run["status"])
+
+
+@contextmanager
+def stage_span(stage: str) -> Iterator[None]:
+    started = time.perf_counter()
+    try:
+        yield
+    except Exception as exc:
+        _default_registry.inc("carecall_stage_errors_total", stage=stage, error=type(exc).__name__)
+        raise
+    finally:
+        elapsed = time.perf_counter() - started
+        _default_registry.observe("carecall_stage_duration_seconds", elapsed, stage=stage)
+        logging.debug(f"[stage_span] correlation_id={current_correlation_id()} stage={stage} seconds={elapsed:.3f}")
+
+
+def observe_stt(audio_seconds: float, stt_seconds: float) -> None:
+    if audio_seconds <= 0:
+        return
+    _default_registry.inc("carecall_audio_seconds_total", audio_seconds)
+    _default_registry.observe("carecall_stt_realtime_ratio", stt_seconds / audio_seconds)
+
+
+def install_log_correlation() -> None:
+    """Expose the current correlation ID to log formats as %(correlation_id)s."""
+    base_factory = logging.getLogRecordFactory()
+    if getattr(base_factory, "adds_correlation_id", False):
+        return
+
+    def record_factory(*args, **kwargs) -> logging.LogRecord:
+        record = base_factory(*args, **kwargs)
+        record.correlation_id = _correlation_id.get()
+        return record
+
+    record_factory.adds_correlation_id = True
+    logging.setLogRecordFactory(record_factory)
@@ -0,0 +1,43 @@
+import collections
+import logging
+import multiprocessing
+import os
+from collections.abc import Iterable, Iterator
+from concurrent.futures import Future, ProcessPoolExecutor
+
+from app.audio_spool import get_audio_spool
+from app.audio_upload import AudioUpload
+
+
+def _normalize_in_worker(source_path: str, upload_dir: str) -> str:
+    # Only paths cross the process boundary; the PCM itself stays on disk.
+    return AudioUpload.ingest_speech(source_path, upload_dir)
+
+
+class NormalizationPool:
+    def __init__(self, max_workers: int | None = None, upload_dir: str | None = None):
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.upload_dir = os.path.abspath(upload_dir or get_audio_spool().root)
+        self._executor = ProcessPoolExecutor(max_workers=self.max_workers, mp_context=multiprocessing.get_context("spawn"))
+        logging.info(f"[NormalizationPool] Started with {self.max_workers} worker processes")
+
+    def submit(self, source_path: str) -> Future:
+        return self._executor.submit(_normalize_in_worker, os.path.abspath(source_path), self.upload_dir)
+
+    def prefetch(self, sources: Iterable[str], lookahead: int) -> Iterator[tuple[str, Future]]:
+        window: collections.deque[tuple[str, Future]] = collections.deque()
+        for source in sources:
+            window.append((source, self.submit(source)))
+            if len(window) > lookahead:
+                yield window.popleft()
+        while window:
+            yield window.popleft()
+
+    def shutdown(self, cancel_pending: bool = True) -> None:
+        self._executor.shutdown(wait=True, cancel_futures=cancel_pending)
+
+    def __enter__(self) -> "NormalizationPool":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.shutdown()
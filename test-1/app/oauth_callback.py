@@ -0,0 +1,134 @@
+import http.server
+import logging
+import threading
+import time
+import urllib.parse
+
+from app.google_auth import AuthError
+
+
+DEFAULT_CALLBACK_HOST = "127.0.0.1"
+DEFAULT_CALLBACK_PORT = 8599
+PENDING_TTL_SECONDS = 900.0
+
+PAGE_TEMPLATE = (
+    "<html><head><meta charset='utf-8'><title>Authentication</title>"
+    "<style>body{background:#0e1117;color:#fff;font-family:sans-serif;display:flex;"
+    "align-items:center;justify-content:center;height:100vh;margin:0;}"
+    ".container{background:#14181e;padding:2rem;border-radius:8px;"
+    "box-shadow:0 0 10px rgba(0,0,0,0.5);text-align:center;}</style></head><body>"
+    "<div class='container'><h2>{title}</h2><p>{message}</p></div></body></html>"
+)
+
+
+class PendingAuthorization:
+    def __init__(self):
+        self.created_at = time.monotonic()
+        self.received = threading.Event()
+        self.code: str | None = None
+        self.error: str | None = None
+
+
+class OAuthCallbackListener:
+    """One redirect listener shared by every sign-in of the process.
+
+    Each sign-in registers the OAuth state of its authorization URL and polls its own event; the callback is
+    delivered only to the session whose state it carries, so concurrent sign-ins never see each other's codes.
+    """
+
+    def __init__(self, host: str = DEFAULT_CALLBACK_HOST, port: int = DEFAULT_CALLBACK_PORT):
+        self._lock = threading.Lock()
+        self._pending: dict[str, PendingAuthorization] = {}
+        listener = self
+
+        class CallbackHandler(http.server.BaseHTTPRequestHandler):
+            def do_GET(self):  # noqa: N802
+                params = urllib.parse.parse_qs(urllib.parse.urlparse(self.path).query)
+                state = params.get("state", [""])[0]
+                code = params.get("code", [None])[0]
+                error = params.get("error", [None])[0]
+                if not (code or error) or not listener._deliver(state, code, error):
+                    self.send_page(400, "Sign-in request expired", "Start the sign-in again from CareCall.")
+                elif error:
+                    self.send_page(200, "Authentication cancelled", "You can close this tab and return to Streamlit.")
+                else:
+                    self.send_page(200, "Authentication success", "You can close this tab and return to Streamlit.")
+
+            def send_page(self, status: int, title: str, message: str) -> None:
+                body = PAGE_TEMPLATE.replace("{title}", title).replace("{message}", message).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "text/html; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                return
+
+        try:
+            self._server = http.server.ThreadingHTTPServer((host, port), CallbackHandler)
+        except OSError as ex:
+            logging.error(f"[OAuthCallbackListener] Cannot listen on {host}:{port}: {ex}")
+            raise AuthError(f"OAuth callback port {port} is unavailable") from ex
+        threading.Thread(target=self._server.serve_forever, daemon=True, name="oauth-callback").start()
+        logging.info(f"[OAuthCallbackListener] Listening on http://{host}:{self._server.server_port}")
+
+    def expect(self, state: str) -> None:
+        """Register state before the browser is sent to the authorization URL, so an early callback is not lost."""
+        if not state:
+            raise AuthError("OAuth state is required to route the callback")
+        now = time.monotonic()
+        with self._lock:
+            for stale in [key for key, pending in self._pending.items() if now - pending.created_at > PENDING_TTL_SECONDS]:
+                del self._pending[stale]
+            self._pending[state] = PendingAuthorization()
+
+    def _deliver(self, state: str, code: str | None, error: str | None) -> bool:
+        with self._lock:
+            pending = self._pending.get(state)
+            if pending is None or pending.received.is_set():
+                logging.warning("[OAuthCallbackListener._deliver] Callback for an unknown or already answered state")
+                return False
+            pending.code, pending.error = code, error
+            pending.received.set()
+        return True
+
+    def poll(self, state: str, timeout_seconds: float) -> str | None:
+        """Wait up to timeout_seconds for the code of state; None while it has not arrived (state stays registered)."""
+        with self._lock:
+            pending = self._pending.get(state)
+        if pending is None:
+            raise AuthError("Unknown or expired OAuth state")
+        if not pending.received.wait(timeout_seconds):
+            return None
+        self.discard(state)
+        if pending.error:
+            raise AuthError(f"Google sign-in refused: {pending.error}")
+        return pending.code
+
+    def wait(self, state: str, timeout_seconds: float) -> str:
+        code = self.poll(state, timeout_seconds)
+        if code is None:
+            self.discard(state)
+            raise AuthError("No answer from Google sign-in")
+        return code
+
+    def discard(self, state: str) -> None:
+        with self._lock:
+            self._pending.pop(state, None)
+
+    def pending_count(self) -> int:
+        with self._lock:
+            return len(self._pending)
+
+
+_default_listener: OAuthCallbackListener | None = None
+_default_listener_lock = threading.Lock()
+
+
+def get_oauth_callback_listener(host: str = DEFAULT_CALLBACK_HOST, port: int = DEFAULT_CALLBACK_PORT) -> OAuthCallbackListener:
+    global _default_listener
+    with _default_listener_lock:
+        if _default_listener is None:
+            _default_listener = OAuthCallbackListener(host, port)
+        return _default_listener
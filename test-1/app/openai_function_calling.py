@@ -1,102 +1,225 @@
 import datetime
 import json
 import logging
+from collections.abc import Callable, Iterable
+from typing import Any
 
-from openai import AzureOpenAI
+from app.clients import ClientRegistry
+from app.enums import EventRange, FunctionName
+from app.llm_result_cache import get_llm_result_cache
+from app.metrics import stage_span
+from app.resilience import CancelToken, CircuitOpenError, get_backend_guard
 
-from app.config import EnvVars, get_env_var
-from app.enums import FunctionName
+
+LLM_BACKEND = "azure_openai"
+SYSTEM_INSTRUCTIONS_TEMPLATE = (
+    "You are an assistant that interprets user requests for calendar events. "
+    "Today's date is {current_date}. If the user does not specify a year, assume {current_year}. "
+    "Use the ISO format YYYY-MM-DD for dates and HH:MM (24-hour) for times. "
+    "If the user omits date or time, you must assume today's date. "
+    "Never change the month explicitly mentioned by the user (e.g., December must remain December). "
+    "Only use the provided functions (create_event, create_events or list_events) to produce the outcome. "
+    "When the user asks for several appointments or a repeated appointment, call create_events with one entry per occurrence (at most 50). "
+    "For list_events, set range to week or month when the user asks about a whole week or month. "
+    "Do not ask clarifications; fill missing details with the stated defaults."
+)
+
+FUNCTION_DESCRIPTIONS = [
+    {
+        "name": FunctionName.CREATE_EVENT.value,
+        "description": "Create a calendar event",
+        "parameters": {
+            "type": "object",
+            "properties": {
+                "date": {"type": "string"},
+                "time": {"type": "string"},
+                "title": {"type": "string"},
+                "location": {"type": "string"},
+            },
+            "required": ["date", "time", "title"],
+        },
+    },
+    {
+        "name": FunctionName.CREATE_EVENTS.value,
+        "description": "Create several calendar events at once, e.g. multiple appointments or each occurrence of a repeated appointment",
+        "parameters": {
+            "type": "object",
+            "properties": {
+                "events": {
+                    "type": "array",
+                    "maxItems": 50,
+                    "items": {
+                        "type": "object",
+                        "properties": {
+                            "date": {"type": "string"},
+                            "time": {"type": "string"},
+                            "title": {"type": "string"},
+                            "location": {"type": "string"},
+                        },
+                        "required": ["date", "time", "title"],
+                    },
+                },
+            },
+            "required": ["events"],
+        },
+    },
+    {
+        "name": FunctionName.LIST_EVENTS.value,
+        "description": "List events on a given date, or over the week or month containing it",
+        "parameters": {
+            "type": "object",
+            "properties": {
+                "date": {"type": "string"},
+                "range": {"type": "string", "enum": [event_range.value for event_range in EventRange]},
+            },
+            "required": ["date"],
+        },
+    },
+]
 
 
 class OpenAIFunctionCalling:
     @staticmethod
-    def call_llm_with_functions(user_query_text: str, max_retries_count: int = 3, request_timeout_seconds: int = 30) -> dict:
+    def build_system_instructions(today: datetime.date | None = None) -> str:
+        today = today or datetime.date.today()
+        return SYSTEM_INSTRUCTIONS_TEMPLATE.format(current_date=today.strftime("%Y-%m-%d"), current_year=today.year)
+
+    @staticmethod
+    def build_request(deployment_name: str, user_query_text: str, today: datetime.date | None = None) -> dict[str, Any]:
+        return {
+            "model": deployment_name,
+            "messages": [
+                {"role": "system", "content": OpenAIFunctionCalling.build_system_instructions(today)},
+                {"role": "user", "content": user_query_text},
+            ],
+            "functions": FUNCTION_DESCRIPTIONS,
+            "function_call": "auto",
+        }
+
+    @staticmethod
+    def parse_llm_message(llm_message: Any) -> dict:
+        logger = logging.getLogger(__name__)
+        if llm_message.function_call:
+            function_name_str = llm_message.function_call.name
+            function_arguments_dict = json.loads(llm_message.function_call.arguments or "{}")
+            logger.info(f"[call_llm_with_functions] function_name={function_name_str}, args={function_arguments_dict}")
+            return {"function_name": function_name_str, "arguments": function_arguments_dict}
+        answer_text = llm_message.content or ""
+        logger.info(f"[call_llm_with_functions] answer='{answer_text}'")
+        return {"answer": answer_text}
+
+    @staticmethod
+    def parse_llm_stream(response_stream: Iterable[Any], on_text: Callable[[str], None] | None = None) -> dict:
+        logger = logging.getLogger(__name__)
+        function_name_parts: list[str] = []
+        argument_parts: list[str] = []
+        answer_parts: list[str] = []
+        try:
+            for chunk in response_stream:
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta
+                if delta.function_call:
+                    function_name_parts.append(delta.function_call.name or "")
+                    argument_parts.append(delta.function_call.arguments or "")
+                    arguments_text = "".join(argument_parts).strip()
+                    if arguments_text.endswith("}"):
+                        try:
+                            function_arguments_dict = json.loads(arguments_text)
+                        except json.JSONDecodeError:
+                            continue
+                        # The arguments object is complete: the calendar stage can start without waiting for the end of the stream.
+                        function_name_str = "".join(function_name_parts)
+                        logger.info(f"[call_llm_with_functions] function_name={function_name_str}, args={function_arguments_dict} (streamed)")
+                        return {"function_name": function_name_str, "arguments": function_arguments_dict}
+                elif delta.content:
+                    answer_parts.append(delta.content)
+                    if on_text:
+                        on_text(delta.content)
+        finally:
+            close = getattr(response_stream, "close", None)
+            if close:
+                close()
+        if function_name_parts:
+            function_name_str = "".join(function_name_parts)
+            function_arguments_dict = json.loads("".join(argument_parts) or "{}")
+            logger.info(f"[call_llm_with_functions] function_name={function_name_str}, args={function_arguments_dict} (streamed)")
+            return {"function_name": function_name_str, "arguments": function_arguments_dict}
+        answer_text = "".join(answer_parts)
+        logger.info(f"[call_llm_with_functions] answer='{answer_text}' (streamed)")
+        return {"answer": answer_text}
+
+    @staticmethod
+    def call_llm_with_functions(
+        user_query_text: str,
+        max_retries_count: int = 3,
+        request_timeout_seconds: int = 30,
+        use_cache: bool = True,
+        stream: bool = False,
+        on_text: Callable[[str], None] | None = None,
+    ) -> dict:
         logger = logging.getLogger(__name__)
         logger.info("[call_llm_with_functions] Start")
 
-        openai_endpoint = get_env_var(EnvVars.AZURE_OPENAI_ENDPOINT)
-        openai_api_key = get_env_var(EnvVars.AZURE_OPENAI_KEY)
-        openai_deployment_name = get_env_var(EnvVars.AZURE_OPENAI_DEPLOYMENT_NAME)
-        if not openai_endpoint or not openai_api_key or not openai_deployment_name:
-            error_msg = "[call_llm_with_functions] Missing Azure OpenAI env variables"
-            logger.error(error_msg)
-            raise ValueError(error_msg)
-
-        current_date_str = datetime.date.today().strftime("%Y-%m-%d")
-        current_year_str = str(datetime.date.today().year)
-
-        system_instructions = (
-            "You are an assistant that interprets user requests for calendar events. "
-            f"Today's date is {current_date_str}. If the user does not specify a year, assume {current_year_str}. "
-            "Use the ISO format YYYY-MM-DD for dates and HH:MM (24-hour) for times. "
-            "If the user omits date or time, you must assume today's date. "
-            "Never change the month explicitly mentioned by the user (e.g., December must remain December). "
-            "Only use the provided functions (create_event or list_events) to produce the outcome. "
-            "Do not ask clarifications; fill missing details with the stated defaults."
-        )
-
-        client = AzureOpenAI(
-            azure_endpoint=openai_endpoint,
-            api_key=openai_api_key,
-            api_version="2023-07-01-preview",
-            timeout=request_timeout_seconds,
-            max_retries=0,
-        )
-
-        function_descriptions = [
-            {
-                "name": FunctionName.CREATE_EVENT.value,
-                "description": "Create a calendar event",
-                "parameters": {
-                    "type": "object",
-                    "properties": {
-                        "date": {"type": "string"},
-                        "time": {"type": "string"},
-                        "title": {"type": "string"},
-                        "location": {"type": "string"},
-                    },
-                    "required": ["date", "time", "title"],
-                },
-            },
-            {
-                "name": FunctionName.LIST_EVENTS.value,
-                "description": "List events on a given date",
-                "parameters": {
-                    "type": "object",
-                    "properties": {"date": {"type": "string"}},
-                    "required": ["date"],
-                },
-            },
-        ]
+        today = datetime.date.today()
+        if use_cache:
+            cached = get_llm_result_cache().get(user_query_text, today)
+            if cached is not None:
+                return cached
+
+        _, _, openai_deployment_name = ClientRegistry.openai_settings()
+        client = ClientRegistry.openai_client().with_options(timeout=request_timeout_seconds)
+        guard = get_backend_guard(LLM_BACKEND)
+
+        def complete(cancel_token: CancelToken) -> dict:
+            request = OpenAIFunctionCalling.build_request(openai_deployment_name, user_query_text, today)
+            # Always streamed, even when the caller only wants the result: an open stream is what the losing attempt
+            # of a hedged call can close, which drops its connection and stops the generation it would be billed for.
+            response_stream = client.chat.completions.create(**request, stream=True)
+            close = getattr(response_stream, "close", None)
+            if close:
+                cancel_token.add_callback(close)
+            return OpenAIFunctionCalling.parse_llm_stream(response_stream, on_text if stream else None)
 
         attempt_counter = 0
         while attempt_counter < max_retries_count:
             attempt_counter += 1
             try:
                 logger.debug(f"[call_llm_with_functions] Attempt {attempt_counter}/{max_retries_count}")
-                response_data = client.chat.completions.create(
-                    model=openai_deployment_name,
-                    messages=[
-                        {"role": "system", "content": system_instructions},
-                        {"role": "user", "content": user_query_text},
-                    ],
-                    functions=function_descriptions,
-                    function_call="auto",
-                )
-                llm_message = response_data.choices[0].message
-                if llm_message.function_call:
-                    function_name_str = llm_message.function_call.name
-                    function_arguments_dict = json.loads(llm_message.function_call.arguments or "{}")
-                    logger.info(f"[call_llm_with_functions] function_name={function_name_str}, args={function_arguments_dict}")
-                    return {"function_name": function_name_str, "arguments": function_arguments_dict}
-                else:
-                    answer_text = llm_message.content or ""
-                    logger.info(f"[call_llm_with_functions] answer='{answer_text}'")
-                    return {"answer": answer_text}
+                with stage_span("llm"):
+                    # A streamed answer shown to the user must come from a single response, so it is not hedged.
+                    result = guard.call(complete, hedge=not (stream and on_text))
+                if use_cache:
+                    get_llm_result_cache().put(user_query_text, today, result)
+                return result
 
+            except CircuitOpenError:
+                raise
             except Exception as exc:
                 logger.error(f"[call_llm_with_functions] Error on attempt {attempt_counter}: {exc}")
                 if attempt_counter == max_retries_count:
                     raise
 
         return {}
+
+    @staticmethod
+    async def call_llm_with_functions_async(user_query_text: str, request_timeout_seconds: int = 30, use_cache: bool = True) -> dict:
+        logger = logging.getLogger(__name__)
+        logger.info("[call_llm_with_functions_async] Start")
+
+        today = datetime.date.today()
+        if use_cache:
+            cached = get_llm_result_cache().get(user_query_text, today)
+            if cached is not None:
+                return cached
+
+        _, _, openai_deployment_name = ClientRegistry.openai_settings()
+        client = ClientRegistry.async_openai_client().with_options(timeout=request_timeout_seconds)
+        with stage_span("llm"):
+            response_data = await get_backend_guard(LLM_BACKEND).call_async(
+                lambda: client.chat.completions.create(**OpenAIFunctionCalling.build_request(openai_deployment_name, user_query_text, today))
+            )
+        result = OpenAIFunctionCalling.parse_llm_message(response_data.choices[0].message)
+        if use_cache:
+            get_llm_result_cache().put(user_query_text, today, result)
+        return result
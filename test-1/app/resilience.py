@@ -0,0 +1,354 @@
+import asyncio
+import contextvars
+import logging
+import math
+import random
+import threading
+import time
+from collections import deque
+from collections.abc import Awaitable, Callable
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any, TypeVar
+
+from app.metrics import get_metrics_registry
+
+
+T = TypeVar("T")
+
+DEFAULT_HEDGE_PERCENTILE = 95.0
+DEFAULT_MIN_LATENCY_SAMPLES = 20
+DEFAULT_LATENCY_WINDOW = 500
+DEFAULT_MAX_HEDGE_RATIO = 0.1
+DEFAULT_MIN_HEDGE_DELAY_SECONDS = 0.2
+DEFAULT_BREAKER_WINDOW = 20
+DEFAULT_BREAKER_MIN_CALLS = 10
+DEFAULT_BREAKER_FAILURE_RATIO = 0.5
+DEFAULT_BREAKER_OPEN_SECONDS = 30.0
+
+
+class CircuitOpenError(Exception):
+    pass
+
+
+class RetryBudget:
+    def __init__(self, max_retries: int = 2, base_delay_seconds: float = 0.5, max_delay_seconds: float = 8.0, deadline_seconds: float | None = None):
+        self.max_retries = max_retries
+        self.base_delay_seconds = base_delay_seconds
+        self.max_delay_seconds = max_delay_seconds
+        self.deadline = time.monotonic() + deadline_seconds if deadline_seconds is not None else None
+        self.retries_used = 0
+
+    def next_delay(self) -> float | None:
+        if self.retries_used >= self.max_retries:
+            return None
+        delay = random.uniform(0, min(self.max_delay_seconds, self.base_delay_seconds * 2**self.retries_used))
+        if self.deadline is not None and time.monotonic() + delay >= self.deadline:
+            return None
+        self.retries_used += 1
+        return delay
+
+    def call(self, stage: str, func: Callable[[], T], fatal: tuple[type[BaseException], ...] = ()) -> T:
+        while True:
+            try:
+                return func()
+            except fatal:
+                raise
+            except Exception as exc:
+                delay = self.next_delay()
+                if delay is None:
+                    logging.error(f"[RetryBudget.call] Stage {stage} failed, retry budget exhausted: {exc}")
+                    raise
+                logging.warning(f"[RetryBudget.call] Stage {stage} failed ({exc}), retry {self.retries_used}/{self.max_retries} in {delay:.2f}s")
+                get_metrics_registry().inc("carecall_retries_total", stage=stage)
+                time.sleep(delay)
+
+    async def call_async(self, stage: str, func: Callable[[], Awaitable[T]], fatal: tuple[type[BaseException], ...] = ()) -> T:
+        while True:
+            try:
+                return await func()
+            except fatal:
+                raise
+            except Exception as exc:
+                delay = self.next_delay()
+                if delay is None:
+                    logging.error(f"[RetryBudget.call_async] Stage {stage} failed, retry budget exhausted: {exc}")
+                    raise
+                logging.warning(f"[RetryBudget.call_async] Stage {stage} failed ({exc}), retry {self.retries_used}/{self.max_retries} in {delay:.2f}s")
+                get_metrics_registry().inc("carecall_retries_total", stage=stage)
+                await asyncio.sleep(delay)
+
+
+class CancelToken:
+    """Lets a hedged call stop the losing attempt; callbacks run once, on the thread that cancels."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._callbacks: list[Callable[[], Any]] = []
+        self.cancelled = False
+
+    def add_callback(self, callback: Callable[[], Any]) -> None:
+        with self._lock:
+            if not self.cancelled:
+                self._callbacks.append(callback)
+                return
+        callback()
+
+    def cancel(self) -> None:
+        with self._lock:
+            if self.cancelled:
+                return
+            self.cancelled = True
+            callbacks, self._callbacks = self._callbacks, []
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception as exc:
+                logging.warning(f"[CancelToken.cancel] Cancel callback failed: {exc}")
+
+
+class CircuitBreaker:
+    """Opens after failure_ratio of the last window calls failed, then lets one probe through every open_seconds."""
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(
+        self,
+        name: str,
+        window: int = DEFAULT_BREAKER_WINDOW,
+        min_calls: int = DEFAULT_BREAKER_MIN_CALLS,
+        failure_ratio: float = DEFAULT_BREAKER_FAILURE_RATIO,
+        open_seconds: float = DEFAULT_BREAKER_OPEN_SECONDS,
+    ):
+        self.name = name
+        self.min_calls = min_calls
+        self.failure_ratio = failure_ratio
+        self.open_seconds = open_seconds
+        self.state = CircuitBreaker.CLOSED
+        self.rejected = 0
+        self._outcomes: deque[bool] = deque(maxlen=window)
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+
+    def _transition(self, state: str) -> None:
+        logging.warning(f"[CircuitBreaker] {self.name} {self.state} -> {state}")
+        self.state = state
+        get_metrics_registry().inc("carecall_circuit_events_total", backend=self.name, event=state)
+
+    def before_call(self) -> None:
+        with self._lock:
+            if self.state == CircuitBreaker.OPEN and time.monotonic() - self._opened_at >= self.open_seconds:
+                self._transition(CircuitBreaker.HALF_OPEN)
+            if self.state == CircuitBreaker.CLOSED or (self.state == CircuitBreaker.HALF_OPEN and not self._probe_in_flight):
+                self._probe_in_flight = self.state == CircuitBreaker.HALF_OPEN
+                return
+            self.rejected += 1
+        get_metrics_registry().inc("carecall_circuit_events_total", backend=self.name, event="rejected")
+        raise CircuitOpenError(f"[CircuitBreaker] {self.name} is unavailable, retry later")
+
+    def record(self, success: bool) -> None:
+        with self._lock:
+            if self.state == CircuitBreaker.HALF_OPEN:
+                self._probe_in_flight = False
+                self._outcomes.clear()
+                if success:
+                    self._transition(CircuitBreaker.CLOSED)
+                else:
+                    self._opened_at = time.monotonic()
+                    self._transition(CircuitBreaker.OPEN)
+                return
+            self._outcomes.append(success)
+            failures = self._outcomes.count(False)
+            if self.state == CircuitBreaker.CLOSED and len(self._outcomes) >= self.min_calls and failures >= self.failure_ratio * len(self._outcomes):
+                self._opened_at = time.monotonic()
+                self._transition(CircuitBreaker.OPEN)
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            return {
+                "state": self.state,
+                "recent_calls": len(self._outcomes),
+                "recent_failures": self._outcomes.count(False),
+                "rejected": self.rejected,
+            }
+
+
+class BackendGuard:
+    """Circuit breaker plus latency-driven hedging for one backend.
+
+    Latencies are tracked per unit of `scale` (e.g. the call's timeout budget), so calls of different sizes
+    share one distribution. Once enough samples exist, a call still running after the hedge_percentile latency
+    gets one duplicate; the first success wins and the other attempt is cancelled through its CancelToken.
+    """
+
+    _executor = ThreadPoolExecutor(max_workers=64, thread_name_prefix="backend-call")
+
+    def __init__(
+        self,
+        name: str,
+        hedge_percentile: float = DEFAULT_HEDGE_PERCENTILE,
+        min_samples: int = DEFAULT_MIN_LATENCY_SAMPLES,
+        max_hedge_ratio: float = DEFAULT_MAX_HEDGE_RATIO,
+        min_hedge_delay_seconds: float = DEFAULT_MIN_HEDGE_DELAY_SECONDS,
+        breaker: CircuitBreaker | None = None,
+    ):
+        self.name = name
+        self.hedge_percentile = hedge_percentile
+        self.min_samples = min_samples
+        self.max_hedge_ratio = max_hedge_ratio
+        self.min_hedge_delay_seconds = min_hedge_delay_seconds
+        self.breaker = breaker or CircuitBreaker(name)
+        self.calls = 0
+        self.hedges_fired = 0
+        self.hedges_won = 0
+        self._latencies: deque[float] = deque(maxlen=DEFAULT_LATENCY_WINDOW)
+        self._lock = threading.Lock()
+
+    def latency_percentile(self, percentile: float) -> float | None:
+        with self._lock:
+            latencies = sorted(self._latencies)
+        if len(latencies) < self.min_samples:
+            return None
+        return latencies[min(max(math.ceil(percentile / 100 * len(latencies)) - 1, 0), len(latencies) - 1)]
+
+    def hedge_delay(self, scale: float = 1.0) -> float | None:
+        per_unit = self.latency_percentile(self.hedge_percentile)
+        if per_unit is None:
+            return None
+        return max(per_unit * scale, self.min_hedge_delay_seconds)
+
+    def _start(self) -> None:
+        self.breaker.before_call()
+        with self._lock:
+            self.calls += 1
+
+    def _take_hedge(self) -> bool:
+        # Hedges are capped to a share of calls so a slow backend does not get twice the load.
+        if self.breaker.state != CircuitBreaker.CLOSED:
+            return False
+        with self._lock:
+            if self.hedges_fired >= self.max_hedge_ratio * self.calls + 1:
+                return False
+            self.hedges_fired += 1
+        get_metrics_registry().inc("carecall_hedges_total", backend=self.name, outcome="fired")
+        logging.info(f"[BackendGuard] {self.name} call slower than p{self.hedge_percentile:g}, hedging")
+        return True
+
+    def _finish(self, success: bool, elapsed: float, scale: float, hedge: bool) -> None:
+        self.breaker.record(success)
+        if not success:
+            return
+        with self._lock:
+            self._latencies.append(elapsed / scale if scale > 0 else elapsed)
+            if hedge:
+                self.hedges_won += 1
+        if hedge:
+            get_metrics_registry().inc("carecall_hedges_total", backend=self.name, outcome="won")
+
+    def call(self, func: Callable[[CancelToken], T], scale: float = 1.0, hedge: bool = True) -> T:
+        """Run func(cancel_token); calls that cannot be cancelled simply finish in the background when they lose."""
+        self._start()
+        delay = self.hedge_delay(scale) if hedge else None
+        if delay is None:
+            started = time.perf_counter()
+            try:
+                result = func(CancelToken())
+            except Exception:
+                self._finish(False, 0.0, scale, False)
+                raise
+            self._finish(True, time.perf_counter() - started, scale, False)
+            return result
+
+        attempts: dict[Future, tuple[CancelToken, float, bool]] = {}
+
+        def launch(is_hedge: bool) -> Future:
+            token = CancelToken()
+            future = BackendGuard._executor.submit(contextvars.copy_context().run, func, token)
+            attempts[future] = (token, time.perf_counter(), is_hedge)
+            return future
+
+        pending = {launch(False)}
+        errors: list[BaseException] = []
+        try:
+            while pending:
+                done, pending = wait(pending, timeout=delay, return_when=FIRST_COMPLETED)
+                if not done:
+                    delay = None
+                    if self._take_hedge():
+                        # Added even if it already finished, so a fast hedge is still seen by the next wait().
+                        pending.add(launch(True))
+                    continue
+                for future in done:
+                    token, started, is_hedge = attempts[future]
+                    error = future.exception()
+                    self._finish(error is None, time.perf_counter() - started, scale, is_hedge)
+                    if error is None:
+                        return future.result()
+                    errors.append(error)
+            raise errors[0]
+        finally:
+            for future, (token, _, _) in attempts.items():
+                if not future.done():
+                    token.cancel()
+
+    async def call_async(self, func: Callable[[], Awaitable[T]], scale: float = 1.0, hedge: bool = True) -> T:
+        self._start()
+        delay = self.hedge_delay(scale) if hedge else None
+        attempts: dict[asyncio.Task, tuple[float, bool]] = {asyncio.ensure_future(func()): (time.perf_counter(), False)}
+        pending = set(attempts)
+        errors: list[BaseException] = []
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, timeout=delay, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    delay = None
+                    if self._take_hedge():
+                        task = asyncio.ensure_future(func())
+                        attempts[task] = (time.perf_counter(), True)
+                        pending.add(task)
+                    continue
+                for task in done:
+                    started, is_hedge = attempts[task]
+                    error = task.exception()
+                    self._finish(error is None, time.perf_counter() - started, scale, is_hedge)
+                    if error is None:
+                        return task.result()
+                    errors.append(error)
+            raise errors[0]
+        finally:
+            for task in attempts:
+                if not task.done():
+                    task.cancel()
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            calls, hedges_fired, hedges_won, samples = self.calls, self.hedges_fired, self.hedges_won, len(self._latencies)
+        return {
+            "calls": calls,
+            "latency_samples": samples,
+            **{f"p{pct}": self.latency_percentile(pct) for pct in (50, 95, 99)},
+            "hedge_percentile": self.hedge_percentile,
+            "hedges_fired": hedges_fired,
+            "hedges_won": hedges_won,
+            "breaker": self.breaker.stats(),
+        }
+
+
+_backend_guards: dict[str, BackendGuard] = {}
+_backend_guards_lock = threading.Lock()
+
+
+def get_backend_guard(name: str) -> BackendGuard:
+    with _backend_guards_lock:
+        guard = _backend_guards.get(name)
+        if guard is None:
+            guard = _backend_guards[name] = BackendGuard(name)
+        return guard
+
+
+def backend_guard_stats() -> dict[str, dict[str, Any]]:
+    with _backend_guards_lock:
+        guards = list(_backend_guards.values())
+    return {guard.name: guard.stats() for guard in guards}
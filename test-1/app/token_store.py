@@ -0,0 +1,244 @@
+import datetime
+import hashlib
+import json
+import logging
+import os
+import secrets
+import tempfile
+import threading
+import time
+import weakref
+from typing import TYPE_CHECKING, Any
+
+
+if TYPE_CHECKING:
+    from cryptography.fernet import Fernet
+    from google.oauth2.credentials import Credentials
+
+
+DEFAULT_TOKEN_DIR = os.path.join(".cache", "tokens")
+KEY_FILE_NAME = "token.key"
+REFRESH_MARGIN_SECONDS = 300.0
+REFRESH_CHECK_SECONDS = 60.0
+# A sign-in ends after this long however often its tokens are refreshed or its handle is rotated.
+DEFAULT_SIGN_IN_TTL_SECONDS = float(os.getenv("CARECALL_SIGN_IN_TTL_DAYS", "7")) * 24 * 3600
+# Handles travel in the page URL (history, shared links), so each one only works for this long unless rotated first.
+DEFAULT_HANDLE_TTL_SECONDS = float(os.getenv("CARECALL_SIGN_IN_HANDLE_TTL_HOURS", "8")) * 3600
+UTC = datetime.timezone.utc  # noqa: UP017 (datetime.UTC requires Python 3.11)
+
+
+class TokenStore:
+    """Google credentials encrypted at rest (Fernet), one file per sign-in handle.
+
+    The key comes from CARECALL_TOKEN_KEY (a Fernet key); without it one is generated next to the tokens,
+    readable by the owner only. Handles are opaque random strings: files are named by their SHA-256,
+    so the directory listing does not reveal them. A record expires ttl_seconds after sign-in; its handle
+    expires handle_ttl_seconds after it was issued, and rotate() moves the record to a fresh handle and
+    invalidates the old one, so a handle copied out of a URL stops working once its session has used it.
+    """
+
+    def __init__(self, directory: str = DEFAULT_TOKEN_DIR, key: bytes | None = None, ttl_seconds: float = DEFAULT_SIGN_IN_TTL_SECONDS, handle_ttl_seconds: float = DEFAULT_HANDLE_TTL_SECONDS):
+        self.directory = directory
+        self.ttl_seconds = ttl_seconds
+        self.handle_ttl_seconds = handle_ttl_seconds
+        self._lock = threading.Lock()
+        os.makedirs(directory, mode=0o700, exist_ok=True)
+        self._fernet: Fernet | None = None
+        self._key = key
+
+    def _cipher(self) -> "Fernet":
+        # cryptography is imported on first use, so only sessions that touch stored tokens pay for it.
+        from cryptography.fernet import Fernet
+
+        if self._fernet is None:
+            self._fernet = Fernet(self._key or TokenStore._load_key(self.directory))
+        return self._fernet
+
+    @staticmethod
+    def _load_key(directory: str) -> bytes:
+        from cryptography.fernet import Fernet
+
+        env_key = os.getenv("CARECALL_TOKEN_KEY", "").strip()
+        if env_key:
+            return env_key.encode()
+        key_path = os.path.join(directory, KEY_FILE_NAME)
+        try:
+            fd = os.open(key_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+        except FileExistsError:
+            with open(key_path, "rb") as key_file:
+                return key_file.read().strip()
+        key = Fernet.generate_key()
+        with os.fdopen(fd, "wb") as key_file:
+            key_file.write(key)
+        logging.warning(f"[TokenStore._load_key] Generated {key_path}; set CARECALL_TOKEN_KEY to keep the key apart from the tokens")
+        return key
+
+    @staticmethod
+    def new_handle() -> str:
+        return secrets.token_urlsafe(32)
+
+    def _path(self, handle: str) -> str:
+        return os.path.join(self.directory, hashlib.sha256(handle.encode()).hexdigest() + ".token")
+
+    def _write(self, handle: str, record: dict[str, Any]) -> None:
+        token = self._cipher().encrypt(json.dumps(record).encode("utf-8"))
+        fd, partial_path = tempfile.mkstemp(dir=self.directory, suffix=".part")
+        with os.fdopen(fd, "wb") as partial_file:
+            partial_file.write(token)
+        os.replace(partial_path, self._path(handle))
+
+    def save(self, handle: str, credentials: "Credentials", profile: dict[str, Any] | None = None) -> bool:
+        """Store credentials under handle for a new sign-in, or with profile=None update a live record in place.
+
+        Updates keep the record's profile and expiries; they return False and store nothing once it has expired,
+        been rotated away or been deleted, so a background refresh never brings a dead handle back.
+        """
+        with self._lock:
+            if profile is None:
+                record = self._read(handle)
+                if record is None:
+                    return False
+            else:
+                expires_at = time.time() + self.ttl_seconds
+                record = {"profile": profile, "expires_at": expires_at, "handle_expires_at": min(time.time() + self.handle_ttl_seconds, expires_at)}
+            record["credentials"] = json.loads(credentials.to_json())
+            self._write(handle, record)
+        return True
+
+    def rotate(self, handle: str) -> str | None:
+        """Move a live record to a new handle, returned, and invalidate the old one; None when handle is dead."""
+        with self._lock:
+            record = self._read(handle)
+            if record is None:
+                return None
+            new_handle = TokenStore.new_handle()
+            record["handle_expires_at"] = min(time.time() + self.handle_ttl_seconds, record["expires_at"])
+            self._write(new_handle, record)
+            self._remove(handle)
+        return new_handle
+
+    def _read(self, handle: str) -> dict[str, Any] | None:
+        from cryptography.fernet import InvalidToken
+
+        try:
+            with open(self._path(handle), "rb") as token_file:
+                record = json.loads(self._cipher().decrypt(token_file.read()))
+        except FileNotFoundError:
+            return None
+        except InvalidToken:
+            logging.warning("[TokenStore._read] Stored token cannot be decrypted (key changed?); ignoring it")
+            return None
+        # Records written without expiries predate them and are treated as expired.
+        if min(record.get("expires_at", 0), record.get("handle_expires_at", 0)) <= time.time():
+            logging.info("[TokenStore._read] Sign-in or its handle expired; removing its stored token")
+            self._remove(handle)
+            return None
+        return record
+
+    def load(self, handle: str) -> tuple["Credentials", dict[str, Any]] | None:
+        from google.oauth2.credentials import Credentials
+
+        with self._lock:
+            record = self._read(handle)
+        if record is None:
+            return None
+        return Credentials.from_authorized_user_info(record["credentials"]), record["profile"]
+
+    def _remove(self, handle: str) -> None:
+        try:
+            os.remove(self._path(handle))
+        except FileNotFoundError:
+            pass
+
+    def delete(self, handle: str) -> None:
+        with self._lock:
+            self._remove(handle)
+
+
+class TokenRefresher:
+    """Refreshes tracked credentials on a background thread shortly before they expire.
+
+    google-auth otherwise refreshes inline when a request finds the token expired, so the user request that
+    happens to come first pays the round trip to the token endpoint.
+    """
+
+    _lock = threading.Lock()
+    _tracked: "weakref.WeakKeyDictionary[Credentials, str | None]" = weakref.WeakKeyDictionary()
+    _wake = threading.Event()
+    _thread: threading.Thread | None = None
+
+    @staticmethod
+    def track(credentials: "Credentials", store_handle: str | None = None) -> None:
+        """Keep credentials fresh while they are referenced elsewhere; refreshed tokens are saved under store_handle."""
+        with TokenRefresher._lock:
+            TokenRefresher._tracked[credentials] = store_handle
+            if TokenRefresher._thread is None:
+                TokenRefresher._thread = threading.Thread(target=TokenRefresher._run, daemon=True, name="token-refresher")
+                TokenRefresher._thread.start()
+        TokenRefresher._wake.set()
+
+    @staticmethod
+    def untrack(credentials: "Credentials", store_handle: str | None = None) -> None:
+        """Stop refreshing credentials; with store_handle, only while they are still saved under that handle."""
+        with TokenRefresher._lock:
+            if store_handle is None or TokenRefresher._tracked.get(credentials) == store_handle:
+                TokenRefresher._tracked.pop(credentials, None)
+
+    @staticmethod
+    def is_due(credentials: "Credentials", margin_seconds: float = REFRESH_MARGIN_SECONDS) -> bool:
+        if not credentials.refresh_token:
+            return False
+        if credentials.token is None:
+            return True
+        # google-auth keeps expiry as a naive UTC datetime.
+        now = datetime.datetime.now(UTC).replace(tzinfo=None)
+        return credentials.expiry is not None and (credentials.expiry - now).total_seconds() < margin_seconds
+
+    @staticmethod
+    def refresh(credentials: "Credentials", store_handle: str | None = None) -> bool:
+        from google.auth.exceptions import RefreshError
+        from google.auth.transport.requests import Request
+
+        try:
+            credentials.refresh(Request())
+        except RefreshError as ex:
+            # Revoked or expired refresh token: only a new consent helps, so stop retrying and forget it.
+            logging.error(f"[TokenRefresher.refresh] Refresh token rejected: {ex}")
+            TokenRefresher.untrack(credentials)
+            if store_handle:
+                get_token_store().delete(store_handle)
+            return False
+        except Exception as ex:
+            logging.warning(f"[TokenRefresher.refresh] Refresh failed, retrying on the next pass: {ex}")
+            return False
+        logging.info(f"[TokenRefresher.refresh] Access token refreshed, valid until {credentials.expiry}")
+        if store_handle and not get_token_store().save(store_handle, credentials):
+            # Signed out, expired or rotated meanwhile (then tracked under the new handle, which is left alone).
+            TokenRefresher.untrack(credentials, store_handle)
+        return True
+
+    @staticmethod
+    def refresh_due() -> int:
+        with TokenRefresher._lock:
+            tracked = list(TokenRefresher._tracked.items())
+        return sum(TokenRefresher.refresh(credentials, store_handle) for credentials, store_handle in tracked if TokenRefresher.is_due(credentials))
+
+    @staticmethod
+    def _run() -> None:
+        # Strong references only live inside refresh_due(), so sessions that drop their credentials release them.
+        while True:
+            TokenRefresher._wake.wait(REFRESH_CHECK_SECONDS)
+            TokenRefresher._wake.clear()
+            TokenRefresher.refresh_due()
+
+
+_default_store: TokenStore | None = None
+_default_store_lock = threading.Lock()
+
+
+def get_token_store() -> TokenStore:
+    global _default_store
+    with _default_store_lock:
+        if _default_store is None:
+            _default_store = TokenStore()
+        return _default_store
@@ -0,0 +1,108 @@
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+from app.enums import AzureSpeechSettings
+
+
+DEFAULT_CACHE_PATH = os.path.join(".cache", "transcripts.sqlite3")
+DEFAULT_MAX_ENTRIES = 10000
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+DEFAULT_TTL_SECONDS = 30 * 24 * 3600
+
+
+class TranscriptCache:
+    def __init__(
+        self,
+        db_path: str = DEFAULT_CACHE_PATH,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+        ttl_seconds: int = DEFAULT_TTL_SECONDS,
+    ):
+        self.db_path = db_path
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        if os.path.dirname(db_path):
+            os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS transcripts (cache_key TEXT PRIMARY KEY, transcript TEXT NOT NULL, size INTEGER NOT NULL, created_at REAL NOT NULL, last_access REAL NOT NULL)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_transcripts_last_access ON transcripts(last_access)")
+
+    @staticmethod
+    def build_key(audio_digest: str, language: str = AzureSpeechSettings.LANGUAGE.value) -> str:
+        return hashlib.sha256(f"{language}:{audio_digest}".encode()).hexdigest()
+
+    def get(self, cache_key: str) -> str | None:
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute("SELECT transcript, created_at FROM transcripts WHERE cache_key = ?", (cache_key,)).fetchone()
+            if row is None or now - row[1] > self.ttl_seconds:
+                if row is not None:
+                    self._conn.execute("DELETE FROM transcripts WHERE cache_key = ?", (cache_key,))
+                self.misses += 1
+                return None
+            self._conn.execute("UPDATE transcripts SET last_access = ? WHERE cache_key = ?", (now, cache_key))
+            self.hits += 1
+        logging.info(f"[TranscriptCache.get] Cache hit {cache_key[:12]}")
+        return row[0]
+
+    def put(self, cache_key: str, transcript: str) -> None:
+        now = time.time()
+        size = len(transcript.encode("utf-8"))
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO transcripts (cache_key, transcript, size, created_at, last_access) VALUES (?, ?, ?, ?, ?)",
+                (cache_key, transcript, size, now, now),
+            )
+            self._evict(now)
+
+    def _evict(self, now: float) -> None:
+        self._conn.execute("DELETE FROM transcripts WHERE created_at < ?", (now - self.ttl_seconds,))
+        count, total_bytes = self._conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM transcripts").fetchone()
+        if count <= self.max_entries and total_bytes <= self.max_bytes:
+            return
+        evicted = 0
+        for cache_key, size in self._conn.execute("SELECT cache_key, size FROM transcripts ORDER BY last_access ASC").fetchall():
+            if count <= self.max_entries and total_bytes <= self.max_bytes:
+                break
+            self._conn.execute("DELETE FROM transcripts WHERE cache_key = ?", (cache_key,))
+            count -= 1
+            total_bytes -= size
+            evicted += 1
+        logging.info(f"[TranscriptCache._evict] Evicted {evicted} least recently used entries")
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM transcripts")
+
+    def stats(self) -> dict[str, float]:
+        with self._lock:
+            count, total_bytes = self._conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM transcripts").fetchone()
+        lookups = self.hits + self.misses
+        return {
+            "entries": count,
+            "bytes": total_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+        }
+
+
+_default_cache: TranscriptCache | None = None
+_default_cache_lock = threading.Lock()
+
+
+def get_transcript_cache() -> TranscriptCache:
+    global _default_cache
+    with _default_cache_lock:
+        if _default_cache is None:
+            _default_cache = TranscriptCache()
+        return _default_cache
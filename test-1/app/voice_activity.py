@@ -0,0 +1,185 @@
+import collections
+import logging
+import os
+import tempfile
+import wave
+from collections.abc import Iterable, Iterator
+
+import numpy as np
+
+from app.audio_normalizer import DEFAULT_CHUNK_BYTES, TARGET_CHANNELS, TARGET_FRAME_RATE, TARGET_SAMPLE_WIDTH
+
+
+DEFAULT_THRESHOLD_DBFS = -45.0
+DEFAULT_FRAME_MS = 20
+DEFAULT_MAX_SILENCE_MS = 700
+DEFAULT_PADDING_MS = 200
+DEFAULT_MAX_LEADING_MS = 30000
+
+
+class VoiceActivityDetector:
+    """Energy-based VAD over 16 kHz mono s16le PCM that drops silences longer than max_silence_ms."""
+
+    def __init__(
+        self,
+        threshold_dbfs: float = DEFAULT_THRESHOLD_DBFS,
+        frame_ms: int = DEFAULT_FRAME_MS,
+        max_silence_ms: int = DEFAULT_MAX_SILENCE_MS,
+        padding_ms: int = DEFAULT_PADDING_MS,
+        max_leading_ms: int = DEFAULT_MAX_LEADING_MS,
+    ):
+        self.threshold_dbfs = threshold_dbfs
+        self.frame_bytes = TARGET_FRAME_RATE * frame_ms // 1000 * TARGET_SAMPLE_WIDTH
+        self.max_silence_frames = max(max_silence_ms // frame_ms, 1)
+        self.padding_frames = min(padding_ms // frame_ms, self.max_silence_frames // 2)
+        self.max_leading_frames = max(max_leading_ms // frame_ms, self.max_silence_frames)
+        self.total_frames = 0
+        self.speech_frames = 0
+        self.kept_frames = 0
+
+    @property
+    def speech_ratio(self) -> float:
+        return self.speech_frames / self.total_frames if self.total_frames else 0.0
+
+    def frame_levels_dbfs(self, pcm: bytes) -> np.ndarray:
+        frame_samples = self.frame_bytes // TARGET_SAMPLE_WIDTH
+        samples = np.frombuffer(pcm, dtype="<i2")
+        frames = samples[: len(samples) // frame_samples * frame_samples].reshape(-1, frame_samples).astype(np.float32)
+        rms = np.sqrt(np.mean(np.square(frames), axis=1)) / 32768.0
+        return 20.0 * np.log10(rms + 1e-10)
+
+    def frame_is_speech(self, pcm: bytes) -> np.ndarray:
+        return self.frame_levels_dbfs(pcm) > self.threshold_dbfs
+
+    def wav_frame_levels_dbfs(self, wav_path: str) -> np.ndarray:
+        """Frame levels of a WAV read chunk by chunk, so only the levels (50 per second) are held in memory."""
+        levels = []
+        with wave.open(wav_path, "rb") as wav:
+            frames_per_read = DEFAULT_CHUNK_BYTES // self.frame_bytes * self.frame_bytes // TARGET_SAMPLE_WIDTH
+            for pcm in iter(lambda: wav.readframes(frames_per_read), b""):
+                levels.append(self.frame_levels_dbfs(pcm))
+        return np.concatenate(levels) if levels else np.zeros(0, dtype=np.float32)
+
+    def segment_bounds(self, pcm: bytes, target_seconds: float, max_seconds: float) -> list[tuple[int, int]]:
+        """Byte ranges of at most max_seconds, each cut at the quietest frame after target_seconds."""
+        return self.segment_bounds_from_levels(self.frame_levels_dbfs(pcm), len(pcm), target_seconds, max_seconds)
+
+    def segment_bounds_from_levels(self, levels: np.ndarray, total_bytes: int, target_seconds: float, max_seconds: float) -> list[tuple[int, int]]:
+        frame_seconds = self.frame_bytes / (TARGET_FRAME_RATE * TARGET_SAMPLE_WIDTH)
+        target_frames = max(int(target_seconds / frame_seconds), 1)
+        max_frames = max(int(max_seconds / frame_seconds), target_frames + 1)
+        bounds = []
+        start = 0
+        while len(levels) - start > max_frames:
+            cut = start + target_frames + int(np.argmin(levels[start + target_frames : start + max_frames]))
+            bounds.append((start * self.frame_bytes, cut * self.frame_bytes))
+            start = cut
+        bounds.append((start * self.frame_bytes, total_bytes))
+        return bounds
+
+    def split_pcm_chunks(self, pcm_chunks: Iterable[bytes], target_seconds: float, max_seconds: float) -> Iterator[tuple[int, bytes]]:
+        """Tag streamed PCM with its segment index; a segment ends at the first quiet frame after target_seconds, or at max_seconds.
+
+        Unlike segment_bounds this cannot look ahead for the quietest frame, but it cuts as the audio arrives.
+        """
+        frame_seconds = self.frame_bytes / (TARGET_FRAME_RATE * TARGET_SAMPLE_WIDTH)
+        target_frames = max(int(target_seconds / frame_seconds), 1)
+        max_frames = max(int(max_seconds / frame_seconds), target_frames + 1)
+        segment = 0
+        segment_frames = 0
+        remainder = b""
+        for chunk in pcm_chunks:
+            pcm = remainder + chunk
+            usable = len(pcm) // self.frame_bytes * self.frame_bytes
+            remainder = pcm[usable:]
+            start = 0
+            for index, is_speech in enumerate(self.frame_is_speech(pcm[:usable])):
+                if segment_frames >= max_frames or (segment_frames >= target_frames and not is_speech):
+                    if index > start:
+                        yield segment, pcm[start * self.frame_bytes : index * self.frame_bytes]
+                    start = index
+                    segment += 1
+                    segment_frames = 0
+                segment_frames += 1
+            if usable > start * self.frame_bytes:
+                yield segment, pcm[start * self.frame_bytes : usable]
+        if remainder:
+            yield segment, remainder
+
+    def filter_pcm_chunks(self, pcm_chunks: Iterable[bytes]) -> Iterator[bytes]:
+        """Yield the PCM with long silences dropped.
+
+        Audio before the first speech frame is held back (up to max_leading_ms) so that a recording that never rises
+        above the threshold, usually a quiet one rather than silence, is passed on whole, as trim_wav does.
+        """
+        remainder = b""
+        leading: list[bytes] = []
+        passing_through = False
+        silence: list[bytes] | collections.deque[bytes] = []
+        seen_speech = False
+        for chunk in pcm_chunks:
+            pcm = remainder + chunk
+            usable = len(pcm) // self.frame_bytes * self.frame_bytes
+            remainder = pcm[usable:]
+            kept: list[bytes] = []
+            for index, is_speech in enumerate(self.frame_is_speech(pcm[:usable])):
+                frame = pcm[index * self.frame_bytes : (index + 1) * self.frame_bytes]
+                self.total_frames += 1
+                if not seen_speech and not is_speech:
+                    if passing_through:
+                        kept.append(frame)
+                    else:
+                        leading.append(frame)
+                        if len(leading) > self.max_leading_frames:
+                            # No speech for that long: most likely a quiet recording, so stop holding it back.
+                            kept.extend(leading)
+                            leading = []
+                            passing_through = True
+                    continue
+                if not is_speech:
+                    silence.append(frame)
+                    if isinstance(silence, list) and len(silence) > self.max_silence_frames:
+                        # Long gap: keep a padding after the speech, then only the latest padding frames before the next speech.
+                        kept.extend(silence[: self.padding_frames])
+                        silence = collections.deque(silence[len(silence) - self.padding_frames :], maxlen=self.padding_frames)
+                    continue
+                self.speech_frames += 1
+                if not seen_speech:
+                    kept.extend(leading[len(leading) - self.padding_frames :])
+                    leading = []
+                    seen_speech = True
+                kept.extend(silence)
+                kept.append(frame)
+                silence = []
+            self.kept_frames += len(kept)
+            if kept:
+                yield b"".join(kept)
+        tail = leading if not seen_speech else silence[: self.padding_frames] if isinstance(silence, list) else []
+        if tail:
+            self.kept_frames += len(tail)
+            yield b"".join(tail)
+        logging.info(f"[VoiceActivityDetector] speech ratio {self.speech_ratio:.0%}, kept {self.kept_frames}/{self.total_frames} frames")
+
+    def trim_wav(self, wav_path: str, upload_dir: str, speech_path: str | None = None) -> str:
+        """Write the speech-only WAV into upload_dir (as speech_path when given) and return its path (the input path when nothing is dropped)."""
+        os.makedirs(upload_dir, exist_ok=True)
+        fd, partial_path = tempfile.mkstemp(dir=upload_dir, suffix=".part")
+        try:
+            with os.fdopen(fd, "wb") as partial_file, wave.open(partial_file, "wb") as out, wave.open(wav_path, "rb") as src:
+                out.setnchannels(TARGET_CHANNELS)
+                out.setsampwidth(TARGET_SAMPLE_WIDTH)
+                out.setframerate(TARGET_FRAME_RATE)
+                chunks = iter(lambda: src.readframes(DEFAULT_CHUNK_BYTES // TARGET_SAMPLE_WIDTH), b"")
+                for speech in self.filter_pcm_chunks(chunks):
+                    out.writeframes(speech)
+            if self.kept_frames == self.total_frames or not self.speech_frames:
+                # Nothing above the threshold usually means a quiet recording rather than silence, so STT gets all of it.
+                os.remove(partial_path)
+                return wav_path
+            speech_path = speech_path or os.path.join(upload_dir, os.path.splitext(os.path.basename(wav_path))[0] + ".speech.wav")
+            os.replace(partial_path, speech_path)
+            return speech_path
+        except BaseException:
+            if os.path.exists(partial_path):
+                os.remove(partial_path)
+            raise
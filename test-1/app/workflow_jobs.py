@@ -0,0 +1,93 @@
+import contextvars
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import TYPE_CHECKING, Any
+
+from app.workflow_orchestrator import WorkflowOrchestrator
+
+
+if TYPE_CHECKING:
+    from googleapiclient.discovery import Resource
+
+
+DEFAULT_MAX_WORKERS = int(os.getenv("CARECALL_WORKFLOW_WORKERS", "8"))
+FINISHED_JOB_TTL_SECONDS = 600.0
+
+
+class WorkflowJob:
+    def __init__(self, key: str):
+        self.key = key
+        self.stage: str | None = None
+        self.finished_at: float | None = None
+        self._answer_parts: list[str] = []
+        self._future: Future | None = None
+
+    def set_stage(self, stage: str) -> None:
+        self.stage = stage
+
+    def add_answer_text(self, token: str) -> None:
+        self._answer_parts.append(token)
+
+    @property
+    def answer_text(self) -> str:
+        return "".join(self._answer_parts)
+
+    def done(self) -> bool:
+        return self._future is not None and self._future.done()
+
+    def result(self) -> dict[str, Any]:
+        """The orchestrate_workflow result; raises its WorkflowError. Only call once done() is True."""
+        return self._future.result()
+
+
+class WorkflowJobRunner:
+    """Runs workflows on a shared executor so a Streamlit script run never waits on STT, LLM or Calendar calls.
+
+    Jobs are keyed by the caller (e.g. session and file signature): submitting a key that is already known
+    returns the existing job, so reruns poll the same work instead of starting it again.
+    """
+
+    _executor = ThreadPoolExecutor(max_workers=DEFAULT_MAX_WORKERS, thread_name_prefix="workflow-job")
+    _lock = threading.Lock()
+    _jobs: "OrderedDict[str, WorkflowJob]" = OrderedDict()
+
+    @staticmethod
+    def _prune(now: float) -> None:
+        # Results nobody came back for (closed tab, new upload) are dropped after FINISHED_JOB_TTL_SECONDS.
+        for key, job in list(WorkflowJobRunner._jobs.items()):
+            if job.finished_at is not None and now - job.finished_at > FINISHED_JOB_TTL_SECONDS:
+                del WorkflowJobRunner._jobs[key]
+
+    @staticmethod
+    def submit(key: str, audio_source: str | bytes, calendar_service: "Resource", calendar_id: str, **workflow_options: Any) -> WorkflowJob:
+        with WorkflowJobRunner._lock:
+            WorkflowJobRunner._prune(time.monotonic())
+            job = WorkflowJobRunner._jobs.get(key)
+            if job is not None:
+                return job
+            job = WorkflowJob(key)
+            WorkflowJobRunner._jobs[key] = job
+
+        def run() -> dict[str, Any]:
+            try:
+                return WorkflowOrchestrator.orchestrate_workflow(audio_source, calendar_service, calendar_id, on_stage=job.set_stage, on_answer_text=job.add_answer_text, **workflow_options)
+            finally:
+                job.finished_at = time.monotonic()
+
+        job._future = WorkflowJobRunner._executor.submit(contextvars.copy_context().run, run)
+        logging.info(f"[WorkflowJobRunner.submit] Job {key} queued")
+        return job
+
+    @staticmethod
+    def get(key: str) -> WorkflowJob | None:
+        with WorkflowJobRunner._lock:
+            return WorkflowJobRunner._jobs.get(key)
+
+    @staticmethod
+    def discard(key: str) -> None:
+        with WorkflowJobRunner._lock:
+            WorkflowJobRunner._jobs.pop(key, None)
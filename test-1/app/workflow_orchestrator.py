@@ -1,15 +1,23 @@
 import logging
-import time
-from typing import Any
+from collections.abc import Callable
+from typing import TYPE_CHECKING, Any
 
-from googleapiclient.discovery import Resource
-
-from app.audio_upload import AudioUpload, AudioUploadError
-from app.azure_speech_service import AzureSpeechService, SpeechToTextError
+from app.calendar_prefetch import CalendarPrefetcher
 from app.config import EnvVars, get_env_var
+from app.enums import WorkflowStage
 from app.google_auth import AuthError, get_google_auth_url
 from app.google_calendar_integration import GoogleCalendarIntegration
+from app.local_intent_parser import LocalIntentParser
+from app.metrics import stage_span, workflow_run
 from app.openai_function_calling import OpenAIFunctionCalling
+from app.resilience import CircuitOpenError, RetryBudget
+
+
+if TYPE_CHECKING:
+    from googleapiclient.discovery import Resource
+
+
+DEFAULT_DEADLINE_SECONDS = 180.0
 
 
 class ConfigError(Exception):
@@ -39,37 +47,111 @@ class WorkflowOrchestrator:
         return url
 
     @staticmethod
-    def orchestrate_workflow(audio_file_path: str, calendar_service: Resource, calendar_id: str, max_retries: int = 3) -> dict[str, Any]:
+    def orchestrate_workflow(
+        audio_source: str | bytes,
+        calendar_service: "Resource",
+        calendar_id: str,
+        max_retries: int = 3,
+        stream_audio: bool = False,
+        keep_wav: bool = False,
+        checkpoints: dict[str, Any] | None = None,
+        deadline_seconds: float | None = DEFAULT_DEADLINE_SECONDS,
+        stream_llm: bool = False,
+        on_answer_text: Callable[[str], None] | None = None,
+        on_stage: Callable[[str], None] | None = None,
+        idempotency_key: str | None = None,
+    ) -> dict[str, Any]:
+        # Audio, speech SDK and numpy are imported here rather than at module level, so importing the orchestrator stays cheap.
+        from app.audio_spool import get_audio_spool
+        from app.audio_upload import AudioUpload, AudioUploadError
+        from app.azure_speech_service import AzureSpeechService, SpeechToTextError
+        from app.voice_activity import VoiceActivityDetector
+
         logger = logging.getLogger(__name__)
-        logger.info("[orchestrate_workflow] orchestrate_workflow Start")
-        attempt = 0
-        while attempt < max_retries:
-            attempt += 1
-            logger.debug(f"[orchestrate_workflow] Attempt {attempt}/{max_retries}")
+        stage_outputs = checkpoints if checkpoints is not None else {}
+        budget = RetryBudget(max_retries=max(max_retries - 1, 0), deadline_seconds=deadline_seconds)
+        prefetcher: CalendarPrefetcher | None = None
+        pinned: str | None = None
+
+        def run_stage(stage: WorkflowStage, func: Callable[[], Any]) -> Any:
+            if stage.value in stage_outputs:
+                logger.info(f"[orchestrate_workflow] Stage {stage.value} restored from checkpoint")
+                return stage_outputs[stage.value]
+            logger.debug(f"[orchestrate_workflow] Stage {stage.value} start")
+            if on_stage:
+                on_stage(stage.value)
+
+            def attempt() -> Any:
+                with stage_span(stage.value):
+                    return func()
+
+            stage_outputs[stage.value] = budget.call(stage.value, attempt, fatal=(AudioUploadError, AuthError, CircuitOpenError))
+            return stage_outputs[stage.value]
+
+        with workflow_run() as run:
+            logger.info(f"[orchestrate_workflow] orchestrate_workflow Start (correlation_id={run['correlation_id']})")
+            # Without a caller key the run's own ID keeps event IDs stable across this run's CALENDAR stage retries.
+            idempotency_key = idempotency_key or run["correlation_id"]
+
+            def finish(result: dict[str, Any]) -> dict[str, Any]:
+                run["status"] = result["status"]
+                return {**result, "correlation_id": run["correlation_id"]}
+
             try:
-                uploaded = AudioUpload.handle_audio_upload(audio_file_path)
-                recognized = AzureSpeechService.transcribe_audio(uploaded)
+                if stream_audio:
+                    recognized = run_stage(
+                        WorkflowStage.TRANSCRIBE,
+                        lambda: AzureSpeechService.transcribe_stream(
+                            VoiceActivityDetector().filter_pcm_chunks(AudioUpload.stream_audio(audio_source, keep_wav=keep_wav)),
+                            source_digest=AudioUpload.source_digest(audio_source),
+                        ),
+                    )
+                else:
+                    uploaded = run_stage(WorkflowStage.UPLOAD, lambda: AudioUpload.ingest_speech(audio_source))
+                    # Keeps the spool collector off the WAV until this run is done with it.
+                    pinned = get_audio_spool().acquire(uploaded)
+                    recognized = run_stage(WorkflowStage.TRANSCRIBE, lambda: AzureSpeechService.transcribe_audio(uploaded, max_retries=1))
                 if not recognized:
                     logger.warning("[orchestrate_workflow] No speech recognized")
-                    return {"status": "no_speech"}
-                llm_result = OpenAIFunctionCalling.call_llm_with_functions(recognized)
+                    return finish({"status": "no_speech"})
+                local_result = None
+                if WorkflowStage.INTERPRET.value not in stage_outputs:
+                    local_result = LocalIntentParser.parse(recognized)
+                    if local_result is None:
+                        # Likely list_events ranges are fetched while the LLM request is in flight.
+                        prefetcher = CalendarPrefetcher(calendar_service, calendar_id, recognized)
+                llm_result = run_stage(
+                    WorkflowStage.INTERPRET,
+                    lambda: local_result or OpenAIFunctionCalling.call_llm_with_functions(recognized, max_retries_count=1, stream=stream_llm, on_text=on_answer_text),
+                )
                 if "function_name" not in llm_result:
-                    return {"status": "answer_only", "answer": llm_result.get("answer", "")}
+                    return finish({"status": "answer_only", "answer": llm_result.get("answer", "")})
                 fn_name = llm_result["function_name"]
                 fn_args = llm_result["arguments"]
-                res_cal = GoogleCalendarIntegration.perform_calendar_operation(calendar_service, calendar_id, fn_name, fn_args)
-                return {"status": "success", "function_name": fn_name, "function_args": fn_args, "calendar_result": res_cal}
+
+                def calendar_operation() -> Any:
+                    if prefetcher:
+                        hit, prefetched = prefetcher.take(fn_name, fn_args)
+                        if hit:
+                            return prefetched
+                    return GoogleCalendarIntegration.perform_calendar_operation(calendar_service, calendar_id, fn_name, fn_args, max_retries=1, idempotency_key=idempotency_key)
+
+                res_cal = run_stage(WorkflowStage.CALENDAR, calendar_operation)
+                return finish({"status": "success", "function_name": fn_name, "function_args": fn_args, "calendar_result": res_cal})
             except (AudioUploadError, SpeechToTextError) as ex:
-                logger.error(f"[orchestrate_workflow] Audio or STT error on attempt {attempt}: {ex}")
-                if attempt == max_retries:
-                    raise WorkflowError(str(ex)) from ex
-                time.sleep(1)
+                logger.error(f"[orchestrate_workflow] Audio or STT error after {budget.retries_used} retries: {ex}")
+                raise WorkflowError(str(ex)) from ex
+            except CircuitOpenError as ex:
+                logger.error(f"[orchestrate_workflow] Backend unavailable: {ex}")
+                raise WorkflowError(str(ex)) from ex
             except AuthError as ex:
                 logger.error(f"[orchestrate_workflow] Auth error: {ex}")
                 raise WorkflowError("Authentication error") from ex
             except Exception as ex:
-                logger.error(f"[orchestrate_workflow] Unexpected error: {ex}")
-                if attempt == max_retries:
-                    raise WorkflowError("Unexpected workflow error") from ex
-                time.sleep(1)
-        return {}
+                logger.error(f"[orchestrate_workflow] Unexpected error after {budget.retries_used} retries: {ex}")
+                raise WorkflowError("Unexpected workflow error") from ex
+            finally:
+                if prefetcher:
+                    prefetcher.close()
+                if pinned:
+                    get_audio_spool().release(pinned)
@@ -0,0 +1,50 @@
+import argparse
+import os
+import statistics
+import sys
+import time
+
+from app.local_intent_parser import LocalIntentParser
+
+
+DEFAULT_CORPUS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "transcripts.txt")
+
+
+def load_corpus(path: str) -> list[str]:
+    with open(path, encoding="utf-8") as corpus:
+        return [line.strip() for line in corpus if line.strip() and not line.startswith("#")]
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Measure local intent parser hit rate and latency on a transcript corpus.")
+    parser.add_argument("corpus", nargs="?", default=DEFAULT_CORPUS, help="Text file with one transcript per line")
+    parser.add_argument("--repeat", type=int, default=200, help="Timed passes over the corpus")
+    parser.add_argument("--verbose", "-v", action="store_true", help="Print the parse result of every transcript")
+    return parser.parse_args(argv)
+
+
+def main(argv: list[str] | None = None) -> int:
+    args = parse_args(argv)
+    transcripts = load_corpus(args.corpus)
+    results = [LocalIntentParser.parse(text) for text in transcripts]
+    if args.verbose:
+        for text, result in zip(transcripts, results, strict=True):
+            print(f"{'HIT ' if result else 'MISS'} {text} -> {result}")
+
+    latencies_us = []
+    for _ in range(args.repeat):
+        for text in transcripts:
+            started = time.perf_counter()
+            LocalIntentParser.parse(text)
+            latencies_us.append((time.perf_counter() - started) * 1e6)
+    latencies_us.sort()
+
+    hits = sum(result is not None for result in results)
+    print(f"transcripts: {len(transcripts)}")
+    print(f"hit rate:    {hits}/{len(transcripts)} ({hits / len(transcripts):.0%})")
+    print(f"latency us:  mean={statistics.fmean(latencies_us):.1f} p50={latencies_us[len(latencies_us) // 2]:.1f} p99={latencies_us[int(len(latencies_us) * 0.99)]:.1f} max={latencies_us[-1]:.1f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,82 @@
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HEAVY_MODULES = ("azure.cognitiveservices.speech", "openai", "googleapiclient", "pydub", "numpy", "streamlit_calendar")
+# What streamlit_app.py imports before anyone has signed in, and what the first workflow run adds on top.
+SCENARIOS = {
+    "sign-in page": [
+        "app.audio_spool",
+        "app.clients",
+        "app.enums",
+        "app.google_auth",
+        "app.metrics",
+        "app.oauth_callback",
+        "app.token_store",
+        "app.workflow_jobs",
+        "app.workflow_orchestrator",
+    ],
+    "first workflow": ["app.workflow_jobs", "app.audio_upload", "app.azure_speech_service", "app.voice_activity", "app.openai_function_calling", "openai"],
+}
+IMPORT_PROBE = """
+import json, sys, time
+started = time.perf_counter()
+for name in {modules!r}:
+    __import__(name)
+elapsed = time.perf_counter() - started
+print(json.dumps({{"seconds": elapsed, "heavy": [name for name in {heavy!r} if name in sys.modules]}}))
+"""
+CALENDAR_PROBE = """
+import json, time
+from google.oauth2.credentials import Credentials
+from app.clients import ClientRegistry
+timings = {}
+started = time.perf_counter()
+ClientRegistry.calendar_service(Credentials(token="first-user"))
+timings["first service (import + build)"] = time.perf_counter() - started
+started = time.perf_counter()
+ClientRegistry.calendar_service(Credentials(token="second-user"))
+timings["new user service (build)"] = time.perf_counter() - started
+credentials = Credentials(token="rerun")
+ClientRegistry.calendar_service(credentials)
+started = time.perf_counter()
+for _ in range(1000):
+    ClientRegistry.calendar_service(credentials)
+timings["rerun service lookup"] = (time.perf_counter() - started) / 1000
+print(json.dumps(timings))
+"""
+
+
+def run_probe(code: str) -> dict:
+    # A fresh interpreter per sample: import costs only show up once per process.
+    output = subprocess.run([sys.executable, "-c", code], cwd=REPO_ROOT, check=True, capture_output=True, text=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Measure cold-start import time and Calendar service creation cost of the CareCall app.")
+    parser.add_argument("--repeat", type=int, default=5, help="Fresh interpreters per measurement (the median is reported)")
+    return parser.parse_args(argv)
+
+
+def main(argv: list[str] | None = None) -> int:
+    args = parse_args(argv)
+    for scenario, modules in SCENARIOS.items():
+        samples = [run_probe(IMPORT_PROBE.format(modules=modules, heavy=HEAVY_MODULES)) for _ in range(args.repeat)]
+        seconds = statistics.median(sample["seconds"] for sample in samples)
+        print(f"{scenario + ' imports:':<32} {seconds * 1000:8.1f} ms  heavy modules loaded: {', '.join(samples[-1]['heavy']) or 'none'}")
+
+    calendar_samples = [run_probe(CALENDAR_PROBE) for _ in range(args.repeat)]
+    for name in calendar_samples[0]:
+        seconds = statistics.median(sample[name] for sample in calendar_samples)
+        print(f"{name + ':':<32} {seconds * 1000:8.3f} ms")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,229 @@
+import argparse
+import asyncio
+import json
+import logging
+import math
+import os
+import resource
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any
+from unittest import mock
+
+from app import audio_spool, azure_speech_service, openai_function_calling
+from app.async_pipeline import AsyncWorkflowPipeline
+from app.audio_spool import AudioSpool
+from app.batch import iter_audio_sources
+from app.calendar_prefetch import CalendarPrefetcher
+from app.llm_result_cache import DEFAULT_MAX_ENTRIES, LLMResultCache
+from app.metrics import get_metrics_registry
+from app.normalization_pool import NormalizationPool
+from app.resilience import backend_guard_stats
+from app.transcript_cache import DEFAULT_MAX_ENTRIES as TRANSCRIPT_CACHE_MAX_ENTRIES
+from app.transcript_cache import TranscriptCache
+from app.workflow_orchestrator import WorkflowError, WorkflowOrchestrator
+from benchmarks.fakes import FakeAsyncOpenAI, FakeCalendarService, FakeOpenAI, FakeSpeechConfig, LatencyProfile, install_fakes
+
+
+DEFAULT_SOURCES = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "tickets")
+CALENDAR_ID = "primary"
+PERCENTILES = (50, 95, 99)
+# Stage names recorded by stage_span: the workflow stages and the finer spans inside them.
+STAGES = ("upload", "transcribe", "interpret", "calendar", "upload_copy", "decode", "stt", "llm")
+
+
+def percentile(sorted_values: list[float], pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(max(math.ceil(pct / 100 * len(sorted_values)) - 1, 0), len(sorted_values) - 1)]
+
+
+def summarize(values: list[float]) -> dict[str, float]:
+    values = sorted(values)
+    return {"count": len(values), **{f"p{pct}": percentile(values, pct) for pct in PERCENTILES}}
+
+
+def peak_rss_mb() -> dict[str, float]:
+    # ru_maxrss is in KiB on Linux; for children it is the largest single child (e.g. one ffmpeg), not a sum.
+    return {
+        "self": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        "children": resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024,
+    }
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Drive the CareCall workflow against local fakes of Azure Speech, Azure OpenAI and Google Calendar and report throughput, per-stage percentiles and peak RSS."
+    )
+    parser.add_argument("input", nargs="?", default=DEFAULT_SOURCES, help="Directory of audio files or manifest (default: tickets/)")
+    parser.add_argument("--mode", choices=("sync", "stream", "async"), default="sync", help="orchestrate_workflow on files, orchestrate_workflow streaming, or the async batch pipeline")
+    parser.add_argument("--runs", type=int, default=20, help="Workflows to run, cycling over the input recordings")
+    parser.add_argument("--concurrency", type=int, default=4, help="Concurrent workflows (threads, or max in flight for --mode async)")
+    parser.add_argument("--normalize-workers", type=int, default=0, help="Normalization processes for --mode async (0 to normalize in threads)")
+    parser.add_argument("--stt", type=LatencyProfile.parse, default="0.4:1.2:0", help="Speech session latency as median[:p95[:error_rate]] seconds")
+    parser.add_argument("--stt-realtime-factor", type=float, default=0.3, help="Simulated speech processing seconds per second of audio")
+    parser.add_argument("--llm", type=LatencyProfile.parse, default="0.8:2.5:0", help="LLM time to first token as median[:p95[:error_rate]] seconds")
+    parser.add_argument("--llm-token-seconds", type=float, default=0.01, help="Simulated delay per streamed chunk of function arguments")
+    parser.add_argument("--stream-llm", action="store_true", help="Stream LLM responses (sync and stream modes)")
+    parser.add_argument("--calendar", type=LatencyProfile.parse, default="0.15:0.5:0", help="Calendar API round trip as median[:p95[:error_rate]] seconds")
+    parser.add_argument("--transcripts", help="Text file with one transcript per line returned by the fake recognizer (default: a built-in mix)")
+    parser.add_argument("--warm-caches", action="store_true", help="Let repeated recordings hit the transcript and LLM caches (by default the caches hold nothing)")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--json", dest="json_path", help="Also write the report as JSON (usable later as --baseline)")
+    parser.add_argument("--baseline", help="Report JSON to compare against; exits with status 1 on regression")
+    parser.add_argument("--max-regression", type=float, default=0.2, help="Allowed relative regression against --baseline (0.2 = 20%%)")
+    parser.add_argument("--min-delta-seconds", type=float, default=0.05, help="Latency increases smaller than this are never reported as regressions")
+    parser.add_argument("--verbose", "-v", action="store_true", help="Show the app logs")
+    return parser.parse_args(argv)
+
+
+def load_transcripts(path: str | None) -> list[str] | None:
+    if not path:
+        return None
+    with open(path, encoding="utf-8") as corpus:
+        return [line.strip() for line in corpus if line.strip() and not line.startswith("#")]
+
+
+def run_threads(args: argparse.Namespace, sources: list[str]) -> list[dict[str, Any]]:
+    thread_local = threading.local()
+
+    def calendar_service() -> FakeCalendarService:
+        # As in the app, each thread (each user session) owns its calendar service.
+        service = getattr(thread_local, "calendar_service", None)
+        if service is None:
+            service = thread_local.calendar_service = FakeCalendarService(args.calendar, seed=args.seed)
+        return service
+
+    def run_one(source: str) -> dict[str, Any]:
+        try:
+            return WorkflowOrchestrator.orchestrate_workflow(source, calendar_service(), CALENDAR_ID, stream_audio=args.mode == "stream", stream_llm=args.stream_llm)
+        except WorkflowError as ex:
+            return {"status": "error", "error": str(ex)}
+
+    with ThreadPoolExecutor(max_workers=args.concurrency, thread_name_prefix="bench-workflow") as executor:
+        return list(executor.map(run_one, sources))
+
+
+async def run_async(args: argparse.Namespace, sources: list[str]) -> list[dict[str, Any]]:
+    normalization_pool = NormalizationPool(args.normalize_workers) if args.normalize_workers > 0 else None
+    pipeline = AsyncWorkflowPipeline(FakeCalendarService(args.calendar, seed=args.seed), CALENDAR_ID, normalization_pool=normalization_pool)
+    results = []
+    try:
+        async for result in pipeline.run_batch(sources, max_in_flight=args.concurrency):
+            results.append(result)
+    finally:
+        if normalization_pool:
+            normalization_pool.shutdown()
+    return results
+
+
+def build_report(args: argparse.Namespace, results: list[dict[str, Any]], elapsed: float, llm_cache: LLMResultCache) -> dict[str, Any]:
+    registry = get_metrics_registry()
+    stages = {stage: summarize(registry.samples("carecall_stage_duration_seconds", stage=stage)) for stage in STAGES}
+    return {
+        "mode": args.mode,
+        "runs": len(results),
+        "concurrency": args.concurrency,
+        "elapsed_seconds": elapsed,
+        "throughput_per_second": len(results) / elapsed if elapsed else 0.0,
+        "statuses": dict(Counter(result["status"] for result in results)),
+        "workflow": summarize(registry.samples("carecall_workflow_duration_seconds")),
+        "stages": {stage: summary for stage, summary in stages.items() if summary["count"]},
+        "stage_errors": {
+            stage: sum(registry.counter_value("carecall_stage_errors_total", stage=stage, error=error) for error in registry.label_values("carecall_stage_errors_total", "error")) for stage in STAGES
+        },
+        "retries": sum(registry.counter_value("carecall_retries_total", stage=stage) for stage in registry.label_values("carecall_retries_total", "stage")),
+        "warm_caches": args.warm_caches,
+        "llm_cache": llm_cache.stats(),
+        "calendar_prefetch": CalendarPrefetcher.stats(),
+        "backends": backend_guard_stats(),
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
+def print_report(report: dict[str, Any]) -> None:
+    print(f"mode:        {report['mode']} ({report['runs']} runs, concurrency {report['concurrency']})")
+    print(f"throughput:  {report['throughput_per_second']:.2f} runs/s over {report['elapsed_seconds']:.1f}s")
+    print(f"statuses:    {', '.join(f'{status}={count}' for status, count in sorted(report['statuses'].items()))}, retries={report['retries']:g}")
+    print(f"peak RSS MB: self={report['peak_rss_mb']['self']:.0f} children={report['peak_rss_mb']['children']:.0f}")
+    for backend, stats in report["backends"].items():
+        print(f"{backend + ':':<12} calls={stats['calls']} hedges={stats['hedges_won']}/{stats['hedges_fired']} won, breaker={stats['breaker']['state']} rejected={stats['breaker']['rejected']}")
+    print(f"{'stage':<12} {'count':>6} {'p50 s':>8} {'p95 s':>8} {'p99 s':>8} {'errors':>7}")
+    for stage, summary in [("workflow", report["workflow"]), *report["stages"].items()]:
+        errors = report["stage_errors"].get(stage, 0)
+        print(f"{stage:<12} {summary['count']:>6} {summary['p50']:>8.3f} {summary['p95']:>8.3f} {summary['p99']:>8.3f} {errors:>7g}")
+
+
+def find_regressions(report: dict[str, Any], baseline: dict[str, Any], max_regression: float, min_delta_seconds: float) -> list[str]:
+    regressions = []
+
+    def check_higher_is_worse(label: str, current: float, previous: float, min_delta: float = 0.0) -> None:
+        if previous > 0 and current > previous * (1 + max_regression) and current - previous > min_delta:
+            regressions.append(f"{label}: {current:.3f} vs baseline {previous:.3f} (+{current / previous - 1:.0%})")
+
+    if baseline.get("throughput_per_second", 0) > 0 and report["throughput_per_second"] < baseline["throughput_per_second"] * (1 - max_regression):
+        regressions.append(f"throughput: {report['throughput_per_second']:.2f}/s vs baseline {baseline['throughput_per_second']:.2f}/s")
+    for pct in PERCENTILES[1:]:
+        check_higher_is_worse(f"workflow p{pct}", report["workflow"][f"p{pct}"], baseline.get("workflow", {}).get(f"p{pct}", 0), min_delta_seconds)
+        for stage, summary in report["stages"].items():
+            check_higher_is_worse(f"{stage} p{pct}", summary[f"p{pct}"], baseline.get("stages", {}).get(stage, {}).get(f"p{pct}", 0), min_delta_seconds)
+    check_higher_is_worse("peak RSS self MB", report["peak_rss_mb"]["self"], baseline.get("peak_rss_mb", {}).get("self", 0))
+    return regressions
+
+
+def main(argv: list[str] | None = None) -> int:
+    args = parse_args(argv)
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.CRITICAL, format="%(asctime)s %(levelname)s %(threadName)s %(message)s")
+    args.stt.seed(args.seed)
+    args.llm.seed(args.seed + 1)
+    args.calendar.seed(args.seed + 2)
+    recordings = list(iter_audio_sources(args.input))
+    if not recordings:
+        print(f"No audio files found in {args.input}", file=sys.stderr)
+        return 2
+    sources = [recordings[index % len(recordings)] for index in range(args.runs)]
+
+    speech_config = FakeSpeechConfig(args.stt, args.stt_realtime_factor, load_transcripts(args.transcripts), seed=args.seed)
+    registry = get_metrics_registry()
+    registry.reset()
+    registry.keep_samples = True
+    # Cold runs use caches that keep no entry, so every run still pays the lookup but never hits.
+    llm_cache = LLMResultCache(DEFAULT_MAX_ENTRIES if args.warm_caches else 0)
+    with tempfile.TemporaryDirectory(prefix="carecall-bench-") as cache_dir:
+        # A private transcript cache keeps benchmark runs out of the real .cache database.
+        transcript_cache = TranscriptCache(os.path.join(cache_dir, "transcripts.sqlite3"), max_entries=TRANSCRIPT_CACHE_MAX_ENTRIES if args.warm_caches else 0)
+        with (
+            install_fakes(speech_config, FakeOpenAI(args.llm, args.llm_token_seconds), FakeAsyncOpenAI(args.llm, args.llm_token_seconds)),
+            mock.patch.object(azure_speech_service, "get_transcript_cache", lambda: transcript_cache),
+            mock.patch.object(openai_function_calling, "get_llm_result_cache", lambda: llm_cache),
+            mock.patch.object(audio_spool, "_default_spool", AudioSpool(os.path.join(cache_dir, "spool"), reuse=args.warm_caches)),
+        ):
+            started = time.perf_counter()
+            results = asyncio.run(run_async(args, sources)) if args.mode == "async" else run_threads(args, sources)
+            elapsed = time.perf_counter() - started
+
+    report = build_report(args, results, elapsed, llm_cache)
+    print_report(report)
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as report_file:
+            json.dump(report, report_file, indent=2)
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as baseline_file:
+            baseline = json.load(baseline_file)
+        if (baseline.get("mode"), baseline.get("warm_caches")) != (report["mode"], report["warm_caches"]):
+            print(f"Warning: baseline was recorded with mode={baseline.get('mode')} warm_caches={baseline.get('warm_caches')}", file=sys.stderr)
+        regressions = find_regressions(report, baseline, args.max_regression, args.min_delta_seconds)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        if regressions:
+            return 1
+        print(f"No regression beyond {args.max_regression:.0%} against {args.baseline}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
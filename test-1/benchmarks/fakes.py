@@ -0,0 +1,423 @@
+"""Local stand-ins for Azure Speech, Azure OpenAI and Google Calendar, with configurable latency and error rates.
+
+Nothing here touches the network: install_fakes() swaps the SDK classes and shared clients the app uses, so
+orchestrate_workflow, the async pipeline and the batch runner can be timed offline with realistic waits.
+"""
+
+import asyncio
+import datetime
+import itertools
+import json
+import math
+import random
+import threading
+import time
+import wave
+from collections.abc import Iterator
+from contextlib import ExitStack, contextmanager
+from types import SimpleNamespace
+from typing import Any
+from unittest import mock
+
+from azure.cognitiveservices.speech import CancellationReason, ResultReason
+
+from app import azure_speech_service
+from app.audio_normalizer import TARGET_FRAME_RATE, TARGET_SAMPLE_WIDTH
+from app.calendar_event_store import UTC, parse_event_bound
+from app.clients import ClientRegistry
+from app.enums import FunctionName
+from app.local_intent_parser import LocalIntentParser
+
+
+# A z-score of 1.645 puts the configured p95 at the 95th percentile of the log-normal.
+P95_Z_SCORE = 1.645
+FAKE_OPENAI_SETTINGS = ("http://fake-openai.local", "fake-key", "fake-deployment")
+DEFAULT_TRANSCRIPTS = [
+    "Ajoute un rendez-vous chez le dentiste demain à 10h",
+    "Qu'est-ce que j'ai lundi prochain ?",
+    "Quels sont mes rendez-vous cette semaine ?",
+    "Est-ce que je suis libre jeudi après-midi pour voir Paul ?",
+    "Note le repas de famille chez mamie dimanche vers midi et demi",
+]
+
+
+class FakeBackendError(Exception):
+    pass
+
+
+class FakeConflictError(FakeBackendError):
+    """Shaped like googleapiclient's HttpError for a 409: callers look at exc.resp.status."""
+
+    def __init__(self, message: str):
+        super().__init__(message)
+        self.resp = SimpleNamespace(status=409)
+
+
+class LatencyProfile:
+    """Log-normal latency given by its median and p95, plus an independent error rate."""
+
+    def __init__(self, median_seconds: float, p95_seconds: float | None = None, error_rate: float = 0.0):
+        self.median_seconds = median_seconds
+        self.p95_seconds = max(p95_seconds if p95_seconds is not None else median_seconds, median_seconds)
+        self.error_rate = error_rate
+        self._sigma = math.log(self.p95_seconds / median_seconds) / P95_Z_SCORE if median_seconds > 0 else 0.0
+        self._rng = random.Random()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def parse(spec: str) -> "LatencyProfile":
+        """Build a profile from "median[:p95[:error_rate]]", e.g. "0.8:2.5:0.02"."""
+        values = [float(value) for value in spec.split(":")]
+        if not 1 <= len(values) <= 3:
+            raise ValueError(f"Expected median[:p95[:error_rate]], got {spec!r}")
+        return LatencyProfile(*values)
+
+    def seed(self, seed: int) -> "LatencyProfile":
+        self._rng.seed(seed)
+        return self
+
+    def sample(self) -> float:
+        if self.median_seconds <= 0:
+            return 0.0
+        with self._lock:
+            return self._rng.lognormvariate(math.log(self.median_seconds), self._sigma)
+
+    def fails(self) -> bool:
+        with self._lock:
+            return self._rng.random() < self.error_rate
+
+    def __repr__(self) -> str:
+        return f"LatencyProfile(median={self.median_seconds}, p95={self.p95_seconds}, error_rate={self.error_rate})"
+
+
+class FakeEventSignal:
+    def __init__(self):
+        self._callbacks = []
+
+    def connect(self, callback) -> None:
+        self._callbacks.append(callback)
+
+    def fire(self, evt: Any) -> None:
+        for callback in list(self._callbacks):
+            callback(evt)
+
+
+class FakeAudioStreamFormat:
+    def __init__(self, samples_per_second: int = TARGET_FRAME_RATE, bits_per_sample: int = TARGET_SAMPLE_WIDTH * 8, channels: int = 1):
+        self.bytes_per_second = samples_per_second * bits_per_sample // 8 * channels
+
+
+class FakePushAudioInputStream:
+    def __init__(self, stream_format: FakeAudioStreamFormat | None = None):
+        self.bytes_per_second = (stream_format or FakeAudioStreamFormat()).bytes_per_second
+        self.bytes_written = 0
+        self.closed = threading.Event()
+
+    def write(self, data: bytes) -> None:
+        self.bytes_written += len(data)
+
+    def close(self) -> None:
+        self.closed.set()
+
+
+class FakeAudioConfig:
+    def __init__(self, filename: str | None = None, stream: FakePushAudioInputStream | None = None):
+        self.filename = filename
+        self.stream = stream
+
+
+class FakeSpeechConfig:
+    """Stands in for SpeechConfig and carries the simulated service behaviour.
+
+    A session ends latency.sample() seconds after the audio is available, plus realtime_factor seconds
+    per second of audio; pushed streams are available once closed, files immediately.
+    """
+
+    def __init__(self, latency: LatencyProfile, realtime_factor: float = 0.3, transcripts: list[str] | None = None, seed: int = 0):
+        self.latency = latency
+        self.realtime_factor = realtime_factor
+        self.transcripts = transcripts or DEFAULT_TRANSCRIPTS
+        self.speech_recognition_language = "fr-FR"
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def pick_transcript(self) -> str:
+        with self._lock:
+            return self._rng.choice(self.transcripts)
+
+
+class FakeSpeechRecognizer:
+    def __init__(self, speech_config: FakeSpeechConfig, audio_config: FakeAudioConfig):
+        self.speech_config = speech_config
+        self.audio_config = audio_config
+        self.recognized = FakeEventSignal()
+        self.canceled = FakeEventSignal()
+        self.session_stopped = FakeEventSignal()
+        self._stopped = threading.Event()
+
+    def start_continuous_recognition(self) -> None:
+        threading.Thread(target=self._run_session, daemon=True, name="fake-speech-session").start()
+
+    def stop_continuous_recognition(self) -> None:
+        self._stopped.set()
+
+    def _audio_seconds(self) -> float:
+        stream = self.audio_config.stream
+        if stream is not None:
+            while not stream.closed.wait(0.05):
+                if self._stopped.is_set():
+                    return 0.0
+            return stream.bytes_written / stream.bytes_per_second
+        with wave.open(self.audio_config.filename, "rb") as wav:
+            return wav.getnframes() / wav.getframerate()
+
+    def _run_session(self) -> None:
+        started = time.monotonic()
+        audio_seconds = self._audio_seconds()
+        config = self.speech_config
+        # Streamed audio is recognized while it is pushed, so only the part not already covered by the push remains.
+        processing = max(audio_seconds * config.realtime_factor - (time.monotonic() - started), 0.0)
+        if self._stopped.wait(processing + config.latency.sample()):
+            return
+        if config.latency.fails():
+            details = SimpleNamespace(reason=CancellationReason.Error, code="ServiceUnavailable", error_details="Injected speech service failure")
+            self.canceled.fire(SimpleNamespace(cancellation_details=details))
+            return
+        if audio_seconds > 0:
+            self.recognized.fire(SimpleNamespace(result=SimpleNamespace(reason=ResultReason.RecognizedSpeech, text=config.pick_transcript())))
+        self.session_stopped.fire(SimpleNamespace())
+
+
+class FakeOpenAI:
+    """chat.completions.create() answering with the function call the app would expect for the transcript.
+
+    latency is the time to the first token; each further chunk of the streamed arguments costs token_seconds.
+    """
+
+    STREAM_CHUNK_CHARS = 8
+
+    def __init__(self, latency: LatencyProfile, token_seconds: float = 0.01):
+        self.latency = latency
+        self.token_seconds = token_seconds
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+        self.models = SimpleNamespace(list=lambda: [])
+
+    def with_options(self, **options: Any) -> "FakeOpenAI":
+        return self
+
+    def close(self) -> None:
+        return None
+
+    @staticmethod
+    def function_call_for(messages: list[dict[str, str]]) -> tuple[str, str]:
+        text = messages[-1]["content"]
+        result = LocalIntentParser.parse(text)
+        if result is None:
+            # What the parser cannot handle is answered with a one-day listing, the cheapest calendar call.
+            result = {"function_name": FunctionName.LIST_EVENTS.value, "arguments": {"date": datetime.date.today().isoformat()}}
+        return result["function_name"], json.dumps(result["arguments"], ensure_ascii=False)
+
+    def _arguments_chunks(self, arguments: str) -> list[str]:
+        return [arguments[index : index + FakeOpenAI.STREAM_CHUNK_CHARS] for index in range(0, len(arguments), FakeOpenAI.STREAM_CHUNK_CHARS)]
+
+    @staticmethod
+    def _message(name: str, arguments: str) -> SimpleNamespace:
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(function_call=SimpleNamespace(name=name, arguments=arguments), content=None))])
+
+    def create(self, messages: list[dict[str, str]], stream: bool = False, **request: Any) -> Any:
+        name, arguments = FakeOpenAI.function_call_for(messages)
+        first_token = self.latency.sample()
+        if self.latency.fails():
+            time.sleep(first_token)
+            raise FakeBackendError("Injected Azure OpenAI failure")
+        chunks = self._arguments_chunks(arguments)
+        if stream:
+            return FakeChatStream(name, chunks, first_token, self.token_seconds)
+        time.sleep(first_token + self.token_seconds * len(chunks))
+        return FakeOpenAI._message(name, arguments)
+
+
+class FakeChatStream:
+    """Streamed function call that, like the SDK's Stream, can be closed from another thread to drop the response."""
+
+    def __init__(self, name: str, chunks: list[str], first_token: float, token_seconds: float):
+        self.name = name
+        self.chunks = chunks
+        self.first_token = first_token
+        self.token_seconds = token_seconds
+        self.closed = threading.Event()
+
+    def __iter__(self) -> Iterator[SimpleNamespace]:
+        for index, chunk in enumerate(self.chunks):
+            if self.closed.wait(self.first_token if index == 0 else self.token_seconds):
+                raise FakeBackendError("Response stream closed")
+            function_call = SimpleNamespace(name=self.name if index == 0 else None, arguments=chunk)
+            yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(function_call=function_call, content=None))])
+
+    def close(self) -> None:
+        self.closed.set()
+
+
+class FakeAsyncOpenAI(FakeOpenAI):
+    def __init__(self, latency: LatencyProfile, token_seconds: float = 0.01):
+        super().__init__(latency, token_seconds)
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create_async))
+
+    async def create_async(self, messages: list[dict[str, str]], **request: Any) -> Any:
+        name, arguments = FakeOpenAI.function_call_for(messages)
+        first_token = self.latency.sample()
+        if self.latency.fails():
+            await asyncio.sleep(first_token)
+            raise FakeBackendError("Injected Azure OpenAI failure")
+        await asyncio.sleep(first_token + self.token_seconds * len(self._arguments_chunks(arguments)))
+        return FakeOpenAI._message(name, arguments)
+
+
+class FakeHttpRequest:
+    def __init__(self, service: "FakeCalendarService", operation: str, params: dict[str, Any]):
+        self.service = service
+        self.operation = operation
+        self.params = params
+
+    def run(self) -> Any:
+        if self.operation == "insert":
+            return self.service.insert_event(self.params["body"])
+        if self.operation == "get":
+            return self.service.get_event(self.params["eventId"])
+        return self.service.list_events(**self.params)
+
+    def execute(self) -> Any:
+        self.service.wait_round_trip()
+        return self.run()
+
+
+class FakeEventsResource:
+    def __init__(self, service: "FakeCalendarService"):
+        self.service = service
+
+    def insert(self, calendarId: str, body: dict[str, Any]) -> FakeHttpRequest:  # noqa: N803 (Calendar API parameter name)
+        return FakeHttpRequest(self.service, "insert", {"body": body})
+
+    def get(self, calendarId: str, eventId: str) -> FakeHttpRequest:  # noqa: N803 (Calendar API parameter names)
+        return FakeHttpRequest(self.service, "get", {"eventId": eventId})
+
+    def list(self, **params: Any) -> FakeHttpRequest:
+        return FakeHttpRequest(self.service, "list", params)
+
+
+class FakeBatchHttpRequest:
+    def __init__(self, service: "FakeCalendarService", callback):
+        self.service = service
+        self.callback = callback
+        self.requests: list[tuple[str, FakeHttpRequest]] = []
+
+    def add(self, request: FakeHttpRequest, request_id: str) -> None:
+        self.requests.append((request_id, request))
+
+    def execute(self) -> None:
+        # One HTTP round trip for the whole batch; each part can still fail on its own.
+        time.sleep(self.service.latency.sample())
+        for request_id, request in self.requests:
+            if self.service.latency.fails():
+                self.callback(request_id, None, FakeBackendError("Injected Calendar API failure"))
+                continue
+            try:
+                response = request.run()
+            except FakeBackendError as ex:
+                self.callback(request_id, None, ex)
+            else:
+                self.callback(request_id, response, None)
+
+
+class FakeCalendarService:
+    """In-memory Calendar v3 with events().insert/get/list, client-chosen IDs (409 on reuse), sync tokens, paging and batch requests."""
+
+    def __init__(self, latency: LatencyProfile, events_per_day: int = 3, days_around_today: int = 60, seed: int = 0):
+        self.latency = latency
+        self.calls = 0
+        self._lock = threading.Lock()
+        self._ids = itertools.count()
+        self._events: list[dict[str, Any]] = []
+        self._changes: list[tuple[int, dict[str, Any]]] = []
+        rng = random.Random(seed)
+        today = datetime.date.today()
+        for offset in range(-days_around_today, days_around_today + 1):
+            day = today + datetime.timedelta(days=offset)
+            for _ in range(events_per_day):
+                start = datetime.datetime.combine(day, datetime.time(rng.randint(8, 18), rng.choice((0, 15, 30, 45))))
+                self._store(
+                    {"summary": "Rendez-vous", "start": {"dateTime": start.isoformat(), "timeZone": "UTC"}, "end": {"dateTime": (start + datetime.timedelta(hours=1)).isoformat(), "timeZone": "UTC"}}
+                )
+        self._changes.clear()
+
+    def events(self) -> FakeEventsResource:
+        return FakeEventsResource(self)
+
+    def new_batch_http_request(self, callback=None) -> FakeBatchHttpRequest:
+        return FakeBatchHttpRequest(self, callback)
+
+    def wait_round_trip(self) -> None:
+        with self._lock:
+            self.calls += 1
+        time.sleep(self.latency.sample())
+        if self.latency.fails():
+            raise FakeBackendError("Injected Calendar API failure")
+
+    def _store(self, body: dict[str, Any]) -> dict[str, Any]:
+        event = {"id": f"fake{next(self._ids)}", **body, "status": "confirmed"}
+        self._events.append(event)
+        self._changes.append((len(self._changes) + 1, event))
+        return event
+
+    def insert_event(self, body: dict[str, Any]) -> dict[str, Any]:
+        with self._lock:
+            if "id" in body and any(event["id"] == body["id"] for event in self._events):
+                raise FakeConflictError(f"The requested identifier already exists: {body['id']}")
+            return dict(self._store(body))
+
+    def get_event(self, event_id: str) -> dict[str, Any]:
+        with self._lock:
+            return dict(next(event for event in self._events if event["id"] == event_id))
+
+    @staticmethod
+    def _parse_api_time(value: str | None) -> datetime.datetime | None:
+        return datetime.datetime.strptime(value, "%Y-%m-%dT%H:%M:%SZ").replace(tzinfo=UTC) if value else None
+
+    def list_events(self, syncToken: str | None = None, pageToken: str | None = None, timeMin: str | None = None, timeMax: str | None = None, maxResults: int = 250, **params: Any) -> dict[str, Any]:  # noqa: N803 (Calendar API parameter names)
+        with self._lock:
+            if syncToken is not None:
+                items = [event for position, event in self._changes if position > int(syncToken)]
+            else:
+                range_start, range_end = FakeCalendarService._parse_api_time(timeMin), FakeCalendarService._parse_api_time(timeMax)
+                items = []
+                for event in self._events:
+                    start, end = parse_event_bound(event["start"]), parse_event_bound(event["end"])
+                    if (range_end is None or start < range_end) and (range_start is None or end > range_start):
+                        items.append(event)
+                items.sort(key=lambda event: event["start"]["dateTime"])
+            offset = int(pageToken or 0)
+            response: dict[str, Any] = {"items": [dict(event) for event in items[offset : offset + maxResults]]}
+            if offset + maxResults < len(items):
+                response["nextPageToken"] = str(offset + maxResults)
+            else:
+                response["nextSyncToken"] = str(len(self._changes))
+            return response
+
+
+@contextmanager
+def install_fakes(speech_config: FakeSpeechConfig, openai_client: FakeOpenAI, async_openai_client: FakeAsyncOpenAI | None = None) -> Iterator[None]:
+    """Route the app's Azure Speech and Azure OpenAI calls to the given fakes until the block exits.
+
+    Calendar fakes need no patching: pass a FakeCalendarService wherever a calendar service is expected.
+    """
+    async_client = async_openai_client or FakeAsyncOpenAI(openai_client.latency, openai_client.token_seconds)
+    with ExitStack() as stack:
+        stack.enter_context(mock.patch.object(azure_speech_service, "SpeechRecognizer", FakeSpeechRecognizer))
+        stack.enter_context(mock.patch.object(azure_speech_service, "AudioConfig", FakeAudioConfig))
+        stack.enter_context(mock.patch.object(azure_speech_service, "PushAudioInputStream", FakePushAudioInputStream))
+        stack.enter_context(mock.patch.object(azure_speech_service, "AudioStreamFormat", FakeAudioStreamFormat))
+        stack.enter_context(mock.patch.object(ClientRegistry, "speech_config", staticmethod(lambda: speech_config)))
+        stack.enter_context(mock.patch.object(ClientRegistry, "openai_settings", staticmethod(lambda: FAKE_OPENAI_SETTINGS)))
+        stack.enter_context(mock.patch.object(ClientRegistry, "openai_client", staticmethod(lambda: openai_client)))
+        stack.enter_context(mock.patch.object(ClientRegistry, "async_openai_client", staticmethod(lambda: async_client)))
+        yield
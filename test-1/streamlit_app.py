@@ -1,25 +1,49 @@
-import http.server
+import datetime
 import hashlib
-import tempfile
+import os
 import threading
 import time
-import urllib.parse
+import uuid
 import webbrowser
 
 import requests
 import streamlit as st
-from google.oauth2.credentials import Credentials
-from googleapiclient.discovery import build
-from streamlit_calendar import calendar as streamlit_calendar
 
-from app.google_auth import GoogleAuth
-from app.workflow_orchestrator import WorkflowError, WorkflowOrchestrator
+from app.audio_spool import get_audio_spool
+from app.clients import ClientRegistry
+from app.enums import WorkflowStage
+from app.google_auth import AuthError, GoogleAuth
+from app.metrics import get_metrics_registry, install_log_correlation
+from app.oauth_callback import get_oauth_callback_listener
+from app.token_store import UTC, TokenRefresher, get_token_store
+from app.workflow_jobs import WorkflowJobRunner
+from app.workflow_orchestrator import WorkflowError
 
 
 st.set_page_config(page_title="CareCall Voice Assistant", layout="wide")
 
-with open("style.css") as f:
-    st.markdown(f"<style>{f.read()}</style>", unsafe_allow_html=True)
+
+@st.cache_resource
+def prewarm_clients() -> bool:
+    # SDK imports and TLS handshakes happen off the script thread, so the first page renders without waiting for them.
+    threading.Thread(target=ClientRegistry.prewarm, daemon=True, name="prewarm-clients").start()
+    install_log_correlation()
+    get_audio_spool().start_collector()
+    metrics_port = os.getenv("CARECALL_METRICS_PORT")
+    if metrics_port:
+        get_metrics_registry().serve(int(metrics_port))
+    return True
+
+
+@st.cache_data
+def load_stylesheet(path: str) -> str:
+    with open(path) as f:
+        return f.read()
+
+
+prewarm_clients()
+
+st.markdown(f"<style>{load_stylesheet('style.css')}</style>", unsafe_allow_html=True)
 
 if "processed_sig" not in st.session_state:
     st.session_state["processed_sig"] = None
@@ -33,6 +57,8 @@ if "cached_status" not in st.session_state:
     st.session_state["cached_status"] = ""
 if "cached_answer" not in st.session_state:
     st.session_state["cached_answer"] = ""
+if "session_key" not in st.session_state:
+    st.session_state["session_key"] = uuid.uuid4().hex
 
 col1, col2, col3 = st.columns([1, 2, 1])
 with col2:
@@ -48,40 +74,17 @@ GOOGLE_OAUTH_SCOPES_LIST = [
 ]
 CALLBACK_SERVER_HOST = "127.0.0.1"
 CALLBACK_SERVER_PORT = 8599
-
-
-class GoogleOAuthCallbackHandler(http.server.BaseHTTPRequestHandler):
-    received_auth_code = None
-
-    def do_GET(self):  # noqa: N802
-        parsed_url = urllib.parse.urlparse(self.path)
-        query_params = urllib.parse.parse_qs(parsed_url.query)
-        if "code" in query_params:
-            GoogleOAuthCallbackHandler.received_auth_code = query_params["code"][0]
-            page_html = (
-                "<html><head><meta charset='utf-8'><title>Authentication</title>"
-                "<style>body{background:#0e1117;color:#fff;font-family:sans-serif;display:flex;"
-                "align-items:center;justify-content:center;height:100vh;margin:0;}"
-                ".container{background:#14181e;padding:2rem;border-radius:8px;"
-                "box-shadow:0 0 10px rgba(0,0,0,0.5);text-align:center;}</style></head><body>"
-                "<div class='container'><h2>Authentication success</h2>"
-                "<p>You can close this tab and return to Streamlit.</p></div></body></html>"
-            )
-            self.send_response(200)
-            self.send_header("Content-Type", "text/html; charset=utf-8")
-            self.end_headers()
-            self.wfile.write(page_html.encode("utf-8"))
-        else:
-            self.send_response(400)
-            self.end_headers()
-
-    def log_message(self, *args):
-        return
-
-
-def start_local_callback_server():
-    srv = http.server.HTTPServer((CALLBACK_SERVER_HOST, CALLBACK_SERVER_PORT), GoogleOAuthCallbackHandler)
-    threading.Thread(target=srv.serve_forever, daemon=True).start()
+OAUTH_CALLBACK_TIMEOUT_SECONDS = 300
+SIGN_IN_POLL_SECONDS = 0.5
+JOB_POLL_SECONDS = 0.5
+SIGN_IN_QUERY_PARAM = "sid"
+STAGE_LABELS = {
+    WorkflowStage.UPLOAD.value: "Normalizing audio...",
+    WorkflowStage.TRANSCRIBE.value: "Transcribing audio...",
+    WorkflowStage.INTERPRET.value: "Interpreting the request...",
+    WorkflowStage.CALENDAR.value: "Writing to calendar...",
+}
+STAGE_ORDER = [stage.value for stage in WorkflowStage]
 
 
 def fetch_user_profile(access_token_str: str) -> dict:
@@ -91,11 +94,32 @@ def fetch_user_profile(access_token_str: str) -> dict:
     return {}
 
 
-def show_temporary_message(msg: str) -> None:
-    placeholder = st.empty()
-    placeholder.success(msg)
-    time.sleep(3)
-    placeholder.empty()
+def show_temporary_message(msg: str, seconds: float = 3.0) -> None:
+    # Shown on every script run until it expires, instead of sleeping in this one.
+    st.session_state["temporary_message"] = (msg, time.monotonic() + seconds)
+
+
+def render_temporary_message() -> None:
+    message = st.session_state.get("temporary_message")
+    if message and time.monotonic() < message[1]:
+        st.success(message[0])
+    elif message:
+        del st.session_state["temporary_message"]
+
+
+def render_job_progress(placeholder, job) -> None:
+    if job.answer_text:
+        placeholder.info(job.answer_text)
+        return
+    stage = job.stage or STAGE_ORDER[0]
+    placeholder.progress((STAGE_ORDER.index(stage) + 1) / (len(STAGE_ORDER) + 1), text=STAGE_LABELS.get(stage, "Running workflow..."))
+
+
+def render_calendar(events, options, key):
+    # streamlit_calendar takes over a second to import and is only needed once there are results to show.
+    from streamlit_calendar import calendar as streamlit_calendar
+
+    streamlit_calendar(events=events, options=options, key=key)
 
 
 def convert_gcal_to_calendar_events(raw_data):
@@ -120,35 +144,132 @@ def convert_gcal_to_calendar_events(raw_data):
     return events_converted
 
 
+def set_sign_in_query_param(handle: str | None) -> None:
+    # Streamlit 1.22 only has the experimental query-param API: the URL is rewritten with every parameter given.
+    params = {name: values for name, values in st.experimental_get_query_params().items() if name != SIGN_IN_QUERY_PARAM}
+    if handle:
+        params[SIGN_IN_QUERY_PARAM] = [handle]
+    st.experimental_set_query_params(**params)
+
+
+def restore_saved_sign_in() -> None:
+    # The URL handle survives server restarts; it is rotated on use, so the one left in history or a shared link is dead.
+    handle = st.experimental_get_query_params().get(SIGN_IN_QUERY_PARAM, [None])[0]
+    if not handle:
+        return
+    handle = get_token_store().rotate(handle)
+    saved = get_token_store().load(handle) if handle else None
+    if saved is None:
+        set_sign_in_query_param(None)
+        return
+    credentials, profile = saved
+    use_sign_in_handle(handle, credentials)
+    st.session_state["googleCredentials"] = credentials
+    st.session_state["userName"] = profile.get("given_name", "Unknown")
+    st.session_state["userPicture"] = profile.get("picture", "")
+
+
+def use_sign_in_handle(handle: str, credentials) -> None:
+    TokenRefresher.track(credentials, handle)
+    set_sign_in_query_param(handle)
+    st.session_state["signInHandle"] = handle
+    st.session_state["signInHandleRotateAt"] = time.monotonic() + get_token_store().handle_ttl_seconds / 2
+
+
+def rotate_sign_in_handle() -> None:
+    # Open pages swap their handle for a fresh one halfway through its lifetime, so reloading them keeps working.
+    handle = st.session_state.get("signInHandle")
+    if not handle or time.monotonic() < st.session_state.get("signInHandleRotateAt", 0):
+        return
+    new_handle = get_token_store().rotate(handle)
+    if new_handle:
+        use_sign_in_handle(new_handle, st.session_state["googleCredentials"])
+    else:
+        # The sign-in expired: this page keeps working, but a reload will ask for consent again.
+        st.session_state.pop("signInHandle", None)
+        set_sign_in_query_param(None)
+
+
+def start_sign_in() -> None:
+    session_obj = GoogleAuth.create_google_oauth_session(GOOGLE_OAUTH_SCOPES_LIST)
+    auth_url, state = session_obj.authorization_url("https://accounts.google.com/o/oauth2/auth", access_type="offline", prompt="consent")
+    get_oauth_callback_listener(CALLBACK_SERVER_HOST, CALLBACK_SERVER_PORT).expect(state)
+    webbrowser.open(auth_url)
+    st.session_state["pendingSignIn"] = (session_obj, state, time.monotonic() + OAUTH_CALLBACK_TIMEOUT_SECONDS)
+
+
+def finish_sign_in() -> None:
+    """Poll the pending sign-in for up to SIGN_IN_POLL_SECONDS and complete it once Google has answered."""
+    from google.oauth2.credentials import Credentials
+
+    session_obj, state, deadline = st.session_state["pendingSignIn"]
+    listener = get_oauth_callback_listener(CALLBACK_SERVER_HOST, CALLBACK_SERVER_PORT)
+    code = listener.poll(state, SIGN_IN_POLL_SECONDS)
+    if code is None:
+        if time.monotonic() > deadline:
+            listener.discard(state)
+            raise AuthError("No answer from Google sign-in")
+        return
+    del st.session_state["pendingSignIn"]
+    token_data = session_obj.fetch_token(token_url="https://oauth2.googleapis.com/token", code=code, client_secret=session_obj.client_secret)
+    credentials = Credentials(
+        token=token_data["access_token"],
+        refresh_token=token_data.get("refresh_token"),
+        token_uri="https://oauth2.googleapis.com/token",
+        client_id=session_obj.client_id,
+        client_secret=session_obj.client_secret,
+        scopes=GOOGLE_OAUTH_SCOPES_LIST,
+        # google-auth expects a naive UTC expiry; without one it never knows the token is about to lapse.
+        expiry=datetime.datetime.fromtimestamp(token_data["expires_at"], UTC).replace(tzinfo=None) if "expires_at" in token_data else None,
+    )
+    profile_info = fetch_user_profile(token_data["access_token"])
+    profile = {"given_name": profile_info.get("given_name", "Unknown"), "picture": profile_info.get("picture", "")}
+    handle = get_token_store().new_handle()
+    get_token_store().save(handle, credentials, profile)
+    use_sign_in_handle(handle, credentials)
+    st.session_state["userName"] = profile["given_name"]
+    st.session_state["userPicture"] = profile["picture"]
+    st.session_state["googleCredentials"] = credentials
+
+
+def sign_out() -> None:
+    # The URL handle is a bearer token: deleting its record is what actually ends the sign-in.
+    st.session_state.pop("signInHandleRotateAt", None)
+    handle = st.session_state.pop("signInHandle", None)
+    if handle:
+        get_token_store().delete(handle)
+    credentials = st.session_state.pop("googleCredentials", None)
+    if credentials is not None:
+        TokenRefresher.untrack(credentials)
+        ClientRegistry.invalidate_calendar(credentials)
+    for key in ("userName", "userPicture", "hasWelcomed"):
+        st.session_state.pop(key, None)
+    set_sign_in_query_param(None)
+
+
 if "googleCredentials" not in st.session_state:
-    if st.button("Sign in with Google"):
+    restore_saved_sign_in()
+if "googleCredentials" not in st.session_state:
+    if "pendingSignIn" in st.session_state:
+        # The script thread is never parked on the callback: each run polls briefly and reruns until Google answers.
+        st.info("Waiting for Google sign-in in the browser tab that was just opened...")
+        if st.button("Cancel sign-in"):
+            get_oauth_callback_listener(CALLBACK_SERVER_HOST, CALLBACK_SERVER_PORT).discard(st.session_state.pop("pendingSignIn")[1])
+            st.experimental_rerun()
+        try:
+            finish_sign_in()
+            st.experimental_rerun()
+        except Exception as exc:
+            st.session_state.pop("pendingSignIn", None)
+            st.error(f"Authentication failed: {exc}")
+    elif st.button("Sign in with Google"):
         try:
-            session_obj = GoogleAuth.create_google_oauth_session(GOOGLE_OAUTH_SCOPES_LIST)
-            auth_url = session_obj.authorization_url("https://accounts.google.com/o/oauth2/auth", access_type="offline", prompt="consent")[0]
-            start_local_callback_server()
-            webbrowser.open(auth_url)
-            while GoogleOAuthCallbackHandler.received_auth_code is None:
-                time.sleep(0.3)
-            token_data = session_obj.fetch_token(
-                token_url="https://oauth2.googleapis.com/token",
-                code=GoogleOAuthCallbackHandler.received_auth_code,
-                client_secret=session_obj.client_secret,
-            )
-            profile_info = fetch_user_profile(token_data["access_token"])
-            st.session_state["userName"] = profile_info.get("given_name", "Unknown")
-            st.session_state["userPicture"] = profile_info.get("picture", "")
-            st.session_state["googleCredentials"] = Credentials(
-                token=token_data["access_token"],
-                refresh_token=token_data.get("refresh_token"),
-                token_uri="https://oauth2.googleapis.com/token",
-                client_id=session_obj.client_id,
-                client_secret=session_obj.client_secret,
-                scopes=GOOGLE_OAUTH_SCOPES_LIST,
-            )
-            st.rerun()
+            start_sign_in()
+            st.experimental_rerun()
         except Exception as exc:
             st.error(f"Authentication failed: {exc}")
     st.stop()
+rotate_sign_in_handle()
 
 if "hasWelcomed" not in st.session_state:
     st.session_state["hasWelcomed"] = False
@@ -156,16 +277,21 @@ if "hasWelcomed" not in st.session_state:
 if not st.session_state["hasWelcomed"]:
     show_temporary_message(f"Google authentication successful, welcome {st.session_state.get('userName', 'Unknown')}!")
     st.session_state["hasWelcomed"] = True
+render_temporary_message()
 
 if st.session_state.get("userPicture"):
     st.markdown(f"<img src='{st.session_state['userPicture']}' style='border-radius:10px;width:80px;height:auto;'/>", unsafe_allow_html=True)
 
 st.markdown(f"<h2>Welcome, {st.session_state.get('userName', 'Unknown')}!</h2>", unsafe_allow_html=True)
-
-calendar_api_service = build("calendar", "v3", credentials=st.session_state["googleCredentials"])
-
-calendar_list_resp = calendar_api_service.calendarList().list().execute()
-cal_items = calendar_list_resp.get("items", [])
+if st.button("Sign out"):
+    sign_out()
+    st.experimental_rerun()
+
+# The service and the calendar list are cached per credentials across reruns; the refresh button drops both.
+if st.button("Refresh calendars"):
+    ClientRegistry.invalidate_calendar(st.session_state["googleCredentials"])
+calendar_api_service = ClientRegistry.calendar_service(st.session_state["googleCredentials"])
+cal_items = ClientRegistry.calendar_list(st.session_state["googleCredentials"])
 cal_options = {f"{c.get('summary', 'Unnamed')} ({c.get('id')})": c.get("id") for c in cal_items if c.get("id")}
 selected_label = st.selectbox("Select target calendar", list(cal_options.keys())) if cal_options else None
 selected_calendar_id = cal_options.get(selected_label, "primary") if selected_label else "primary"
@@ -177,23 +303,26 @@ if audio_file_uploader:
     file_sig = f"{selected_calendar_id}:{hashlib.sha256(audio_bytes).hexdigest()}"
 
     if st.session_state["processed_sig"] != file_sig:
+        # The workflow runs on the shared job executor; this script run only polls its progress.
+        job_key = f"{st.session_state['session_key']}:{file_sig}"
+        workflow_job = WorkflowJobRunner.submit(
+            job_key,
+            audio_bytes,
+            calendar_api_service,
+            selected_calendar_id,
+            max_retries=2,
+            stream_audio=True,
+            stream_llm=True,
+        )
         workflow_placeholder = st.empty()
-        workflow_placeholder.info("Running workflow...")
-
-        suffix = ""
-        if "." in audio_file_uploader.name:
-            suffix = "." + audio_file_uploader.name.split(".")[-1]
+        if not workflow_job.done():
+            render_job_progress(workflow_placeholder, workflow_job)
+            time.sleep(JOB_POLL_SECONDS)
+            st.experimental_rerun()
+        WorkflowJobRunner.discard(job_key)
 
-        with tempfile.NamedTemporaryFile(delete=False, suffix=suffix) as temp_audio:
-            temp_audio.write(audio_bytes)
-            local_audio_path = temp_audio.name
         try:
-            workflow_result = WorkflowOrchestrator.orchestrate_workflow(
-                local_audio_path,
-                calendar_api_service,
-                selected_calendar_id,
-                max_retries=2,
-            )
+            workflow_result = workflow_job.result()
             workflow_placeholder.empty()
             st.session_state["processed_sig"] = file_sig
             st.session_state["cached_status"] = workflow_result.get("status", "")
@@ -208,6 +337,9 @@ if audio_file_uploader:
                 st.session_state["cached_fn"] = workflow_result.get("function_name")
                 st.session_state["cached_args"] = workflow_result.get("function_args", {})
                 raw_calendar_data = workflow_result.get("calendar_result", "")
+                if st.session_state["cached_fn"] == "create_events":
+                    st.session_state["cached_batch_errors"] = [item for item in raw_calendar_data if item.get("status") != "created"]
+                    raw_calendar_data = [item["event"] for item in raw_calendar_data if item.get("status") == "created"]
                 st.session_state["cached_events"] = convert_gcal_to_calendar_events(raw_calendar_data)
 
         except WorkflowError as w_err:
@@ -224,7 +356,7 @@ if audio_file_uploader:
             time_arg = st.session_state["cached_args"].get("time", "N/A")
             st.success(f"Event created for {date_arg} at {time_arg}.")
             if final_calendar_events:
-                streamlit_calendar(
+                render_calendar(
                     events=final_calendar_events,
                     options={
                         "initialView": "dayGridMonth",
@@ -238,13 +370,34 @@ if audio_file_uploader:
                     },
                     key="calendarCreateKey",
                 )
+        elif function_invoked == "create_events":
+            batch_errors = st.session_state.get("cached_batch_errors", [])
+            st.success(f"{len(final_calendar_events or [])} events created.")
+            for item in batch_errors:
+                st.error(f"Event {item['index'] + 1} not created: {item.get('error', 'unknown error')}")
+            if final_calendar_events:
+                render_calendar(
+                    events=final_calendar_events,
+                    options={
+                        "initialView": "dayGridMonth",
+                        "editable": False,
+                        "selectable": False,
+                        "themeSystem": "auto",
+                        "initialDate": final_calendar_events[0]["start"].split("T")[0],
+                        "contentHeight": 500,
+                        "eventClick": False,
+                        "dateClick": False,
+                    },
+                    key="calendarCreateManyKey",
+                )
         elif function_invoked == "list_events":
             day_arg = st.session_state["cached_args"].get("date", "N/A")
-            st.success(f"Events listed for {day_arg}.")
+            range_arg = st.session_state["cached_args"].get("range", "day")
+            st.success(f"Events listed for {day_arg}." if range_arg == "day" else f"Events listed for the {range_arg} of {day_arg}.")
             if not final_calendar_events:
-                st.info("You have no events for that date.")
+                st.info("You have no events for that period.")
             else:
-                streamlit_calendar(
+                render_calendar(
                     events=final_calendar_events,
                     options={
                         "initialView": "dayGridMonth",
@@ -0,0 +1,53 @@
+import pytest
+
+from app import audio_spool, llm_result_cache, resilience, transcript_cache
+from app.audio_spool import AudioSpool
+from app.llm_result_cache import LLMResultCache
+from app.metrics import get_metrics_registry
+from app.transcript_cache import TranscriptCache
+from benchmarks.fakes import FakeCalendarService, FakeOpenAI, FakeSpeechConfig, LatencyProfile, install_fakes
+
+
+@pytest.fixture(autouse=True)
+def isolated_state(tmp_path, monkeypatch):
+    """Run each test from its own directory with fresh process-wide caches, guards and metrics.
+
+    The app keeps its caches, queue and tokens under relative paths (.cache/, temp_audio/), so they land in tmp_path.
+    """
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(transcript_cache, "_default_cache", TranscriptCache(str(tmp_path / ".cache" / "transcripts.sqlite3")))
+    monkeypatch.setattr(llm_result_cache, "_default_cache", LLMResultCache())
+    monkeypatch.setattr(resilience, "_backend_guards", {})
+    get_metrics_registry().reset()
+    yield
+    get_metrics_registry().reset()
+
+
+@pytest.fixture
+def spool(tmp_path, monkeypatch):
+    """A private audio spool, installed as the process default."""
+    test_spool = AudioSpool(str(tmp_path / "spool"))
+    monkeypatch.setattr(audio_spool, "_default_spool", test_spool)
+    return test_spool
+
+
+@pytest.fixture
+def speech_config():
+    """Instant, error-free Azure Speech stand-in that always hears the same sentence."""
+    return FakeSpeechConfig(LatencyProfile(0.0), realtime_factor=0.0, transcripts=["Ajoute un rendez-vous chez le dentiste demain à 10h"])
+
+
+@pytest.fixture
+def openai_client():
+    return FakeOpenAI(LatencyProfile(0.0), token_seconds=0.0)
+
+
+@pytest.fixture
+def fake_backends(speech_config, openai_client):
+    with install_fakes(speech_config, openai_client):
+        yield
+
+
+@pytest.fixture
+def calendar_service():
+    return FakeCalendarService(LatencyProfile(0.0), events_per_day=2, days_around_today=10)
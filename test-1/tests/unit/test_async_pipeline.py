@@ -0,0 +1,44 @@
+import asyncio
+import os
+import shutil
+
+from app.async_pipeline import AsyncWorkflowPipeline
+from app.batch import iter_audio_sources
+
+
+TICKETS_DIR = os.path.join(os.path.dirname(__file__), "..", "..", "tickets")
+AUDIO_FILE = os.path.join(TICKETS_DIR, "t3", "longt3.m4a")
+
+
+def collect(pipeline: AsyncWorkflowPipeline, sources: list[str], max_in_flight: int) -> list[dict]:
+    async def run() -> list[dict]:
+        return [result async for result in pipeline.run_batch(sources, max_in_flight=max_in_flight)]
+
+    return asyncio.run(run())
+
+
+def test_directory_sources_are_listed_in_order_and_filtered_by_extension(tmp_path):
+    (tmp_path / "b").mkdir()
+    for name in ("b/2.m4a", "1.opus", "notes.txt"):
+        (tmp_path / name).write_bytes(b"")
+
+    assert list(iter_audio_sources(str(tmp_path))) == [str(tmp_path / "1.opus"), str(tmp_path / "b" / "2.m4a")]
+
+
+def test_manifest_accepts_paths_and_json_lines_relative_to_itself(tmp_path):
+    manifest = tmp_path / "calls.jsonl"
+    manifest.write_text('# recorded calls\nfirst.m4a\n{"path": "/data/second.opus"}\n\n', encoding="utf-8")
+
+    assert list(iter_audio_sources(str(manifest))) == [str(tmp_path / "first.m4a"), "/data/second.opus"]
+
+
+def test_batch_processes_every_recording_and_reports_failures_inline(tmp_path, spool, fake_backends, calendar_service):
+    sources = [str(shutil.copy(AUDIO_FILE, tmp_path / f"call{index}.m4a")) for index in range(3)] + [str(tmp_path / "missing.m4a")]
+    pipeline = AsyncWorkflowPipeline(calendar_service, "primary", max_retries=1)
+
+    results = collect(pipeline, sources, max_in_flight=2)
+
+    by_source = {result["source"]: result for result in results}
+    assert set(by_source) == set(sources)
+    assert [by_source[source]["status"] for source in sources] == ["success", "success", "success", "error"]
+    assert all(result["correlation_id"] for result in results)
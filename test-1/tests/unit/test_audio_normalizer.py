@@ -0,0 +1,65 @@
+import os
+import wave
+
+import pytest
+
+from app.audio_normalizer import PIPED_INPUT_SPEC, TARGET_CHANNELS, TARGET_FRAME_RATE, TARGET_SAMPLE_WIDTH, AudioNormalizationError, AudioNormalizer
+
+
+TICKETS_DIR = os.path.join(os.path.dirname(__file__), "..", "..", "tickets")
+# Written with the moov atom after the media data, as phones and some recorders do.
+MOOV_AT_END_M4A = os.path.join(TICKETS_DIR, "t3", "longt3.m4a")
+
+
+def test_decoder_command_targets_mono_16k_pcm_on_stdout():
+    command = AudioNormalizer.build_decoder_command("call.m4a")
+
+    assert command[command.index("-i") + 1] == "call.m4a"
+    assert command[command.index("-ac") + 1] == str(TARGET_CHANNELS)
+    assert command[command.index("-ar") + 1] == str(TARGET_FRAME_RATE)
+    assert command[command.index("-f") + 1] == f"s{TARGET_SAMPLE_WIDTH * 8}le"
+    assert command[-1] == "pipe:1"
+    assert "-read_ahead_limit" not in command
+
+
+def test_decoder_command_lets_piped_input_seek_before_opening_it():
+    command = AudioNormalizer.build_decoder_command(PIPED_INPUT_SPEC)
+
+    limit = command.index("-read_ahead_limit")
+    assert command[limit + 1] == "-1"
+    assert limit < command.index("-i")
+    assert command[command.index("-i") + 1] == PIPED_INPUT_SPEC
+
+
+def test_moov_at_end_bytes_decode_like_the_file():
+    with open(MOOV_AT_END_M4A, "rb") as audio_file:
+        data = audio_file.read()
+
+    from_bytes = b"".join(AudioNormalizer.iter_pcm_chunks(data))
+    from_path = b"".join(AudioNormalizer.iter_pcm_chunks(MOOV_AT_END_M4A))
+
+    assert from_bytes
+    assert len(from_bytes) == len(from_path)
+
+
+def test_normalize_to_wav_writes_target_format(tmp_path):
+    wav_path = str(tmp_path / "out.wav")
+
+    AudioNormalizer.normalize_to_wav(MOOV_AT_END_M4A, wav_path)
+
+    with wave.open(wav_path, "rb") as wav_file:
+        assert wav_file.getnchannels() == TARGET_CHANNELS
+        assert wav_file.getframerate() == TARGET_FRAME_RATE
+        assert wav_file.getsampwidth() == TARGET_SAMPLE_WIDTH
+        assert wav_file.getnframes() > 0
+    assert [name for name in os.listdir(tmp_path) if name.endswith(".part")] == []
+
+
+def test_undecodable_bytes_raise_and_leave_no_partial_wav(tmp_path):
+    wav_path = str(tmp_path / "out.wav")
+
+    with pytest.raises(AudioNormalizationError):
+        AudioNormalizer.normalize_to_wav(b"not audio at all", wav_path)
+
+    assert not os.path.exists(wav_path)
+    assert [name for name in os.listdir(tmp_path) if name.endswith(".part")] == []
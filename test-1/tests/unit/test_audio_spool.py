@@ -0,0 +1,95 @@
+import os
+import subprocess
+import sys
+import time
+
+import pytest
+
+from app.audio_spool import MIN_IDLE_SECONDS, AudioSpool
+from app.metrics import get_metrics_registry
+
+
+REPO_ROOT = os.path.join(os.path.dirname(__file__), "..", "..")
+PIN_IN_CHILD = """
+import sys, time
+from app.audio_spool import AudioSpool
+AudioSpool(sys.argv[1]).acquire(sys.argv[2])
+print("pinned", flush=True)
+time.sleep(60)
+"""
+
+
+def spool_file(spool: AudioSpool, name: str, size: int, idle_seconds: float) -> str:
+    path = os.path.join(spool.root, name)
+    with open(path, "wb") as spooled:
+        spooled.write(b"\0" * size)
+    then = time.time() - idle_seconds
+    os.utime(path, (then, then))
+    return path
+
+
+def test_expired_files_go_first_then_least_recently_used_ones_until_under_the_cap(tmp_path):
+    spool = AudioSpool(str(tmp_path / "spool"), max_bytes=2500, max_age_seconds=3600)
+    expired = spool_file(spool, "expired.wav", 1000, idle_seconds=7200)
+    oldest = spool_file(spool, "oldest.wav", 1000, idle_seconds=3000)
+    older = spool_file(spool, "older.wav", 1000, idle_seconds=2000)
+    recent = spool_file(spool, "recent.wav", 1000, idle_seconds=1000)
+
+    stats = spool.collect()
+
+    assert (stats["evicted_age"], stats["evicted_size"]) == (1, 1)
+    assert [os.path.exists(path) for path in (expired, oldest, older, recent)] == [False, False, True, True]
+    assert get_metrics_registry().gauge_value("carecall_spool_bytes") == 2000
+    assert get_metrics_registry().counter_value("carecall_spool_evictions_total", reason="size") == 1
+
+
+def test_recently_written_and_pinned_files_are_kept(tmp_path):
+    spool = AudioSpool(str(tmp_path / "spool"), max_bytes=0, max_age_seconds=0)
+    fresh = spool_file(spool, "fresh.wav", 10, idle_seconds=MIN_IDLE_SECONDS / 2)
+    pinned = spool_file(spool, "pinned.wav", 10, idle_seconds=7200)
+
+    with spool.pin(pinned):
+        stats = spool.collect()
+        assert os.path.exists(fresh) and os.path.exists(pinned)
+        assert stats["pinned"] == 1
+    os.utime(pinned, (time.time() - 7200, time.time() - 7200))
+    spool.collect()
+
+    assert not os.path.exists(pinned)
+    assert spool.stats()["pinned"] == 0
+
+
+def test_nested_pins_hold_until_the_last_release(tmp_path):
+    spool = AudioSpool(str(tmp_path / "spool"), max_bytes=0, max_age_seconds=0)
+    path = spool_file(spool, "shared.wav", 10, idle_seconds=7200)
+
+    spool.acquire(path)
+    spool.acquire(path)
+    spool.release(path)
+    os.utime(path, (time.time() - 7200, time.time() - 7200))
+    spool.collect()
+
+    assert os.path.exists(path)
+    spool.release(path)
+    os.utime(path, (time.time() - 7200, time.time() - 7200))
+    spool.collect()
+    assert not os.path.exists(path)
+
+
+@pytest.mark.skipif(sys.platform == "win32", reason="cross-process pins rely on flock")
+def test_file_pinned_by_another_process_survives_this_process_collector(tmp_path):
+    spool = AudioSpool(str(tmp_path / "spool"), max_bytes=0, max_age_seconds=0)
+    path = spool_file(spool, "in_use.wav", 10, idle_seconds=7200)
+    child = subprocess.Popen([sys.executable, "-c", PIN_IN_CHILD, spool.root, path], cwd=REPO_ROOT, stdout=subprocess.PIPE, text=True)
+    try:
+        assert child.stdout.readline().strip() == "pinned"
+        os.utime(path, (time.time() - 7200, time.time() - 7200))
+        spool.collect()
+        assert os.path.exists(path)
+    finally:
+        child.kill()
+        child.wait()
+
+    # The pin went away with the process that held it.
+    spool.collect()
+    assert not os.path.exists(path)
@@ -0,0 +1,90 @@
+import os
+import shutil
+import wave
+from unittest import mock
+
+import pytest
+
+from app.audio_normalizer import TARGET_CHANNELS, TARGET_FRAME_RATE, TARGET_SAMPLE_WIDTH
+from app.audio_upload import AudioUpload, AudioUploadError
+
+
+TICKETS_DIR = os.path.join(os.path.dirname(__file__), "..", "..", "tickets")
+OPUS_FILE = os.path.join(TICKETS_DIR, "t5", "longt3.opus")
+
+
+def assert_normalized(wav_path: str) -> None:
+    with wave.open(wav_path, "rb") as wav_file:
+        assert (wav_file.getnchannels(), wav_file.getframerate(), wav_file.getsampwidth()) == (TARGET_CHANNELS, TARGET_FRAME_RATE, TARGET_SAMPLE_WIDTH)
+        assert wav_file.getnframes() > 0
+
+
+def test_opus_file_is_ingested_without_a_suffix_derived_format(spool):
+    # ffmpeg's "opus" format is muxer-only: forcing it from the .opus suffix made decoding fail.
+    wav_path = AudioUpload.ingest_audio(OPUS_FILE)
+
+    assert os.path.dirname(wav_path) == spool.root
+    assert_normalized(wav_path)
+
+
+def test_opus_bytes_are_ingested(spool):
+    with open(OPUS_FILE, "rb") as audio_file:
+        wav_path = AudioUpload.ingest_audio(audio_file.read())
+
+    assert_normalized(wav_path)
+
+
+def test_normalized_wav_path_is_used_in_place(spool):
+    wav_path = AudioUpload.ingest_audio(OPUS_FILE)
+
+    assert AudioUpload.ingest_audio(wav_path) == wav_path
+
+
+def test_callers_normalized_wav_is_never_pinned_or_touched(spool, tmp_path):
+    own_wav = shutil.copy(AudioUpload.ingest_audio(OPUS_FILE), tmp_path / "mine.wav")
+    os.utime(own_wav, (1_000_000, 1_000_000))
+
+    wav_path = AudioUpload.ingest_audio(str(own_wav))
+    with spool.pin(wav_path):
+        assert spool.stats()["pinned"] == 0
+
+    assert os.path.getmtime(own_wav) == 1_000_000
+
+
+def normalized_wav_bytes(spool) -> bytes:
+    """A normalized WAV in memory, with the spool left empty."""
+    wav_path = AudioUpload.ingest_audio(OPUS_FILE)
+    with open(wav_path, "rb") as wav_file:
+        wav_bytes = wav_file.read()
+    os.remove(wav_path)
+    return wav_bytes
+
+
+def test_wav_header_is_parsed_once(spool):
+    wav_bytes = normalized_wav_bytes(spool)
+
+    with mock.patch.object(AudioUpload, "is_normalized_wav", wraps=AudioUpload.is_normalized_wav) as is_normalized_wav:
+        AudioUpload.ingest_audio(wav_bytes)
+
+    assert is_normalized_wav.call_count == 1
+
+
+def test_failed_copy_leaves_no_partial_file(spool):
+    wav_bytes = normalized_wav_bytes(spool)
+
+    with mock.patch("app.audio_upload.os.replace", side_effect=OSError("disk full")), pytest.raises(AudioUploadError):
+        AudioUpload.ingest_audio(wav_bytes)
+
+    assert os.listdir(spool.root) == []
+
+
+def test_missing_file_is_rejected(spool):
+    with pytest.raises(AudioUploadError):
+        AudioUpload.ingest_audio(os.path.join(spool.root, "missing.m4a"))
+
+
+def test_unreadable_audio_is_rejected_without_leftovers(spool):
+    with pytest.raises(AudioUploadError):
+        AudioUpload.ingest_audio(b"definitely not audio")
+
+    assert os.listdir(spool.root) == []
@@ -0,0 +1,154 @@
+import hashlib
+import wave
+from unittest import mock
+
+import numpy as np
+import pytest
+
+from app.audio_normalizer import TARGET_CHANNELS, TARGET_FRAME_RATE, TARGET_SAMPLE_WIDTH
+from app.audio_upload import AudioUploadError
+from app.azure_speech_service import SEGMENT_MAX_SECONDS, AzureSpeechService, SpeechToTextError
+from app.transcript_cache import TranscriptCache, get_transcript_cache
+
+
+SENTENCE = "Ajoute un rendez-vous chez le dentiste demain à 10h"
+
+
+def pcm_chunks(seconds: float, chunk_seconds: float = 0.5):
+    chunk = b"\x10\x00" * int(TARGET_FRAME_RATE * chunk_seconds)
+    for _ in range(int(seconds / chunk_seconds)):
+        yield chunk
+
+
+def test_stream_is_pushed_while_it_is_decoded(fake_backends):
+    chunks = list(pcm_chunks(3))
+
+    text = AzureSpeechService.transcribe_stream(iter(chunks), source_digest="source-digest")
+
+    assert text == SENTENCE
+    # Stored under both the digest of what was pushed and the digest of the source it came from.
+    cache = get_transcript_cache()
+    assert cache.get(TranscriptCache.build_key(hashlib.sha256(b"".join(chunks)).hexdigest())) == SENTENCE
+    assert cache.get(TranscriptCache.build_key("source-digest")) == SENTENCE
+
+
+def test_cached_source_is_answered_without_consuming_the_stream(fake_backends):
+    get_transcript_cache().put(TranscriptCache.build_key("source-digest"), "déjà transcrit")
+    consumed = []
+
+    def chunks():
+        consumed.append(True)
+        yield b"\x00\x00" * TARGET_FRAME_RATE
+
+    assert AzureSpeechService.transcribe_stream(chunks(), source_digest="source-digest") == "déjà transcrit"
+    assert consumed == []
+
+
+def test_feed_error_is_raised_rather_than_the_segment_error_it_caused(fake_backends):
+    def unreadable_upload():
+        yield from pcm_chunks(1)
+        raise AudioUploadError("[stream_audio] Unsupported or unreadable audio file")
+
+    with mock.patch.object(AzureSpeechService, "run_recognition", side_effect=RuntimeError("stream ended early")), pytest.raises(AudioUploadError):
+        AzureSpeechService.transcribe_stream(unreadable_upload())
+
+
+def spoken_pcm(seconds: int) -> bytes:
+    """Tone bursts of 2.5 s separated by 0.5 s pauses, so segments have quiet frames to be cut at.
+
+    Each burst has its own pitch: identical segments would share a transcript cache entry.
+    """
+    samples = np.arange(int(TARGET_FRAME_RATE * 2.5))
+    pause = b"\x00\x00" * (TARGET_FRAME_RATE // 2)
+    return b"".join((3000 * np.sin(2 * np.pi * (200 + 5 * burst) * samples / TARGET_FRAME_RATE)).astype("<i2").tobytes() + pause for burst in range(seconds // 3))
+
+
+def write_wav(path: str, pcm: bytes) -> str:
+    with wave.open(path, "wb") as wav_file:
+        wav_file.setnchannels(TARGET_CHANNELS)
+        wav_file.setsampwidth(TARGET_SAMPLE_WIDTH)
+        wav_file.setframerate(TARGET_FRAME_RATE)
+        wav_file.writeframes(pcm)
+    return path
+
+
+def test_timeout_grows_with_the_audio_duration():
+    assert AzureSpeechService.recognition_timeout(10) < AzureSpeechService.recognition_timeout(60) < AzureSpeechService.recognition_timeout(600)
+
+
+def test_wav_ranges_are_read_by_offset(tmp_path):
+    pcm = spoken_pcm(9)
+    wav_path = write_wav(str(tmp_path / "spoken.wav"), pcm)
+
+    assert AzureSpeechService.read_wav_range(wav_path, 32000, 96000) == pcm[32000:96000]
+
+
+def test_segments_follow_the_callers_retry_count(tmp_path, fake_backends):
+    wav_path = write_wav(str(tmp_path / "long.wav"), spoken_pcm(120))
+    recognized: list[bytes] = []
+
+    def recognize_pcm(pcm, speech_config, timeout_seconds, cancel_token=None):
+        recognized.append(pcm)
+        if len(recognized) == 2:
+            raise RuntimeError("connection reset")
+        return "segment"
+
+    with mock.patch.object(AzureSpeechService, "recognize_pcm", side_effect=recognize_pcm), mock.patch("app.azure_speech_service.time.sleep") as sleep:
+        # A single attempt leaves the retry to the stage budget instead of nesting retries under it.
+        with pytest.raises(SpeechToTextError):
+            AzureSpeechService.transcribe_audio(wav_path, max_retries=1, max_parallel_segments=1, use_cache=False)
+        # No segment was recognized twice.
+        assert len(set(recognized)) == len(recognized)
+        sleep.assert_not_called()
+
+        recognized.clear()
+        text = AzureSpeechService.transcribe_audio(wav_path, max_retries=2, max_parallel_segments=1, use_cache=False)
+
+    segments = text.split()
+    assert len(segments) >= 3
+    assert len(recognized) == len(segments) + 1
+    assert all(len(pcm) <= SEGMENT_MAX_SECONDS * TARGET_FRAME_RATE * TARGET_SAMPLE_WIDTH for pcm in recognized)
+
+
+def test_stage_retry_only_recognizes_the_segments_that_failed(tmp_path, fake_backends):
+    wav_path = write_wav(str(tmp_path / "long.wav"), spoken_pcm(120))
+    recognized: list[bytes] = []
+    outage = [True]
+
+    def recognize_pcm(pcm, speech_config, timeout_seconds, cancel_token=None):
+        recognized.append(pcm)
+        if outage[0] and pcm == recognized[0]:
+            raise RuntimeError("service unavailable")
+        return "segment"
+
+    with mock.patch.object(AzureSpeechService, "recognize_pcm", side_effect=recognize_pcm), mock.patch("app.azure_speech_service.time.sleep"):
+        with pytest.raises(SpeechToTextError):
+            AzureSpeechService.transcribe_audio(wav_path, max_retries=1, max_parallel_segments=1)
+        first_run = len(recognized)
+        outage[0] = False
+        text = AzureSpeechService.transcribe_audio(wav_path, max_retries=1, max_parallel_segments=1)
+
+    # The second run only recognized the segment that failed; the others came from the transcript cache.
+    assert len(recognized) - first_run == 1
+    assert len(text.split()) >= 3
+
+
+def test_long_stream_is_recognized_in_segments_with_scaled_timeouts(fake_backends):
+    pcm = spoken_pcm(120)
+    timeouts: list[float] = []
+    run_recognition = AzureSpeechService.run_recognition
+
+    def recording_run_recognition(recognizer, timeout_seconds, on_started=None, cancel_token=None):
+        def timeout() -> float:
+            timeouts.append(timeout_seconds())
+            return timeouts[-1]
+
+        return run_recognition(recognizer, timeout, on_started, cancel_token)
+
+    with mock.patch.object(AzureSpeechService, "run_recognition", side_effect=recording_run_recognition):
+        text = AzureSpeechService.transcribe_stream(iter(pcm[offset : offset + 16000] for offset in range(0, len(pcm), 16000)))
+
+    assert len(timeouts) >= 3
+    assert text == " ".join([SENTENCE] * len(timeouts))
+    assert max(timeouts) <= AzureSpeechService.recognition_timeout(SEGMENT_MAX_SECONDS)
+    assert get_transcript_cache().get(TranscriptCache.build_key(hashlib.sha256(pcm).hexdigest())) == text
@@ -0,0 +1,73 @@
+import json
+import os
+import statistics
+
+import pytest
+
+from app.metrics import get_metrics_registry
+from benchmarks import bench_workflow
+from benchmarks.fakes import FakeCalendarService, FakeConflictError, LatencyProfile
+
+
+TICKETS_DIR = os.path.join(os.path.dirname(__file__), "..", "..", "tickets")
+
+
+def test_latency_profile_is_parsed_from_median_p95_and_error_rate():
+    profile = LatencyProfile.parse("0.8:2.5:0.02")
+
+    assert (profile.median_seconds, profile.p95_seconds, profile.error_rate) == (0.8, 2.5, 0.02)
+    assert LatencyProfile.parse("0.3").p95_seconds == 0.3
+    with pytest.raises(ValueError):
+        LatencyProfile.parse("1:2:3:4")
+
+
+def test_latency_samples_follow_the_configured_median_and_p95():
+    profile = LatencyProfile(0.5, 2.0, error_rate=0.1).seed(7)
+
+    samples = sorted(profile.sample() for _ in range(4000))
+    failures = sum(profile.fails() for _ in range(4000))
+
+    assert statistics.median(samples) == pytest.approx(0.5, rel=0.1)
+    assert samples[int(0.95 * len(samples))] == pytest.approx(2.0, rel=0.15)
+    assert failures == pytest.approx(400, rel=0.2)
+
+
+def test_fake_calendar_pages_and_rejects_reused_event_ids():
+    calendar = FakeCalendarService(LatencyProfile(0.0), events_per_day=3, days_around_today=5)
+    calendar.insert_event({"id": "carecall0001", "summary": "Dentiste", "start": {"dateTime": "2030-01-01T10:00:00+01:00"}, "end": {"dateTime": "2030-01-01T11:00:00+01:00"}})
+
+    first = calendar.list_events(maxResults=10)
+    second = calendar.list_events(maxResults=10, pageToken=first["nextPageToken"])
+
+    assert len(first["items"]) == 10
+    assert {event["id"] for event in first["items"]}.isdisjoint(event["id"] for event in second["items"])
+    with pytest.raises(FakeConflictError) as conflict:
+        calendar.insert_event({"id": "carecall0001", "summary": "Doublon"})
+    assert conflict.value.resp.status == 409
+
+
+def test_regressions_respect_the_ratio_and_the_minimum_delta():
+    baseline = {"throughput_per_second": 10.0, "workflow": {"p95": 1.0, "p99": 1.2}, "stages": {"stt": {"p95": 0.01, "p99": 0.01}}, "peak_rss_mb": {"self": 100}}
+    report = {"throughput_per_second": 7.0, "workflow": {"p95": 1.5, "p99": 1.25}, "stages": {"stt": {"p95": 0.02, "p99": 0.02}}, "peak_rss_mb": {"self": 110}}
+
+    regressions = bench_workflow.find_regressions(report, baseline, max_regression=0.2, min_delta_seconds=0.05)
+
+    # stt doubled but by 10 ms only; p99 and RSS stay within 20%.
+    assert [regression.split(":")[0] for regression in regressions] == ["throughput", "workflow p95"]
+
+
+@pytest.mark.parametrize("mode", ["sync", "stream"])
+def test_benchmark_runs_the_tickets_offline_and_accepts_its_own_report_as_baseline(tmp_path, monkeypatch, capsys, mode):
+    monkeypatch.setattr(get_metrics_registry(), "keep_samples", False)
+    report_path = str(tmp_path / "report.json")
+    fast = ["--stt", "0.01", "--stt-realtime-factor", "0", "--llm", "0.01", "--llm-token-seconds", "0", "--calendar", "0.005"]
+
+    assert bench_workflow.main([TICKETS_DIR, "--mode", mode, "--runs", "3", "--concurrency", "2", *fast, "--json", report_path]) == 0
+    with open(report_path, encoding="utf-8") as report_file:
+        report = json.load(report_file)
+    assert report["runs"] == 3
+    assert report["statuses"] == {"success": 3}
+    assert {"transcribe", "interpret", "calendar"} <= set(report["stages"])
+
+    assert bench_workflow.main([TICKETS_DIR, "--mode", mode, "--runs", "3", "--concurrency", "2", *fast, "--baseline", report_path, "--max-regression", "100"]) == 0
+    assert "No regression" in capsys.readouterr().out
@@ -0,0 +1,63 @@
+import datetime
+
+from app.calendar_event_store import UTC, CalendarEventStore
+from benchmarks.fakes import FakeCalendarService, LatencyProfile
+
+
+def day_start(offset_days: int) -> datetime.datetime:
+    return datetime.datetime.combine(datetime.datetime.now(UTC).date() + datetime.timedelta(days=offset_days), datetime.time.min, tzinfo=UTC)
+
+
+def event_body(start: datetime.datetime, end: datetime.datetime, summary: str = "Rendez-vous") -> dict:
+    return {"summary": summary, "start": {"dateTime": start.isoformat()}, "end": {"dateTime": end.isoformat()}}
+
+
+class RecordingCalendar(FakeCalendarService):
+    def __init__(self, **kwargs):
+        super().__init__(LatencyProfile(0.0), **kwargs)
+        self.list_params: list[dict] = []
+
+    def list_events(self, **params):
+        self.list_params.append(params)
+        return super().list_events(**params)
+
+
+def test_full_sync_only_lists_the_window():
+    calendar = RecordingCalendar(events_per_day=2, days_around_today=60)
+    store = CalendarEventStore(calendar, "primary", window_past_days=7, window_future_days=7)
+
+    store.sync()
+
+    assert calendar.list_params[0]["timeMin"] and calendar.list_params[0]["timeMax"]
+    assert store.list_range(day_start(0), day_start(1)) is not None
+    assert all(day_start(-7) <= datetime.datetime.fromisoformat(event["start"]["dateTime"]).replace(tzinfo=UTC) < day_start(8) for event in store._events.values())
+    assert store.list_range(day_start(-30), day_start(-29)) is None
+
+
+def test_incremental_changes_outside_the_window_are_dropped():
+    calendar = RecordingCalendar(events_per_day=1, days_around_today=3)
+    store = CalendarEventStore(calendar, "primary", window_past_days=7, window_future_days=7)
+    store.sync()
+    calendar.insert_event(event_body(day_start(100), day_start(100) + datetime.timedelta(hours=1), "Far away"))
+    calendar.insert_event(event_body(day_start(1) + datetime.timedelta(hours=9), day_start(1) + datetime.timedelta(hours=10), "Tomorrow"))
+
+    store.sync(force=True)
+
+    assert "syncToken" in calendar.list_params[-1]
+    summaries = {event["summary"] for event in store._events.values()}
+    assert "Tomorrow" in summaries
+    assert "Far away" not in summaries
+
+
+def test_bound_keeps_long_events_that_overlap_the_remaining_window():
+    calendar = RecordingCalendar(events_per_day=3, days_around_today=20)
+    calendar.insert_event(event_body(day_start(-19), day_start(19), "Hospitalisation"))
+    store = CalendarEventStore(calendar, "primary", max_events=10, window_past_days=30, window_future_days=30)
+
+    store.sync()
+
+    assert len(store._events) <= 10
+    today = store.list_range(day_start(0), day_start(0) + datetime.timedelta(hours=1))
+    assert today is not None
+    assert "Hospitalisation" in [event["summary"] for event in today]
+    assert store.list_range(day_start(-15), day_start(-14)) is None
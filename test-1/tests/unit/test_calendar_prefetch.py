@@ -0,0 +1,60 @@
+import datetime
+import time
+
+from app.calendar_prefetch import CalendarPrefetcher
+from benchmarks.fakes import FakeCalendarService, LatencyProfile
+
+
+TODAY = datetime.date.today()
+TOMORROW = (TODAY + datetime.timedelta(days=1)).isoformat()
+SLOW_LIST_SECONDS = 0.5
+
+
+def slow_calendar() -> FakeCalendarService:
+    return FakeCalendarService(LatencyProfile(SLOW_LIST_SECONDS), events_per_day=2, days_around_today=5)
+
+
+def test_matching_list_call_is_answered_from_the_prefetch():
+    calendar = slow_calendar()
+    prefetcher = CalendarPrefetcher(calendar, "primary", "Qu'est-ce que j'ai demain ?")
+    hits_before = CalendarPrefetcher.stats()["hits"]
+
+    hit, events = prefetcher.take("list_events", {"date": TOMORROW})
+
+    assert hit
+    assert len(events) == 2
+    assert CalendarPrefetcher.stats()["hits"] == hits_before + 1
+
+
+def test_create_call_does_not_wait_for_the_prefetch():
+    calendar = slow_calendar()
+    prefetcher = CalendarPrefetcher(calendar, "primary", "Est-ce que je suis libre demain ou vendredi ?")
+
+    started = time.monotonic()
+    hit, _ = prefetcher.take("create_event", {"date": TOMORROW, "time": "10:00", "title": "Dentiste"})
+
+    assert not hit
+    assert time.monotonic() - started < SLOW_LIST_SECONDS / 2
+
+
+def test_list_call_for_another_range_does_not_wait_and_later_ranges_are_skipped():
+    calendar = slow_calendar()
+    prefetcher = CalendarPrefetcher(calendar, "primary", "Est-ce que je suis libre demain ou vendredi ?")
+
+    started = time.monotonic()
+    hit, _ = prefetcher.take("list_events", {"date": TODAY.isoformat(), "range": "month"})
+    elapsed = time.monotonic() - started
+    time.sleep(SLOW_LIST_SECONDS * 2.5)
+
+    assert not hit
+    assert elapsed < SLOW_LIST_SECONDS / 2
+    assert len(prefetcher._results) <= 1
+
+
+def test_close_without_take_does_not_block():
+    prefetcher = CalendarPrefetcher(slow_calendar(), "primary", "Qu'est-ce que j'ai demain ?")
+
+    started = time.monotonic()
+    prefetcher.close()
+
+    assert time.monotonic() - started < SLOW_LIST_SECONDS / 2
@@ -0,0 +1,68 @@
+import gc
+import threading
+from unittest import mock
+
+import pytest
+from google.oauth2.credentials import Credentials
+
+from app.clients import ClientRegistry
+
+
+@pytest.fixture(autouse=True)
+def fresh_registry():
+    ClientRegistry.reset()
+    yield
+    ClientRegistry.reset()
+
+
+def request_http_in_thread(service) -> object:
+    transports = []
+    thread = threading.Thread(target=lambda: transports.append(service.events().list(calendarId="primary").http))
+    thread.start()
+    thread.join()
+    return transports[0]
+
+
+def test_calendar_service_is_built_once_per_credentials():
+    credentials = Credentials(token="access-token")
+
+    assert ClientRegistry.calendar_service(credentials) is ClientRegistry.calendar_service(credentials)
+    assert ClientRegistry.calendar_service(credentials) is not ClientRegistry.calendar_service(Credentials(token="other-token"))
+
+
+def test_shared_service_sends_each_thread_over_its_own_connections():
+    credentials = Credentials(token="access-token")
+    service = ClientRegistry.calendar_service(credentials)
+
+    here = service.events().list(calendarId="primary").http
+    again = service.events().list(calendarId="primary").http
+    elsewhere = request_http_in_thread(service)
+
+    assert here.credentials is credentials
+    assert again.http is here.http
+    assert elsewhere.http is not here.http
+    assert elsewhere.credentials is credentials
+
+
+def test_cached_service_does_not_keep_its_credentials_alive():
+    ClientRegistry.calendar_service(Credentials(token="access-token"))
+    gc.collect()
+
+    assert len(ClientRegistry._calendar_services) == 0
+
+
+def test_calendar_list_is_cached_until_it_expires_or_is_invalidated():
+    credentials = Credentials(token="access-token")
+    service = mock.MagicMock()
+    service.calendarList.return_value.list.return_value.execute.side_effect = lambda: {"items": [{"id": "primary"}]}
+    requests = service.calendarList.return_value.list.return_value.execute
+
+    with mock.patch.object(ClientRegistry, "calendar_service", return_value=service):
+        assert ClientRegistry.calendar_list(credentials) == [{"id": "primary"}]
+        ClientRegistry.calendar_list(credentials)
+        assert requests.call_count == 1
+        ClientRegistry.calendar_list(credentials, max_age_seconds=0)
+        assert requests.call_count == 2
+        ClientRegistry.invalidate_calendar(credentials)
+        ClientRegistry.calendar_list(credentials)
+        assert requests.call_count == 3
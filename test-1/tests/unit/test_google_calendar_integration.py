@@ -0,0 +1,107 @@
+import datetime
+import itertools
+
+from app import google_calendar_integration
+from app.calendar_event_store import UTC
+from app.google_calendar_integration import EVENT_LIST_FIELDS, GoogleCalendarIntegration
+from benchmarks.fakes import FakeCalendarService, LatencyProfile
+
+
+class RecordingCalendar(FakeCalendarService):
+    def __init__(self, **kwargs):
+        super().__init__(LatencyProfile(0.0), **kwargs)
+        self.list_params: list[dict] = []
+
+    def list_events(self, **params):
+        self.list_params.append(params)
+        return super().list_events(**params)
+
+
+def test_week_range_is_listed_page_by_page_with_projected_fields(monkeypatch):
+    monkeypatch.setattr(google_calendar_integration, "EVENT_PAGE_SIZE", 4)
+    calendar = RecordingCalendar(events_per_day=3, days_around_today=10)
+    today = datetime.date.today().isoformat()
+
+    events = GoogleCalendarIntegration.list_google_events(calendar, "primary", today, "week")
+
+    assert len(events) == 21
+    assert len(calendar.list_params) == 6
+    assert all(params["fields"] == EVENT_LIST_FIELDS and params["maxResults"] == 4 for params in calendar.list_params)
+    assert [params.get("pageToken") for params in calendar.list_params[:2]] == [None, "4"]
+
+
+def test_pages_are_only_fetched_as_events_are_consumed(monkeypatch):
+    monkeypatch.setattr(google_calendar_integration, "EVENT_PAGE_SIZE", 2)
+    calendar = RecordingCalendar(events_per_day=3, days_around_today=3)
+    range_start, range_end = GoogleCalendarIntegration.event_range_bounds(datetime.date.today().isoformat())
+
+    first_three = list(itertools.islice(GoogleCalendarIntegration.iter_google_events(calendar, "primary", range_start, range_end), 3))
+
+    assert len(first_three) == 3
+    assert len(calendar.list_params) == 2
+
+
+def test_range_bounds_cover_whole_days_weeks_and_months():
+    assert GoogleCalendarIntegration.event_range_bounds("2024-02-14", "day") == (datetime.datetime(2024, 2, 14, tzinfo=UTC), datetime.datetime(2024, 2, 15, tzinfo=UTC))
+    assert GoogleCalendarIntegration.event_range_bounds("2024-02-14", "week") == (datetime.datetime(2024, 2, 12, tzinfo=UTC), datetime.datetime(2024, 2, 19, tzinfo=UTC))
+    assert GoogleCalendarIntegration.event_range_bounds("2024-02-14", "month") == (datetime.datetime(2024, 2, 1, tzinfo=UTC), datetime.datetime(2024, 3, 1, tzinfo=UTC))
+
+
+class BatchCountingCalendar(RecordingCalendar):
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.batches = 0
+
+    def new_batch_http_request(self, callback=None):
+        self.batches += 1
+        return super().new_batch_http_request(callback)
+
+
+def test_multi_event_command_is_sent_as_batches(monkeypatch):
+    monkeypatch.setattr(google_calendar_integration, "CALENDAR_BATCH_LIMIT", 2)
+    calendar = BatchCountingCalendar(events_per_day=0, days_around_today=0)
+    events_args = [{"date": "2024-03-0" + str(day), "time": "10:00", "title": f"Séance {day}"} for day in range(1, 4)] + [{"date": "2024-03-05", "title": "Sans heure"}]
+
+    results = GoogleCalendarIntegration.create_google_events_batch(calendar, "primary", events_args)
+
+    assert calendar.batches == 2
+    assert calendar.calls == 0
+    assert [result["status"] for result in results] == ["created", "created", "created", "error"]
+    assert [result["event"]["summary"] for result in results[:3]] == ["Séance 1", "Séance 2", "Séance 3"]
+    assert "Invalid event arguments" in results[3]["error"]
+
+
+class FailingSecondBatchCalendar(BatchCountingCalendar):
+    def new_batch_http_request(self, callback=None):
+        batch = super().new_batch_http_request(callback)
+        if self.batches == 2:
+
+            def execute():
+                raise ConnectionError("batch request lost")
+
+            batch.execute = execute
+        return batch
+
+
+def test_failed_batch_chunk_keeps_the_events_already_created(monkeypatch):
+    monkeypatch.setattr(google_calendar_integration, "CALENDAR_BATCH_LIMIT", 2)
+    calendar = FailingSecondBatchCalendar(events_per_day=0, days_around_today=0)
+    events_args = [{"date": f"2024-03-0{day}", "time": "10:00", "title": f"Séance {day}"} for day in range(1, 5)]
+
+    results = GoogleCalendarIntegration.create_google_events_batch(calendar, "primary", events_args)
+
+    assert [result["status"] for result in results] == ["created", "created", "error", "error"]
+    assert "batch request lost" in results[2]["error"]
+    assert len(calendar._events) == 2
+
+
+def test_replayed_batch_with_an_idempotency_key_creates_nothing_new():
+    calendar = BatchCountingCalendar(events_per_day=0, days_around_today=0)
+    events_args = [{"date": "2024-03-01", "time": "10:00", "title": "Kiné"}, {"date": "2024-03-08", "time": "10:00", "title": "Kiné"}]
+
+    first = GoogleCalendarIntegration.create_google_events_batch(calendar, "primary", events_args, idempotency_key="job-1")
+    replay = GoogleCalendarIntegration.create_google_events_batch(calendar, "primary", events_args, idempotency_key="job-1")
+
+    assert [result["status"] for result in first + replay] == ["created"] * 4
+    assert [result.get("duplicate", False) for result in replay] == [True, True]
+    assert len(calendar._events) == 2
@@ -0,0 +1,121 @@
+import json
+import os
+import time
+import urllib.request
+
+import pytest
+
+from app.enums import JobStatus
+from app.job_queue import JobQueue
+from app.job_server import serve_api, store_upload
+
+
+@pytest.fixture
+def queue(tmp_path):
+    job_queue = JobQueue(str(tmp_path / "jobs.sqlite3"), visibility_timeout_seconds=0.2, max_attempts=2)
+    yield job_queue
+    job_queue.close()
+
+
+def upload(tmp_path, name: str = "job") -> str:
+    return store_upload(str(tmp_path / "job_audio"), name, b"audio bytes")
+
+
+def test_idempotency_key_returns_the_job_it_first_created(queue):
+    first, created = queue.enqueue({"audio_path": "a.audio"}, idempotency_key="client-1")
+    again, created_again = queue.enqueue({"audio_path": "b.audio"}, idempotency_key="client-1")
+
+    assert (created, created_again) == (True, False)
+    assert again["job_id"] == first["job_id"]
+    assert again["payload"] == {"audio_path": "a.audio"}
+
+
+def test_job_is_leased_to_one_worker_and_redelivered_when_the_lease_lapses(queue):
+    job, _ = queue.enqueue({"calendar_id": "primary"})
+
+    leased = queue.claim("worker-a")
+    assert leased["job_id"] == job["job_id"]
+    assert queue.claim("worker-b") is None
+    assert queue.heartbeat(job["job_id"], "worker-a")
+    time.sleep(0.25)
+
+    redelivered = queue.claim("worker-b")
+    assert redelivered["job_id"] == job["job_id"]
+    assert redelivered["attempts"] == 2
+    assert redelivered["lease_owner"] == "worker-b"
+
+
+def test_worker_that_lost_its_lease_cannot_overwrite_the_new_owner(queue):
+    job, _ = queue.enqueue({})
+    queue.claim("worker-a")
+    time.sleep(0.25)
+    queue.claim("worker-b")
+
+    assert not queue.heartbeat(job["job_id"], "worker-a")
+    assert not queue.complete(job["job_id"], "worker-a", {"status": "success"})
+    assert queue.fail(job["job_id"], "worker-a", "late failure") is None
+    assert queue.record_progress(job["job_id"], "worker-b", "interpret", {"transcribe": "Ajoute un rendez-vous"})
+    assert queue.complete(job["job_id"], "worker-b", {"status": "success"})
+
+    done = queue.get(job["job_id"])
+    assert done["status"] == JobStatus.SUCCEEDED.value
+    assert done["checkpoints"] == {"transcribe": "Ajoute un rendez-vous"}
+
+
+def test_failures_are_requeued_with_backoff_until_attempts_run_out(queue):
+    job, _ = queue.enqueue({})
+    queue.claim("worker-a")
+
+    assert queue.fail(job["job_id"], "worker-a", "timeout") == JobStatus.QUEUED.value
+    assert queue.get(job["job_id"])["available_at"] > time.time()
+    assert queue.claim("worker-a") is None
+
+    assert queue.fail(job["job_id"], "worker-a", "timeout") is None
+    queue._conn.execute("UPDATE jobs SET available_at = 0")
+    queue.claim("worker-a")
+    assert queue.fail(job["job_id"], "worker-a", "bad audio", retryable=False) == JobStatus.FAILED.value
+
+
+def test_upload_is_removed_when_the_last_attempt_loses_its_lease(queue, tmp_path):
+    audio_path = upload(tmp_path)
+    job, _ = queue.enqueue({"audio_path": audio_path})
+    for worker in ("worker-a", "worker-b"):
+        assert queue.claim(worker)["job_id"] == job["job_id"]
+        time.sleep(0.25)
+
+    assert queue.claim("worker-c") is None
+    assert queue.get(job["job_id"])["status"] == JobStatus.FAILED.value
+    assert not os.path.exists(audio_path)
+
+
+def test_purge_deletes_old_finished_jobs_and_their_leftover_uploads(queue, tmp_path):
+    finished_path, running_path = upload(tmp_path, "finished"), upload(tmp_path, "running")
+    finished, _ = queue.enqueue({"audio_path": finished_path})
+    queue.claim("worker-a")
+    queue.complete(finished["job_id"], "worker-a", {"status": "success"})
+    running, _ = queue.enqueue({"audio_path": running_path})
+    queue.claim("worker-a")
+
+    assert queue.purge_finished(0) == 1
+    assert queue.get(finished["job_id"]) is None
+    assert not os.path.exists(finished_path)
+    assert queue.get(running["job_id"]) is not None
+    assert os.path.exists(running_path)
+
+
+def test_api_keeps_one_upload_per_idempotency_key(queue, tmp_path):
+    spool_dir = str(tmp_path / "job_audio")
+    server = serve_api(queue, spool_dir, "primary", 0)
+    try:
+        statuses = []
+        for _ in range(2):
+            request = urllib.request.Request(f"http://127.0.0.1:{server.server_port}/jobs?calendar_id=family", data=b"audio bytes", headers={"Idempotency-Key": "client-1"})
+            with urllib.request.urlopen(request) as response:
+                statuses.append(response.status)
+                body = json.loads(response.read())
+    finally:
+        server.shutdown()
+
+    assert statuses == [202, 200]
+    assert body["calendar_id"] == "family"
+    assert os.listdir(spool_dir) == [f"{body['job_id']}.audio"]
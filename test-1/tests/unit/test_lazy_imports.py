@@ -0,0 +1,13 @@
+from benchmarks.bench_startup import HEAVY_MODULES, IMPORT_PROBE, SCENARIOS, run_probe
+
+
+def test_sign_in_page_does_not_import_the_audio_ai_and_google_api_sdks():
+    probe = run_probe(IMPORT_PROBE.format(modules=SCENARIOS["sign-in page"], heavy=HEAVY_MODULES))
+
+    assert probe["heavy"] == []
+
+
+def test_first_workflow_loads_what_the_sign_in_page_deferred():
+    probe = run_probe(IMPORT_PROBE.format(modules=SCENARIOS["first workflow"], heavy=HEAVY_MODULES))
+
+    assert {"azure.cognitiveservices.speech", "openai", "numpy"} <= set(probe["heavy"])
@@ -0,0 +1,48 @@
+import datetime
+
+from app.llm_result_cache import LLMResultCache
+from app.openai_function_calling import OpenAIFunctionCalling
+
+
+TODAY = datetime.date(2024, 10, 15)
+RESULT = {"function_name": "list_events", "arguments": {"date": "2024-10-16"}}
+
+
+def test_transcripts_differing_in_case_punctuation_and_spelled_numbers_share_a_key():
+    assert LLMResultCache.normalize_transcript("Rendez-vous à dix heures, demain !") == LLMResultCache.normalize_transcript("rendez-vous à 10h demain")
+    assert LLMResultCache.normalize_transcript("à 10 h 30") == LLMResultCache.normalize_transcript("à 10h30")
+
+
+def test_results_are_copies_and_expire_with_the_day():
+    cache = LLMResultCache()
+    cache.put("Qu'est-ce que j'ai demain ?", TODAY, RESULT)
+
+    cached = cache.get("qu'est-ce que j'ai demain", TODAY)
+    cached["arguments"]["date"] = "changed"
+
+    assert cache.get("Qu'est-ce que j'ai demain ?", TODAY) == RESULT
+    assert cache.get("Qu'est-ce que j'ai demain ?", TODAY + datetime.timedelta(days=1)) is None
+
+
+def test_free_text_answers_are_not_cached_and_size_is_bounded():
+    cache = LLMResultCache(max_entries=2)
+    cache.put("Bonjour", TODAY, {"answer": "Bonjour !"})
+    for text in ("un", "deux", "trois"):
+        cache.put(text, TODAY, RESULT)
+
+    assert cache.get("Bonjour", TODAY) is None
+    assert cache.get("un", TODAY) is None
+    assert cache.stats()["entries"] == 2
+
+
+def test_repeated_command_skips_the_llm(fake_backends, openai_client):
+    calls = []
+    create = openai_client.chat.completions.create
+    openai_client.chat.completions.create = lambda **request: calls.append(request) or create(**request)
+    text = "Est-ce que je suis libre jeudi après-midi pour voir Paul ?"
+
+    first = OpenAIFunctionCalling.call_llm_with_functions(text)
+    second = OpenAIFunctionCalling.call_llm_with_functions(text.upper())
+
+    assert first == second
+    assert len(calls) == 1
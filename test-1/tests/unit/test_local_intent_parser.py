@@ -0,0 +1,56 @@
+import datetime
+
+import pytest
+
+from app.local_intent_parser import LocalIntentParser
+
+
+# A Tuesday.
+TODAY = datetime.date(2024, 10, 15)
+
+
+@pytest.mark.parametrize(
+    ("text", "arguments"),
+    [
+        ("Crée un rendez-vous le 12 décembre à 10h chez le dentiste.", {"date": "2024-12-12", "time": "10:00", "title": "Rendez-vous chez le dentiste"}),
+        ("Ajoute un rendez-vous chez le kiné jeudi prochain à 14h30 s'il te plaît.", {"date": "2024-10-17", "time": "14:30", "title": "Rendez-vous chez le kiné"}),
+        ("Mets un déjeuner avec Julie vendredi à midi et demi.", {"date": "2024-10-18", "time": "12:30", "title": "Déjeuner avec Julie"}),
+    ],
+)
+def test_simple_create_commands_are_resolved_locally(text, arguments):
+    assert LocalIntentParser.parse(text, TODAY) == {"function_name": "create_event", "arguments": arguments}
+
+
+@pytest.mark.parametrize(
+    ("text", "arguments"),
+    [
+        ("Qu'est-ce que j'ai demain ?", {"date": "2024-10-16"}),
+        ("Quels sont mes rendez-vous le 12/11 ?", {"date": "2024-11-12"}),
+        ("Montre-moi mes rendez-vous de la semaine prochaine.", {"date": "2024-10-22", "range": "week"}),
+        ("Qu'est-ce que j'ai ce mois-ci ?", {"date": "2024-10-15", "range": "month"}),
+    ],
+)
+def test_simple_list_commands_are_resolved_locally(text, arguments):
+    assert LocalIntentParser.parse(text, TODAY) == {"function_name": "list_events", "arguments": arguments}
+
+
+@pytest.mark.parametrize(
+    "text",
+    [
+        "Annule mon rendez-vous de demain",
+        "Ajoute un rendez-vous demain à 10h et le 12 décembre à 11h",
+        "Quelle est la capitale de la France ?",
+        "Ajoute un rendez-vous demain",
+        "Crée un rendez-vous le 12 décembre à 10h sauf si j'ai déjà quelque chose",
+        "Si je suis libre, ajoute un rendez-vous demain à 10h",
+        "Ajoute un rendez-vous avec Paul demain à 10h mais seulement s'il confirme",
+        "",
+    ],
+)
+def test_anything_ambiguous_is_left_to_the_llm(text):
+    assert LocalIntentParser.parse(text, TODAY) is None
+
+
+def test_list_candidates_are_empty_for_create_commands():
+    assert LocalIntentParser.list_candidates("Ajoute un rendez-vous demain à 10h", TODAY) == []
+    assert LocalIntentParser.list_candidates("Est-ce que je suis libre demain ou vendredi ?", TODAY) == [("2024-10-16", "day"), ("2024-10-18", "day")]
@@ -0,0 +1,88 @@
+import logging
+import urllib.request
+
+import pytest
+
+from app.metrics import MetricsRegistry, current_correlation_id, get_metrics_registry, install_log_correlation, stage_span, workflow_run
+
+
+def test_stage_span_times_attempts_and_counts_errors_by_type():
+    registry = get_metrics_registry()
+
+    with stage_span("stt"):
+        pass
+    with pytest.raises(TimeoutError), stage_span("stt"):
+        raise TimeoutError("slow")
+
+    text = registry.render_prometheus()
+    assert 'carecall_stage_duration_seconds_count{stage="stt"} 2' in text
+    assert registry.counter_value("carecall_stage_errors_total", stage="stt", error="TimeoutError") == 1
+
+
+def test_workflow_run_sets_a_correlation_id_and_counts_its_final_status():
+    registry = get_metrics_registry()
+
+    with workflow_run("abc123") as run:
+        assert current_correlation_id() == "abc123"
+        run["status"] = "success"
+    with pytest.raises(RuntimeError), workflow_run():
+        raise RuntimeError("boom")
+
+    assert current_correlation_id() == "-"
+    assert registry.counter_value("carecall_workflow_runs_total", status="success") == 1
+    assert registry.counter_value("carecall_workflow_runs_total", status="error") == 1
+
+
+def test_prometheus_text_has_cumulative_buckets_gauges_and_escaped_labels():
+    registry = MetricsRegistry()
+    registry.observe("carecall_stage_duration_seconds", 0.003, stage="llm")
+    registry.observe("carecall_stage_duration_seconds", 0.2, stage="llm")
+    registry.set("carecall_spool_bytes", 2048)
+    registry.inc("carecall_stage_errors_total", stage="calendar", error='Http"Error')
+
+    text = registry.render_prometheus()
+
+    assert 'carecall_stage_duration_seconds_bucket{stage="llm",le="0.005"} 1' in text
+    assert 'carecall_stage_duration_seconds_bucket{stage="llm",le="0.25"} 2' in text
+    assert 'carecall_stage_duration_seconds_bucket{stage="llm",le="+Inf"} 2' in text
+    assert 'carecall_stage_duration_seconds_sum{stage="llm"} 0.203' in text
+    assert "# TYPE carecall_spool_bytes gauge\ncarecall_spool_bytes 2048" in text
+    assert 'error="Http\\"Error"' in text
+
+
+def test_samples_are_kept_only_when_asked():
+    exact = MetricsRegistry(keep_samples=True)
+    bucketed = MetricsRegistry()
+    for registry in (exact, bucketed):
+        registry.observe("carecall_stt_realtime_ratio", 0.3)
+        registry.observe("carecall_stt_realtime_ratio", 0.6)
+
+    assert exact.samples("carecall_stt_realtime_ratio") == [0.3, 0.6]
+    assert bucketed.samples("carecall_stt_realtime_ratio") == []
+
+
+def test_textfile_and_endpoint_serve_the_same_exposition(tmp_path):
+    registry = MetricsRegistry()
+    registry.inc("carecall_retries_total", stage="transcribe")
+    path = tmp_path / "metrics" / "carecall.prom"
+
+    registry.write_textfile(str(path))
+    server = registry.serve(0)
+    try:
+        with urllib.request.urlopen(f"http://127.0.0.1:{server.server_port}/metrics") as response:
+            served = response.read().decode("utf-8")
+    finally:
+        server.shutdown()
+
+    assert path.read_text(encoding="utf-8") == served == registry.render_prometheus()
+    assert list(path.parent.iterdir()) == [path]
+
+
+def test_log_records_carry_the_correlation_id(caplog):
+    install_log_correlation()
+    install_log_correlation()
+
+    with caplog.at_level(logging.INFO), workflow_run("run-42"):
+        logging.info("inside the run")
+
+    assert [record.correlation_id for record in caplog.records if record.getMessage() == "inside the run"] == ["run-42"]
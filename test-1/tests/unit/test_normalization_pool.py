@@ -0,0 +1,28 @@
+import os
+import shutil
+import wave
+
+from app.audio_normalizer import TARGET_FRAME_RATE
+from app.normalization_pool import NormalizationPool
+
+
+TICKETS_DIR = os.path.join(os.path.dirname(__file__), "..", "..", "tickets")
+
+
+def test_worker_processes_normalize_into_the_shared_directory(tmp_path, spool):
+    sources = [str(shutil.copy(os.path.join(TICKETS_DIR, "t3", "longt3.m4a"), tmp_path / "a.m4a")), os.path.join(TICKETS_DIR, "t5", "longt3.opus")]
+
+    with NormalizationPool(max_workers=2, upload_dir=str(tmp_path / "normalized")) as pool:
+        prefetched = list(pool.prefetch(sources, lookahead=1))
+        paths = [future.result(timeout=60) for _, future in prefetched]
+
+    assert [source for source, _ in prefetched] == sources
+    for path in paths:
+        assert os.path.dirname(path) == str(tmp_path / "normalized")
+        with wave.open(path, "rb") as wav_file:
+            assert wav_file.getframerate() == TARGET_FRAME_RATE
+
+
+def test_upload_dir_defaults_to_the_audio_spool(spool):
+    with NormalizationPool(max_workers=1) as pool:
+        assert pool.upload_dir == spool.root
@@ -0,0 +1,74 @@
+import threading
+import urllib.error
+import urllib.request
+
+import pytest
+
+from app.google_auth import AuthError
+from app.oauth_callback import OAuthCallbackListener
+
+
+@pytest.fixture(scope="module")
+def listener():
+    callback_listener = OAuthCallbackListener(port=0)
+    yield callback_listener
+    callback_listener._server.shutdown()
+
+
+def redirect(listener: OAuthCallbackListener, query: str) -> int:
+    try:
+        with urllib.request.urlopen(f"http://127.0.0.1:{listener._server.server_port}/?{query}") as response:
+            return response.status
+    except urllib.error.HTTPError as ex:
+        return ex.code
+
+
+def test_each_code_reaches_the_sign_in_that_owns_its_state(listener):
+    listener.expect("state-a")
+    listener.expect("state-b")
+    codes = {}
+    waiters = [threading.Thread(target=lambda state=state: codes.update({state: listener.wait(state, 5)})) for state in ("state-a", "state-b")]
+    for waiter in waiters:
+        waiter.start()
+
+    assert redirect(listener, "state=state-b&code=code-b") == 200
+    assert redirect(listener, "state=state-a&code=code-a") == 200
+    for waiter in waiters:
+        waiter.join()
+
+    assert codes == {"state-a": "code-a", "state-b": "code-b"}
+    assert listener.pending_count() == 0
+
+
+def test_unknown_or_replayed_states_are_rejected(listener):
+    listener.expect("state-c")
+
+    assert redirect(listener, "state=forged&code=stolen") == 400
+    assert redirect(listener, "state=state-c&code=code-c") == 200
+    assert redirect(listener, "state=state-c&code=replayed") == 400
+    assert listener.wait("state-c", 1) == "code-c"
+
+
+def test_refused_consent_and_silence_raise_auth_errors(listener):
+    listener.expect("refused")
+    listener.expect("silent")
+
+    assert redirect(listener, "state=refused&error=access_denied") == 200
+    with pytest.raises(AuthError, match="access_denied"):
+        listener.wait("refused", 1)
+    with pytest.raises(AuthError, match="No answer"):
+        listener.wait("silent", 0.05)
+    with pytest.raises(AuthError):
+        listener.wait("silent", 0.05)
+    with pytest.raises(AuthError):
+        listener.expect("")
+
+
+def test_polling_keeps_the_sign_in_pending_until_the_callback_arrives(listener):
+    listener.expect("state-d")
+
+    assert listener.poll("state-d", 0.01) is None
+    assert redirect(listener, "state=state-d&code=code-d") == 200
+    assert listener.poll("state-d", 0.01) == "code-d"
+    with pytest.raises(AuthError):
+        listener.poll("state-d", 0.01)
@@ -0,0 +1,84 @@
+from types import SimpleNamespace
+
+from app.openai_function_calling import LLM_BACKEND, OpenAIFunctionCalling
+from app.resilience import get_backend_guard
+from benchmarks.fakes import FakeChatStream
+
+
+def function_chunk(name: str | None, arguments: str) -> SimpleNamespace:
+    return SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(function_call=SimpleNamespace(name=name, arguments=arguments), content=None))])
+
+
+def text_chunk(content: str) -> SimpleNamespace:
+    return SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(function_call=None, content=content))])
+
+
+class RecordingStream:
+    def __init__(self, chunks: list[SimpleNamespace]):
+        self.chunks = chunks
+        self.consumed = 0
+        self.closed = False
+
+    def __iter__(self):
+        for chunk in self.chunks:
+            self.consumed += 1
+            yield chunk
+
+    def close(self) -> None:
+        self.closed = True
+
+
+def test_function_call_is_returned_as_soon_as_its_arguments_are_complete():
+    stream = RecordingStream(
+        [function_chunk("create_event", '{"date": "2024-10-16", '), function_chunk(None, '"time": "10:00", "title": "Dentiste"}'), function_chunk(None, ""), text_chunk("ignored")]
+    )
+
+    result = OpenAIFunctionCalling.parse_llm_stream(stream)
+
+    assert result == {"function_name": "create_event", "arguments": {"date": "2024-10-16", "time": "10:00", "title": "Dentiste"}}
+    assert stream.consumed == 2
+    assert stream.closed
+
+
+def test_braces_inside_argument_values_do_not_end_the_call_early():
+    stream = RecordingStream([function_chunk("create_event", '{"title": "Atelier {'), function_chunk(None, 'pâte}", '), function_chunk(None, '"date": "2024-10-16"}')])
+
+    result = OpenAIFunctionCalling.parse_llm_stream(stream)
+
+    assert result["arguments"] == {"title": "Atelier {pâte}", "date": "2024-10-16"}
+
+
+def test_text_answers_are_forwarded_token_by_token():
+    tokens = []
+    stream = RecordingStream([text_chunk("Bonjour"), text_chunk(", je "), text_chunk("vous écoute.")])
+
+    result = OpenAIFunctionCalling.parse_llm_stream(stream, on_text=tokens.append)
+
+    assert result == {"answer": "Bonjour, je vous écoute."}
+    assert tokens == ["Bonjour", ", je ", "vous écoute."]
+    assert stream.closed
+
+
+def test_losing_hedged_request_has_its_stream_closed(fake_backends, openai_client):
+    guard = get_backend_guard(LLM_BACKEND)
+    guard.min_hedge_delay_seconds = 0.05
+    for _ in range(guard.min_samples):
+        guard._finish(True, 0.01, 1.0, False)
+    streams: list[FakeChatStream] = []
+    create = openai_client.chat.completions.create
+
+    def create_slow_then_fast(**request):
+        stream = create(**request)
+        if not streams:
+            stream.first_token = 5.0
+        streams.append(stream)
+        return stream
+
+    openai_client.chat.completions.create = create_slow_then_fast
+
+    result = OpenAIFunctionCalling.call_llm_with_functions("Ajoute un rendez-vous chez le dentiste demain à 10h", max_retries_count=1, use_cache=False)
+
+    assert result["function_name"] == "create_event"
+    assert len(streams) == 2
+    assert streams[0].closed.is_set()
+    assert guard.hedges_won == 1
@@ -0,0 +1,107 @@
+import threading
+import time
+
+import pytest
+
+from app.resilience import BackendGuard, CancelToken, CircuitBreaker, CircuitOpenError, RetryBudget
+
+
+def primed_guard(latency_seconds: float = 0.01, **options) -> BackendGuard:
+    guard = BackendGuard("test", min_hedge_delay_seconds=0.05, **options)
+    for _ in range(guard.min_samples):
+        guard._finish(True, latency_seconds, 1.0, False)
+    return guard
+
+
+def test_no_hedge_before_enough_latency_samples():
+    guard = BackendGuard("test")
+
+    assert guard.hedge_delay() is None
+    assert guard.call(lambda token: "ok") == "ok"
+    assert guard.hedges_fired == 0
+
+
+def test_slow_call_is_hedged_and_the_loser_is_cancelled():
+    guard = primed_guard()
+    tokens: list[CancelToken] = []
+    loser_cancelled = threading.Event()
+
+    def call(token: CancelToken) -> str:
+        tokens.append(token)
+        if len(tokens) == 1:
+            token.add_callback(loser_cancelled.set)
+            loser_cancelled.wait(5)
+            return "slow"
+        return "hedge"
+
+    assert guard.call(call) == "hedge"
+    assert loser_cancelled.wait(1)
+    assert (guard.hedges_fired, guard.hedges_won) == (1, 1)
+
+
+def test_hedge_delay_scales_with_the_call_size():
+    guard = primed_guard(latency_seconds=0.1)
+
+    assert guard.hedge_delay(scale=10) == pytest.approx(1.0)
+    assert guard.hedge_delay(scale=0.01) == guard.min_hedge_delay_seconds
+
+
+def test_hedges_are_capped_to_a_share_of_calls():
+    guard = primed_guard(max_hedge_ratio=0.0)
+
+    def slow(token: CancelToken) -> str:
+        time.sleep(0.1)
+        return "ok"
+
+    for _ in range(3):
+        guard.call(slow)
+
+    # One hedge is always allowed, then none at a zero ratio.
+    assert guard.hedges_fired == 1
+
+
+def test_breaker_opens_on_failures_then_lets_one_probe_through():
+    breaker = CircuitBreaker("test", window=4, min_calls=4, failure_ratio=0.5, open_seconds=0.05)
+    guard = BackendGuard("test", breaker=breaker)
+
+    def fail(token: CancelToken) -> None:
+        raise ConnectionError("down")
+
+    for _ in range(4):
+        with pytest.raises(ConnectionError):
+            guard.call(fail)
+    with pytest.raises(CircuitOpenError):
+        guard.call(lambda token: "ok")
+    time.sleep(0.06)
+
+    assert guard.call(lambda token: "recovered") == "recovered"
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.rejected == 1
+
+
+def test_failed_probe_reopens_the_breaker():
+    breaker = CircuitBreaker("test", window=2, min_calls=2, open_seconds=0.05)
+    for _ in range(2):
+        breaker.before_call()
+        breaker.record(False)
+    time.sleep(0.06)
+
+    breaker.before_call()
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+    breaker.record(False)
+
+    assert breaker.state == CircuitBreaker.OPEN
+
+
+def test_retry_budget_stops_at_its_retry_count_and_deadline():
+    attempts = []
+
+    def flaky() -> str:
+        attempts.append(1)
+        raise TimeoutError("slow")
+
+    with pytest.raises(TimeoutError):
+        RetryBudget(max_retries=2, base_delay_seconds=0.0).call("stage", flaky)
+    assert len(attempts) == 3
+    assert RetryBudget(max_retries=5, deadline_seconds=0.0).next_delay() is None
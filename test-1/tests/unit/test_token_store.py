@@ -0,0 +1,140 @@
+import datetime
+import os
+import stat
+import time
+from unittest import mock
+
+import pytest
+from cryptography.fernet import Fernet
+from google.auth.exceptions import RefreshError
+from google.oauth2.credentials import Credentials
+
+from app import token_store
+from app.token_store import KEY_FILE_NAME, UTC, TokenRefresher, TokenStore
+
+
+def credentials(token: str = "access-token", expires_in_seconds: float = 3600) -> Credentials:
+    expiry = datetime.datetime.now(UTC).replace(tzinfo=None) + datetime.timedelta(seconds=expires_in_seconds)
+    return Credentials(token=token, refresh_token="refresh-token", token_uri="https://oauth2.googleapis.com/token", client_id="client", client_secret="secret", expiry=expiry)
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    monkeypatch.delenv("CARECALL_TOKEN_KEY", raising=False)
+    tokens = TokenStore(str(tmp_path / "tokens"))
+    monkeypatch.setattr(token_store, "_default_store", tokens)
+    return tokens
+
+
+def test_credentials_and_profile_round_trip_encrypted(store):
+    store.save("handle-1", credentials(), {"given_name": "Marie"})
+
+    loaded, profile = store.load("handle-1")
+    stored = [name for name in os.listdir(store.directory) if name.endswith(".token")]
+
+    assert (loaded.token, loaded.refresh_token, profile) == ("access-token", "refresh-token", {"given_name": "Marie"})
+    assert len(stored) == 1
+    assert "handle-1" not in stored[0]
+    with open(os.path.join(store.directory, stored[0]), "rb") as token_file:
+        assert b"access-token" not in token_file.read()
+    assert stat.S_IMODE(os.stat(os.path.join(store.directory, KEY_FILE_NAME)).st_mode) == 0o600
+
+
+def test_token_saved_under_another_key_is_ignored(store, tmp_path):
+    store.save("handle-1", credentials(), {})
+
+    assert TokenStore(store.directory, key=Fernet.generate_key()).load("handle-1") is None
+    assert store.load("unknown-handle") is None
+
+
+def test_sign_in_expires_and_its_record_is_removed(tmp_path):
+    store = TokenStore(str(tmp_path / "tokens"), key=Fernet.generate_key(), ttl_seconds=0.05)
+    store.save("handle-1", credentials(), {})
+    time.sleep(0.06)
+
+    assert store.load("handle-1") is None
+    assert not [name for name in os.listdir(store.directory) if name.endswith(".token")]
+
+
+def test_refresh_updates_keep_the_expiry_and_never_revive_a_deleted_handle(store):
+    store.save("handle-1", credentials(), {"given_name": "Marie"})
+    expires_at = store._read("handle-1")["expires_at"]
+
+    assert store.save("handle-1", credentials("refreshed-token"))
+    assert store._read("handle-1")["expires_at"] == expires_at
+    assert store.load("handle-1")[0].token == "refreshed-token"
+    store.delete("handle-1")
+    assert not store.save("handle-1", credentials("later-token"))
+    assert store.load("handle-1") is None
+
+
+def test_refresher_picks_credentials_close_to_expiry():
+    assert TokenRefresher.is_due(credentials(expires_in_seconds=60))
+    assert not TokenRefresher.is_due(credentials(expires_in_seconds=3600))
+    assert not TokenRefresher.is_due(Credentials(token="no-refresh-token"))
+
+
+def test_refreshed_token_is_saved_and_a_revoked_one_forgotten(store):
+    live, revoked = credentials(expires_in_seconds=60), credentials(expires_in_seconds=60)
+    store.save("live", live, {})
+    store.save("revoked", revoked, {})
+
+    def refresh(request):
+        live.token = "refreshed-token"
+
+    with mock.patch.object(live, "refresh", side_effect=refresh), mock.patch.object(revoked, "refresh", side_effect=RefreshError("invalid_grant")):
+        assert TokenRefresher.refresh(live, "live")
+        assert not TokenRefresher.refresh(revoked, "revoked")
+
+    assert store.load("live")[0].token == "refreshed-token"
+    assert store.load("revoked") is None
+
+
+def test_signed_out_handle_stops_being_refreshed(store, monkeypatch):
+    signed_out = credentials()
+    store.save("handle-1", signed_out, {})
+    # Registered directly: track() would also start the background refresher.
+    monkeypatch.setitem(TokenRefresher._tracked, signed_out, "handle-1")
+    store.delete("handle-1")
+
+    with mock.patch.object(signed_out, "refresh"):
+        TokenRefresher.refresh(signed_out, "handle-1")
+
+    assert signed_out not in TokenRefresher._tracked
+    assert store.load("handle-1") is None
+
+
+def test_rotation_moves_the_sign_in_to_a_new_handle_and_kills_the_old_one(store):
+    store.save("handle-1", credentials(), {"given_name": "Marie"})
+    expires_at = store._read("handle-1")["expires_at"]
+
+    rotated = store.rotate("handle-1")
+
+    assert rotated and rotated != "handle-1"
+    assert store.load("handle-1") is None
+    assert store.rotate("handle-1") is None
+    assert store.load(rotated)[1] == {"given_name": "Marie"}
+    assert store._read(rotated)["expires_at"] == expires_at
+
+
+def test_unrotated_handle_expires_before_the_sign_in(tmp_path):
+    store = TokenStore(str(tmp_path / "tokens"), key=Fernet.generate_key(), handle_ttl_seconds=0.05)
+    store.save("handle-1", credentials(), {})
+    rotated = store.rotate("handle-1")
+    time.sleep(0.06)
+
+    assert store.load(rotated) is None
+
+
+def test_refresh_of_a_rotated_away_handle_keeps_tracking_the_new_one(store, monkeypatch):
+    session_credentials = credentials()
+    store.save("handle-1", session_credentials, {})
+    rotated = store.rotate("handle-1")
+    monkeypatch.setitem(TokenRefresher._tracked, session_credentials, rotated)
+
+    with mock.patch.object(session_credentials, "refresh"):
+        # A refresh pass that still saw the old handle.
+        TokenRefresher.refresh(session_credentials, "handle-1")
+
+    assert TokenRefresher._tracked[session_credentials] == rotated
+    assert store.load(rotated) is not None
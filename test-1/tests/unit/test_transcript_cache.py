@@ -0,0 +1,46 @@
+import time
+
+from app.transcript_cache import TranscriptCache
+
+
+def test_entries_survive_a_new_instance(tmp_path):
+    db_path = str(tmp_path / "transcripts.sqlite3")
+    TranscriptCache(db_path).put("key", "bonjour")
+
+    assert TranscriptCache(db_path).get("key") == "bonjour"
+
+
+def test_least_recently_used_entries_are_evicted_first(tmp_path):
+    cache = TranscriptCache(str(tmp_path / "transcripts.sqlite3"), max_entries=2)
+    cache.put("first", "un")
+    cache.put("second", "deux")
+    time.sleep(0.01)
+    assert cache.get("first") == "un"
+
+    cache.put("third", "trois")
+
+    assert cache.get("second") is None
+    assert cache.get("first") == "un"
+    assert cache.get("third") == "trois"
+
+
+def test_byte_budget_is_enforced(tmp_path):
+    cache = TranscriptCache(str(tmp_path / "transcripts.sqlite3"), max_bytes=10)
+    cache.put("first", "123456")
+    cache.put("second", "654321")
+
+    assert cache.get("first") is None
+    assert cache.stats()["bytes"] == 6
+
+
+def test_expired_entries_are_misses(tmp_path):
+    cache = TranscriptCache(str(tmp_path / "transcripts.sqlite3"), ttl_seconds=0)
+    cache.put("key", "bonjour")
+    time.sleep(0.01)
+
+    assert cache.get("key") is None
+    assert cache.stats()["misses"] == 1
+
+
+def test_keys_depend_on_the_recognition_language():
+    assert TranscriptCache.build_key("digest", "fr-FR") != TranscriptCache.build_key("digest", "en-US")
@@ -0,0 +1,120 @@
+import os
+import wave
+
+import numpy as np
+
+from app.audio_normalizer import TARGET_CHANNELS, TARGET_FRAME_RATE, TARGET_SAMPLE_WIDTH
+from app.voice_activity import VoiceActivityDetector
+
+
+BYTES_PER_SECOND = TARGET_FRAME_RATE * TARGET_SAMPLE_WIDTH
+
+
+def tone(seconds: float, dbfs: float) -> bytes:
+    samples = np.arange(int(TARGET_FRAME_RATE * seconds))
+    amplitude = 32768 * 10 ** (dbfs / 20) * np.sqrt(2)
+    return (amplitude * np.sin(2 * np.pi * 220 * samples / TARGET_FRAME_RATE)).astype("<i2").tobytes()
+
+
+def silence(seconds: float) -> bytes:
+    return b"\x00\x00" * int(TARGET_FRAME_RATE * seconds)
+
+
+def chunked(pcm: bytes, size: int = 3000) -> list[bytes]:
+    # An odd chunk size, so frames straddle chunk boundaries.
+    return [pcm[offset : offset + size] for offset in range(0, len(pcm), size)]
+
+
+def write_wav(path: str, pcm: bytes) -> str:
+    with wave.open(path, "wb") as wav_file:
+        wav_file.setnchannels(TARGET_CHANNELS)
+        wav_file.setsampwidth(TARGET_SAMPLE_WIDTH)
+        wav_file.setframerate(TARGET_FRAME_RATE)
+        wav_file.writeframes(pcm)
+    return path
+
+
+def test_long_silences_are_cut_down_to_the_padding():
+    pcm = silence(3) + tone(1, -20) + silence(4) + tone(1, -20) + silence(2)
+    vad = VoiceActivityDetector()
+
+    kept = b"".join(vad.filter_pcm_chunks(chunked(pcm)))
+
+    # Two seconds of speech plus at most 200 ms of padding around each silence.
+    assert 2 * BYTES_PER_SECOND <= len(kept) <= 2.9 * BYTES_PER_SECOND
+    assert vad.speech_ratio < 0.25
+
+
+def test_short_pauses_inside_speech_are_kept():
+    pcm = tone(1, -20) + silence(0.4) + tone(1, -20)
+
+    kept = b"".join(VoiceActivityDetector().filter_pcm_chunks(chunked(pcm)))
+
+    assert len(kept) == len(pcm)
+
+
+def test_quiet_recording_is_streamed_whole():
+    # Speech recorded far from the microphone stays below the -45 dBFS gate; dropping it would leave STT nothing.
+    pcm = tone(5, -55)
+
+    kept = b"".join(VoiceActivityDetector().filter_pcm_chunks(chunked(pcm)))
+
+    assert kept == pcm
+
+
+def test_quiet_recording_longer_than_the_leading_buffer_is_streamed_whole():
+    pcm = tone(5, -55)
+    vad = VoiceActivityDetector(max_leading_ms=1000)
+
+    chunks = list(vad.filter_pcm_chunks(chunked(pcm)))
+
+    assert b"".join(chunks) == pcm
+    assert len(chunks) > 1
+
+
+def test_leading_silence_before_speech_is_dropped():
+    pcm = silence(10) + tone(1, -20)
+
+    kept = b"".join(VoiceActivityDetector().filter_pcm_chunks(chunked(pcm)))
+
+    assert len(kept) <= 1.3 * BYTES_PER_SECOND
+
+
+def test_trim_wav_writes_speech_only_and_keeps_quiet_files_as_they_are(tmp_path):
+    speech_wav = write_wav(str(tmp_path / "speech.wav"), silence(3) + tone(1, -20) + silence(3))
+    quiet_wav = write_wav(str(tmp_path / "quiet.wav"), tone(3, -55))
+
+    trimmed = VoiceActivityDetector().trim_wav(speech_wav, str(tmp_path / "out"))
+    untouched = VoiceActivityDetector().trim_wav(quiet_wav, str(tmp_path / "out"))
+
+    assert trimmed == str(tmp_path / "out" / "speech.speech.wav")
+    with wave.open(trimmed, "rb") as wav_file:
+        assert wav_file.getnframes() < 2 * TARGET_FRAME_RATE
+    assert untouched == quiet_wav
+    assert os.listdir(tmp_path / "out") == ["speech.speech.wav"]
+
+
+def test_segments_cover_the_audio_and_respect_the_maximum_length():
+    pcm = b"".join(tone(2.5, -20) + silence(0.5) for _ in range(40))
+
+    bounds = VoiceActivityDetector().segment_bounds(pcm, target_seconds=10, max_seconds=15)
+
+    assert bounds[0][0] == 0
+    assert bounds[-1][1] == len(pcm)
+    assert all(previous[1] == current[0] for previous, current in zip(bounds, bounds[1:], strict=False))
+    assert all(end - start <= 15 * BYTES_PER_SECOND for start, end in bounds)
+    # Cuts land in the pauses.
+    assert all(np.abs(np.frombuffer(pcm[end : end + 640], dtype="<i2")).max() == 0 for _, end in bounds[:-1])
+
+
+def test_streamed_segments_are_cut_in_pauses_as_the_audio_arrives():
+    pcm = b"".join(tone(2.5, -20) + silence(0.5) for _ in range(40))
+    segments: dict[int, bytes] = {}
+
+    for index, piece in VoiceActivityDetector().split_pcm_chunks(chunked(pcm), target_seconds=10, max_seconds=15):
+        segments[index] = segments.get(index, b"") + piece
+
+    assert list(segments) == list(range(len(segments)))
+    assert b"".join(segments.values()) == pcm
+    assert all(len(segment) <= 15 * BYTES_PER_SECOND for segment in segments.values())
+    assert all(np.abs(np.frombuffer(segment[:640], dtype="<i2")).max() == 0 for segment in list(segments.values())[1:])
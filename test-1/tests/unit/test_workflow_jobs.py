@@ -0,0 +1,91 @@
+import collections
+import os
+import threading
+import time
+from unittest import mock
+
+import pytest
+
+from app import workflow_jobs
+from app.workflow_jobs import WorkflowJobRunner
+from app.workflow_orchestrator import WorkflowError, WorkflowOrchestrator
+
+
+TICKETS_DIR = os.path.join(os.path.dirname(__file__), "..", "..", "tickets")
+
+
+@pytest.fixture(autouse=True)
+def fresh_jobs(monkeypatch):
+    monkeypatch.setattr(WorkflowJobRunner, "_jobs", collections.OrderedDict())
+
+
+def wait_until(predicate, timeout_seconds: float = 5.0) -> None:
+    deadline = time.monotonic() + timeout_seconds
+    while not predicate():
+        assert time.monotonic() < deadline, "condition not reached in time"
+        time.sleep(0.01)
+
+
+def test_rerun_polls_the_job_it_submitted_and_sees_its_progress():
+    release = threading.Event()
+    calls = []
+
+    def orchestrate_workflow(audio_source, calendar_service, calendar_id, on_stage, on_answer_text, **options):
+        calls.append(options)
+        on_stage("transcribe")
+        on_answer_text("Vous avez ")
+        on_answer_text("deux rendez-vous")
+        release.wait(5)
+        on_stage("calendar")
+        return {"status": "success"}
+
+    with mock.patch.object(WorkflowOrchestrator, "orchestrate_workflow", side_effect=orchestrate_workflow):
+        job = WorkflowJobRunner.submit("session:file", b"audio", None, "primary", stream_audio=True)
+        wait_until(lambda: job.answer_text == "Vous avez deux rendez-vous")
+        again = WorkflowJobRunner.submit("session:file", b"audio", None, "primary", stream_audio=True)
+
+        assert again is job
+        assert job.stage == "transcribe"
+        assert not job.done()
+        release.set()
+        wait_until(job.done)
+
+    assert job.result() == {"status": "success"}
+    assert job.stage == "calendar"
+    assert calls == [{"stream_audio": True}]
+
+
+def test_workflow_error_is_raised_by_result():
+    with mock.patch.object(WorkflowOrchestrator, "orchestrate_workflow", side_effect=WorkflowError("Authentication error")):
+        job = WorkflowJobRunner.submit("session:bad", b"audio", None, "primary")
+        wait_until(job.done)
+
+    with pytest.raises(WorkflowError, match="Authentication error"):
+        job.result()
+
+
+def test_finished_jobs_nobody_polled_are_dropped_after_their_ttl(monkeypatch):
+    monkeypatch.setattr(workflow_jobs, "FINISHED_JOB_TTL_SECONDS", 0.0)
+    with mock.patch.object(WorkflowOrchestrator, "orchestrate_workflow", return_value={"status": "no_speech"}):
+        abandoned = WorkflowJobRunner.submit("closed-tab:file", b"audio", None, "primary")
+        wait_until(abandoned.done)
+        time.sleep(0.01)
+        WorkflowJobRunner.submit("other:file", b"audio", None, "primary")
+
+    assert WorkflowJobRunner.get("closed-tab:file") is None
+    assert WorkflowJobRunner.get("other:file") is not None
+    WorkflowJobRunner.discard("other:file")
+    assert WorkflowJobRunner.get("other:file") is None
+
+
+def test_uploaded_bytes_run_through_the_streaming_workflow(fake_backends, calendar_service, spool):
+    with open(os.path.join(TICKETS_DIR, "t2", "dentiste#1.m4a"), "rb") as audio_file:
+        audio_bytes = audio_file.read()
+
+    job = WorkflowJobRunner.submit("session:dentiste", audio_bytes, calendar_service, "primary", stream_audio=True, stream_llm=True)
+    wait_until(job.done, timeout_seconds=30)
+
+    result = job.result()
+    assert result["status"] == "success"
+    assert result["function_name"] == "create_event"
+    assert job.stage == "calendar"
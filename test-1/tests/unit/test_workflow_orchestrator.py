@@ -0,0 +1,79 @@
+import os
+from unittest import mock
+
+import pytest
+
+from app.azure_speech_service import AzureSpeechService
+from app.google_calendar_integration import GoogleCalendarIntegration
+from app.workflow_orchestrator import WorkflowError, WorkflowOrchestrator
+
+
+TICKETS_DIR = os.path.join(os.path.dirname(__file__), "..", "..", "tickets")
+AUDIO_FILE = os.path.join(TICKETS_DIR, "t3", "longt3.m4a")
+
+
+def test_workflow_creates_the_event_and_checkpoints_every_stage(spool, fake_backends, calendar_service):
+    checkpoints = {}
+
+    result = WorkflowOrchestrator.orchestrate_workflow(AUDIO_FILE, calendar_service, "primary", checkpoints=checkpoints)
+
+    assert result["status"] == "success"
+    assert result["function_name"] == "create_event"
+    assert result["calendar_result"]["summary"] == "Rendez-vous chez le dentiste"
+    assert set(checkpoints) == {"upload", "transcribe", "interpret", "calendar"}
+
+
+def test_failed_stage_is_retried_without_rerunning_the_earlier_ones(spool, fake_backends, calendar_service):
+    real_operation = GoogleCalendarIntegration.perform_calendar_operation
+    calendar_calls = []
+
+    def flaky_operation(*args, **kwargs):
+        calendar_calls.append(args)
+        if len(calendar_calls) == 1:
+            raise RuntimeError("Calendar API unavailable")
+        return real_operation(*args, **kwargs)
+
+    with (
+        mock.patch.object(GoogleCalendarIntegration, "perform_calendar_operation", side_effect=flaky_operation),
+        mock.patch.object(AzureSpeechService, "transcribe_audio", side_effect=AzureSpeechService.transcribe_audio) as transcribe,
+    ):
+        result = WorkflowOrchestrator.orchestrate_workflow(AUDIO_FILE, calendar_service, "primary", max_retries=2)
+
+    assert result["status"] == "success"
+    assert len(calendar_calls) == 2
+    assert transcribe.call_count == 1
+
+
+def test_calendar_retry_after_a_lost_response_does_not_duplicate_the_event(spool, fake_backends, calendar_service):
+    real_operation = GoogleCalendarIntegration.perform_calendar_operation
+    calendar_calls = []
+
+    def response_lost_once(*args, **kwargs):
+        calendar_calls.append(kwargs["idempotency_key"])
+        event = real_operation(*args, **kwargs)
+        if len(calendar_calls) == 1:
+            raise ConnectionError("connection reset after the insert")
+        return event
+
+    with mock.patch.object(GoogleCalendarIntegration, "perform_calendar_operation", side_effect=response_lost_once):
+        result = WorkflowOrchestrator.orchestrate_workflow(AUDIO_FILE, calendar_service, "primary", max_retries=2)
+
+    # No key was passed, so the run derived one; the retry re-sent the same event ID and got the existing event back.
+    assert calendar_calls[0] and calendar_calls[0] == calendar_calls[1]
+    assert result["status"] == "success"
+    assert sum(event["summary"] == "Rendez-vous chez le dentiste" for event in calendar_service._events) == 1
+
+
+def test_checkpointed_stages_are_not_run_again(spool, fake_backends, calendar_service):
+    checkpoints = {"upload": AUDIO_FILE, "transcribe": "Qu'est-ce que j'ai demain ?"}
+
+    with mock.patch.object(AzureSpeechService, "transcribe_audio") as transcribe:
+        result = WorkflowOrchestrator.orchestrate_workflow(AUDIO_FILE, calendar_service, "primary", checkpoints=checkpoints)
+
+    transcribe.assert_not_called()
+    assert result["function_name"] == "list_events"
+
+
+def test_exhausted_retry_budget_raises_a_workflow_error(spool, fake_backends, calendar_service):
+    with mock.patch.object(GoogleCalendarIntegration, "perform_calendar_operation", side_effect=RuntimeError("down")), pytest.raises(WorkflowError):
+        WorkflowOrchestrator.orchestrate_workflow(AUDIO_FILE, calendar_service, "primary", max_retries=2)